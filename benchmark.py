@@ -0,0 +1,322 @@
+# Benchmark suite of the GA hot paths, with fixed seeds and input circuits: results are
+# written to JSON and two result files can be compared to spot regressions
+
+import argparse
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+from circuitsolution import CircuitSolution
+from circuitcrossover import CircuitCrossover
+from fitnessbackend import FITNESS_BACKENDS, FITNESS_CACHE
+from gateencoding import read_circuit_file
+from geneticalgorithm import build_algorithm
+from safemutation import CircuitMutation
+from util import *
+from config import *
+
+SUITE_SEED = 1
+# Correct circuit used as input of post_optimize (with redundant gates added)
+SUITE_CIRCUIT = "results/best_circuit_LowerThan.txt"
+# GA phases that can be captured, and the ElitistGeneticAlgorithm method running each
+GA_PHASES = {"selection": "selection", "reproduction": "reproduction",
+             "evaluation": "evaluate", "replacement": "replacement"}
+
+def random_solution(length):
+    solution = CircuitSolution([random_gate() for _ in range(length)])
+    solution.objectives[0] = 0.5
+    return solution
+
+# The same count circuits of the given length on every run
+def fixed_circuits(count, length, seed=SUITE_SEED):
+    random.seed(seed)
+    return [tuple(random_gate() for _ in range(length)) for _ in range(count)]
+
+# Number of repetitions of a gate giving the identity
+def gate_order(gate):
+    perm = GATE_INFO[gate[2]][1]
+    order, state = 1, list(perm)
+    while state != list(range(QUBASE)):
+        state = [perm[v] for v in state]
+        order += 1
+    return order
+
+# Time and retained memory of CircuitSolution.copy for a circuit of the given length
+def copy_cost(length=30, copies=20000):
+    solution = random_solution(length)
+    start = time.perf_counter()
+    for _ in range(copies):
+        solution.copy()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [solution.copy() for _ in range(copies)]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return elapsed / copies * 1e9, retained / copies
+
+class PhaseCapture:
+    """cProfile and/or tracemalloc capture around one phase of the suite.
+
+    The phase is a suite entry (e.g. "mutation", or "fitness" for all its backends) or a
+    GA phase of the generation runs (selection, reproduction, evaluation, replacement).
+    The captured phase is slowed down by the capture, so its timings are not comparable.
+    """
+    def __init__(self, phase, profile=False, trace=False):
+        self.phase = phase
+        self.profiler = cProfile.Profile() if profile else None
+        self.trace = trace
+        self.peak = 0
+        self.snapshot = None
+
+    def matches(self, name):
+        return self.phase is not None and (name == self.phase or name.startswith(self.phase + "["))
+
+    @contextlib.contextmanager
+    def around(self, name):
+        if not self.matches(name):
+            yield
+            return
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            yield
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            if self.trace:
+                self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - base)
+                self.snapshot = tracemalloc.take_snapshot()
+
+    # The algorithm with its GA phase methods wrapped in the capture
+    def wrap_phases(self, algorithm):
+        for phase, method in GA_PHASES.items():
+            if self.matches(phase):
+                original = getattr(algorithm, method)
+                def captured(*args, phase=phase, original=original):
+                    with self.around(phase):
+                        return original(*args)
+                setattr(algorithm, method, captured)
+        return algorithm
+
+    def report(self, profile_output=None, top=25):
+        if self.profiler is not None:
+            print(f"\ncProfile of '{self.phase}':")
+            pstats.Stats(self.profiler).sort_stats("cumulative").print_stats(top)
+            if profile_output:
+                self.profiler.dump_stats(profile_output)
+        if self.trace:
+            print(f"\ntracemalloc of '{self.phase}': {self.peak / 1024:.0f} KiB peak")
+            if self.snapshot is not None:
+                for stat in self.snapshot.statistics("lineno")[:top]:
+                    print(f"  {stat}")
+            tracemalloc.stop()
+
+def time_calls(call, inputs, repeat, seed=SUITE_SEED):
+    """Best time per call (µs) of call(*args) over all the inputs, in repeat rounds.
+
+    Every round starts from the same seed and an empty fitness cache, so it does the same work.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        random.seed(seed)
+        FITNESS_CACHE.clear()
+        start = time.perf_counter()
+        for args in inputs:
+            call(*args)
+        best = min(best, time.perf_counter() - start)
+    return best / len(inputs) * 1e6
+
+def start_algorithm(truth_table, population_size, seed=SUITE_SEED, capture=None):
+    random.seed(seed)
+    FITNESS_CACHE.clear()
+    algorithm = build_algorithm(truth_table, population_size)
+    if capture is not None:
+        capture.wrap_phases(algorithm)
+    algorithm.start_computing_time = time.time()
+    algorithm.solutions = algorithm.evaluate(algorithm.create_initial_solutions())
+    algorithm.init_progress()
+    return algorithm
+
+# Average time (ms) of a generation after the initial population is evaluated
+def generation_time(truth_table, population_size, generations, capture=None):
+    algorithm = start_algorithm(truth_table, population_size, capture=capture)
+    start = time.perf_counter()
+    for _ in range(generations):
+        algorithm.step()
+        algorithm.update_progress()
+    return (time.perf_counter() - start) / generations * 1000
+
+def generation_allocations(truth_table, population_size, generations, capture=None):
+    """Average peak traced memory (KiB) of a generation after the initial population is evaluated"""
+    algorithm = start_algorithm(truth_table, population_size, capture=capture)
+    # Already tracing when the entry is captured with --trace
+    owner = not tracemalloc.is_tracing()
+    if owner:
+        tracemalloc.start()
+    peaks = []
+    for _ in range(generations):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        algorithm.step()
+        algorithm.update_progress()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    if owner:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+def first_correct(truth_table, population_size, max_generations, capture=None):
+    """Seconds and generations until the first correct circuit (None, None if not found
+    within max_generations)"""
+    algorithm = start_algorithm(truth_table, population_size, capture=capture)
+    start = time.perf_counter()
+    while algorithm.first_correct_generation is None and algorithm.generation_count < max_generations:
+        algorithm.step()
+        algorithm.update_progress()
+    if algorithm.first_correct_generation is None:
+        return None, None
+    return time.perf_counter() - start, algorithm.first_correct_generation
+
+def run_suite(args, capture=None):
+    """Results of the suite as {name: {"value": ..., "unit": ...}} (lower is better)"""
+    capture = capture if capture is not None else PhaseCapture(None)
+    results = {}
+    def measure(name, unit, call):
+        with capture.around(name):
+            value = call()
+        results[name] = {"value": value, "unit": unit}
+        shown = "not reached" if value is None else f"{value:.3f} {unit}"
+        print(f"{name:32s} {shown}", flush=True)
+
+    truth_table = generate_lower_truth_table()
+    circuits = fixed_circuits(args.circuits, args.length)
+    inputs = list(truth_table)
+    solutions = []
+    for circuit in circuits:
+        solution = CircuitSolution(circuit)
+        solution.objectives[0] = fitness(circuit, truth_table)
+        solutions.append(solution)
+    # Correct circuits padded with gates that cancel out, then random (incorrect) ones
+    correct = tuple(read_circuit_file(SUITE_CIRCUIT)) if os.path.exists(SUITE_CIRCUIT) else ()
+    padded = [correct + (circuit[0],) * gate_order(circuit[0]) for circuit in circuits[:10]] if correct else []
+    mutation = CircuitMutation(MUTATION_RATE, truth_table)
+    crossover = CircuitCrossover(CROSSOVER_RATE)
+
+    for backend, backend_fitness in FITNESS_BACKENDS.items():
+        measure(f"fitness[{backend}]", "us", lambda: time_calls(
+            backend_fitness, [(c, truth_table) for c in circuits], args.repeat))
+    measure("simulate_circuit", "us", lambda: time_calls(
+        simulate_circuit, [(c, inputs[i % len(inputs)]) for i, c in enumerate(circuits)], args.repeat))
+    measure("copy", "us", lambda: copy_cost(args.length)[0] / 1000)
+    measure("mutation", "us", lambda: time_calls(
+        mutation.execute, [(s,) for s in solutions], args.repeat))
+    measure("post_optimize", "us", lambda: time_calls(
+        mutation.post_optimize, [(c,) for c in padded + circuits[:len(padded) or 10]], args.repeat))
+    measure("crossover", "us", lambda: time_calls(
+        crossover.execute, [(solutions[i:i + 2],) for i in range(0, len(solutions) - 1, 2)], args.repeat))
+    for size in args.populations:
+        measure(f"generation[{size}]", "ms", lambda: generation_time(truth_table, size, args.generations, capture))
+    for size in args.populations:
+        measure(f"allocations[{size}]", "KiB",
+                lambda: generation_allocations(truth_table, size, args.generations, capture))
+    for name in args.tables:
+        found = {}
+        def run_first_correct(name=name):
+            seconds, found["generations"] = first_correct(
+                TRUTH_TABLES[name](), args.population, args.max_generations, capture)
+            return seconds
+        measure(f"first_correct[{name}]", "s", run_first_correct)
+        results[f"first_correct[{name}]"]["generations"] = found["generations"]
+    return results
+
+def write_results(path, results, args):
+    meta = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": SUITE_SEED,
+        "arguments": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+        "config": {"NUM_QULINES": NUM_QULINES, "QUBASE": QUBASE, "FITNESS_BACKEND": FITNESS_BACKEND,
+                   "FITNESS_CACHE_SIZE": FITNESS_CACHE_SIZE, "PEEPHOLE_OFFSPRING": PEEPHOLE_OFFSPRING,
+                   "CANONICAL_DEDUPE": CANONICAL_DEDUPE, "CIRCUIT_STORE": CIRCUIT_STORE},
+    }
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+
+def compare_results(old, new, threshold=0.1):
+    """(name, old value, new value, regression) for the entries of both result files.
+
+    An entry regresses when its value grows by more than threshold (relative), or when a
+    correct circuit found in the old run is not found in the new one.
+    """
+    rows = []
+    for name in old["results"]:
+        if name not in new["results"]:
+            continue
+        before, after = old["results"][name]["value"], new["results"][name]["value"]
+        if before is None or after is None:
+            regression = before is not None and after is None
+        else:
+            regression = after > before * (1 + threshold)
+        rows.append((name, before, after, regression))
+    return rows
+
+def print_comparison(rows, units):
+    for name, before, after, regression in rows:
+        ratio = f"{after / before:6.2f}x" if before and after is not None else "      -"
+        shown = lambda v: "-" if v is None else f"{v:.3f}"
+        mark = "  REGRESSION" if regression else ""
+        print(f"{name:32s} {shown(before):>12s} -> {shown(after):>12s} {units[name]:2s} {ratio}{mark}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite of the GA hot paths")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file of the results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running the suite")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown flagged as a regression by --compare")
+    parser.add_argument("--length", type=int, default=30, help="length of the fixed input circuits")
+    parser.add_argument("--circuits", type=int, default=200, help="number of fixed input circuits")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds of each timing (the best is kept)")
+    parser.add_argument("--populations", type=int, nargs="+", default=[100, 500, 1000],
+                        help="population sizes of the generation timings")
+    parser.add_argument("--generations", type=int, default=5, help="generations timed per population size")
+    parser.add_argument("--tables", nargs="*", choices=sorted(TRUTH_TABLES), default=list(TRUTH_TABLES),
+                        help="truth tables of the time-to-first-correct runs (none to skip them)")
+    parser.add_argument("--population", type=int, default=POP_SIZE, help="population of the time-to-first-correct runs")
+    parser.add_argument("--max-generations", type=int, default=2000,
+                        help="generations after which a time-to-first-correct run gives up")
+    parser.add_argument("--profile", metavar="PHASE", help="run cProfile around a suite entry or GA phase")
+    parser.add_argument("--profile-output", help="file to dump the cProfile statistics to (for pstats/snakeviz)")
+    parser.add_argument("--trace", metavar="PHASE", help="trace the allocations of a suite entry or GA phase")
+    args = parser.parse_args()
+
+    if args.compare:
+        files = []
+        for path in args.compare:
+            with open(path) as f:
+                files.append(json.load(f))
+        rows = compare_results(files[0], files[1], args.threshold)
+        print_comparison(rows, {name: entry["unit"] for name, entry in files[1]["results"].items()})
+        sys.exit(1 if any(regression for *_, regression in rows) else 0)
+
+    if args.profile and args.trace and args.profile != args.trace:
+        parser.error("--profile and --trace must capture the same phase")
+    capture = PhaseCapture(args.profile or args.trace, bool(args.profile), bool(args.trace))
+    results = run_suite(args, capture)
+    write_results(args.output, results, args)
+    print(f"Results written to {args.output}")
+    capture.report(args.profile_output)
@@ -0,0 +1,91 @@
+# Canonical form of circuits up to reordering of commuting gates
+import itertools
+from util import ALL_GATES, apply_gate
+from gateencoding import OPCODES, NUM_OPCODES, encode_gate
+from statetransition import NUM_STATES, GATE_TRANSITIONS
+from config import *
+
+# _COMMUTING[b][a]: gates a and b give the same state permutation in either order (gates on
+# disjoint wires, but also e.g. two controlled gates sharing their control)
+_COMMUTING = None
+# Commutation of gate pairs on the lines they use, keyed by the pair relabelled onto lines 0..3
+_LOCAL_COMMUTES = {}
+
+def _local_commutes(a, b):
+    wires = sorted({*a[:2], *b[:2]})
+    relabel = {line: i for i, line in enumerate(wires)}
+    a = (relabel[a[0]], relabel[a[1]], a[2])
+    b = (relabel[b[0]], relabel[b[1]], b[2])
+    result = _LOCAL_COMMUTES.get((a, b))
+    if result is None:
+        result = all(apply_gate(apply_gate(state, a), b) == apply_gate(apply_gate(state, b), a)
+                     for state in itertools.product(range(QUBASE), repeat=len(wires)))
+        _LOCAL_COMMUTES[(a, b)] = result
+    return result
+
+def commuting_gates(b):
+    """Row of the commutation table for opcode b, indexed by opcode.
+
+    Up to 256 states the whole table is computed at once with numpy; larger registers fill
+    a row on first use, checking each pair on the (at most 4) lines it touches only.
+    """
+    global _COMMUTING
+    if _COMMUTING is None:
+        if NUM_STATES <= 256 and GATE_TRANSITIONS is not None:
+            _COMMUTING = []
+            for a in range(NUM_OPCODES):
+                # after_a[b] is gate a followed by gate b
+                after_a = GATE_TRANSITIONS[:, GATE_TRANSITIONS[a]]
+                before_a = GATE_TRANSITIONS[a][GATE_TRANSITIONS]
+                _COMMUTING.append((after_a == before_a).all(axis=1).tolist())
+        else:
+            _COMMUTING = [None] * NUM_OPCODES
+    row = _COMMUTING[b]
+    if row is None:
+        gate = ALL_GATES[b]
+        row = _COMMUTING[b] = [not {*gate[:2]} & {*other[:2]} or _local_commutes(gate, other)
+                               for other in ALL_GATES]
+    return row
+
+def canonical_ops(circuit):
+    """Opcodes of the canonical form of a circuit (Foata normal form).
+
+    Each gate goes one level above the highest level holding a gate it does not commute
+    with, and the levels are listed in order with their opcodes sorted. Two circuits
+    differing only by swaps of adjacent commuting gates get the same form, which
+    realizes the same permutation with the same number of gates.
+    """
+    ops = [OPCODES.get(g) for g in circuit]
+    if None in ops:
+        ops = [encode_gate(g) for g in circuit]
+    levels = []
+    for b in ops:
+        commutes = commuting_gates(b)
+        level = len(levels)
+        # Most gates stop at the top level: only the levels they commute with are crossed
+        while level > 0 and all([commutes[a] for a in levels[level - 1]]):
+            level -= 1
+        if level == len(levels):
+            levels.append([b])
+        else:
+            levels[level].append(b)
+    return tuple(op for ops_at_level in levels for op in sorted(ops_at_level))
+
+def canonical_circuit(circuit):
+    return tuple(ALL_GATES[op] for op in canonical_ops(circuit))
+
+# The first count items with distinct canonical forms, in order; when there are fewer,
+# the duplicates fill the remaining places
+def distinct_first(items, count, key=lambda circuit: circuit):
+    seen = set()
+    distinct, duplicates = [], []
+    for item in items:
+        form = canonical_ops(key(item))
+        if form in seen:
+            duplicates.append(item)
+        else:
+            seen.add(form)
+            distinct.append(item)
+            if len(distinct) == count:
+                break
+    return (distinct + duplicates)[:count]
@@ -0,0 +1,187 @@
+# Checkpoints of a GA run in a compact binary format, to resume it where it stopped
+
+import itertools
+import math
+import os
+import random
+import struct
+import time
+from array import array
+from circuitsolution import CircuitSolution
+from circuitstore import table_fingerprint
+from gateencoding import OPCODES, encode_gate, decompile_circuit
+from config import *
+
+MAGIC = b"QCGA"
+VERSION = 4
+# Magic, version, truth table fingerprint, generation, evaluations, stagnation count,
+# first correct generation (-1 if none), best seen, elapsed time, first correct time (NaN
+# if none), population size, total number of gates, length of the fitness history,
+# generation of the last improvement and of the last restart, restarts, length of the
+# archived circuit (-1 if none) and its fitness, number of seed circuits not handed out
+# yet and their total number of gates, length of the shortest correct circuit (-1 if none)
+# and generation it was found
+HEADER = struct.Struct("<4sH64sqqqqdddqqqqqqqdqqqq")
+# Mersenne Twister state of the random module: 624 words and the position
+RNG_WORDS = 625
+
+class Checkpoint:
+    """State of a GA run after a generation: everything the next generations depend on.
+
+    The population is stored as packed opcode arrays (one 'H' per gate, with the
+    length of each circuit), followed by the fitnesses, the best fitness history, the
+    circuit archived by restarts, the seed circuits the problem has not handed out yet
+    (restarts and diversity injections draw them) and the state of the random module.
+    """
+    def __init__(self, fingerprint, generation, evaluations, stagnation_count, best_seen, elapsed,
+                 first_correct_generation, first_correct_time, circuits, fitnesses, history, rng_state,
+                 last_improvement=0, last_restart=0, restarts=0, archive=None, seed_circuits=(),
+                 shortest_correct=None, last_shorter=0):
+        self.fingerprint = fingerprint
+        self.generation = generation
+        self.evaluations = evaluations
+        self.stagnation_count = stagnation_count
+        self.best_seen = best_seen
+        self.elapsed = elapsed
+        self.first_correct_generation = first_correct_generation
+        self.first_correct_time = first_correct_time
+        self.circuits = circuits
+        self.fitnesses = fitnesses
+        self.history = history
+        self.rng_state = rng_state
+        self.last_improvement = last_improvement
+        self.last_restart = last_restart
+        self.restarts = restarts
+        # (circuit, fitness) or None
+        self.archive = archive
+        self.seed_circuits = seed_circuits
+        self.shortest_correct = shortest_correct
+        self.last_shorter = last_shorter
+
+def _opcodes(circuits):
+    try:
+        return array('H', map(OPCODES.__getitem__, itertools.chain.from_iterable(circuits)))
+    except KeyError:
+        return array('H', [encode_gate(g) for g in itertools.chain.from_iterable(circuits)])
+
+def _optional(value):
+    return math.nan if value is None else value
+
+def save_checkpoint(algorithm, path):
+    """Write the state of the algorithm to path atomically (the previous checkpoint stays
+    valid until the new one is complete on disk)"""
+    circuits = [s.variables[0] for s in algorithm.solutions]
+    codes = _opcodes(circuits)
+    lengths = array('H', map(len, circuits))
+    fitnesses = array('d', [_optional(s.objectives[0]) for s in algorithm.solutions])
+    history = array('d', algorithm.best_fitness_history)
+    archive = algorithm.archive
+    archived = _opcodes([archive.variables[0]]) if archive is not None else array('H')
+    seeds = algorithm.problem.seed_circuits
+    seed_codes = _opcodes(seeds)
+    seed_lengths = array('H', map(len, seeds))
+    _, words, gauss_next = random.getstate()
+    header = HEADER.pack(
+        MAGIC, VERSION, table_fingerprint(algorithm.problem.truth_table).encode(),
+        algorithm.generation_count, algorithm.evaluations, algorithm.stagnation_count,
+        -1 if algorithm.first_correct_generation is None else algorithm.first_correct_generation,
+        algorithm.best_seen, time.time() - algorithm.start_computing_time,
+        _optional(algorithm.first_correct_time), len(circuits), len(codes), len(history),
+        algorithm.last_improvement, algorithm.last_restart, algorithm.restarts,
+        -1 if archive is None else len(archived), math.nan if archive is None else archive.objectives[0],
+        len(seeds), len(seed_codes),
+        -1 if algorithm.shortest_correct is None else algorithm.shortest_correct, algorithm.last_shorter)
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        for part in (lengths, fitnesses, codes, history, archived, seed_lengths, seed_codes, array('I', words)):
+            part.tofile(f)
+        f.write(struct.pack("<d", _optional(gauss_next)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def _read_array(f, typecode, count):
+    values = array(typecode)
+    values.fromfile(f, count)
+    return values
+
+def load_checkpoint(path):
+    with open(path, "rb") as f:
+        fields = HEADER.unpack(f.read(HEADER.size))
+        magic, version, fingerprint, generation, evaluations, stagnation_count, first_generation, \
+            best_seen, elapsed, first_time, n_solutions, n_codes, n_history, \
+            last_improvement, last_restart, restarts, n_archived, archive_fitness, n_seeds, n_seed_codes, \
+            shortest_correct, last_shorter = fields
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} checkpoint")
+        lengths = _read_array(f, 'H', n_solutions)
+        fitnesses = [None if math.isnan(v) else v for v in _read_array(f, 'd', n_solutions)]
+        codes = _read_array(f, 'H', n_codes)
+        history = list(_read_array(f, 'd', n_history))
+        archived = _read_array(f, 'H', max(n_archived, 0))
+        seed_lengths = _read_array(f, 'H', n_seeds)
+        seed_codes = _read_array(f, 'H', n_seed_codes)
+        words = tuple(_read_array(f, 'I', RNG_WORDS))
+        gauss_next, = struct.unpack("<d", f.read(8))
+    offsets = [0, *itertools.accumulate(lengths)]
+    circuits = [tuple(decompile_circuit(codes[offsets[k]:offsets[k + 1]])) for k in range(n_solutions)]
+    seed_offsets = [0, *itertools.accumulate(seed_lengths)]
+    seeds = [tuple(decompile_circuit(seed_codes[seed_offsets[k]:seed_offsets[k + 1]])) for k in range(n_seeds)]
+    return Checkpoint(fingerprint.decode(), generation, evaluations, stagnation_count, best_seen, elapsed,
+                      None if first_generation < 0 else first_generation,
+                      None if math.isnan(first_time) else first_time, circuits, fitnesses, history,
+                      (3, words, None if math.isnan(gauss_next) else gauss_next),
+                      last_improvement, last_restart, restarts,
+                      None if n_archived < 0 else (tuple(decompile_circuit(archived)), archive_fitness),
+                      seeds, None if shortest_correct < 0 else shortest_correct, last_shorter)
+
+def restore_checkpoint(algorithm, checkpoint):
+    """Put the algorithm (built for the same truth table) in the state of the checkpoint"""
+    if checkpoint.fingerprint != table_fingerprint(algorithm.problem.truth_table):
+        raise ValueError("The checkpoint was written for another truth table or register")
+    solutions = []
+    for circuit, fitness_value in zip(checkpoint.circuits, checkpoint.fitnesses):
+        solution = CircuitSolution(circuit)
+        solution.objectives[0] = fitness_value
+        solutions.append(solution)
+    algorithm.solutions = solutions
+    algorithm.generation_count = checkpoint.generation
+    algorithm.evaluations = checkpoint.evaluations
+    algorithm.stagnation_count = checkpoint.stagnation_count
+    algorithm.best_seen = checkpoint.best_seen
+    algorithm.best_fitness_history = checkpoint.history
+    algorithm.last_improvement = checkpoint.last_improvement
+    algorithm.last_restart = checkpoint.last_restart
+    algorithm.restarts = checkpoint.restarts
+    algorithm.shortest_correct = checkpoint.shortest_correct
+    algorithm.last_shorter = checkpoint.last_shorter
+    algorithm.archive = None
+    if checkpoint.archive is not None:
+        algorithm.archive = CircuitSolution(checkpoint.archive[0])
+        algorithm.archive.objectives[0] = checkpoint.archive[1]
+    # The seeds handed out before the checkpoint are not handed out again
+    algorithm.problem.seed_circuits = list(checkpoint.seed_circuits)
+    algorithm.first_correct_generation = checkpoint.first_correct_generation
+    algorithm.first_correct_time = checkpoint.first_correct_time
+    algorithm.start_computing_time = time.time() - checkpoint.elapsed
+    random.setstate(checkpoint.rng_state)
+
+def resume_run(algorithm, checkpoint):
+    """algorithm.run() continued from a checkpoint (or the checkpoint file at that path)
+    instead of a new population"""
+    if isinstance(checkpoint, str):
+        checkpoint = load_checkpoint(checkpoint)
+    restore_checkpoint(algorithm, checkpoint)
+    # As in init_progress: the termination criterion learns the evaluations so far
+    algorithm.observable.notify_all(**algorithm.observable_data())
+    while not algorithm.stopping_condition_is_met():
+        algorithm.step()
+        algorithm.update_progress()
+    algorithm.total_computing_time = time.time() - algorithm.start_computing_time
+
+# Checkpoint file of a run, next to its log
+def checkpoint_path(log_path):
+    stem = log_path[:-len(".log")] if log_path.endswith(".log") else log_path
+    return f"{stem}.ckpt"
@@ -0,0 +1,173 @@
+# Persistent store of synthesized circuits shared by all runs (SQLite)
+
+import argparse
+import hashlib
+import os
+import sqlite3
+from array import array
+from util import TRUTH_TABLES, fitness, checked_lines
+from gateencoding import compile_circuit, decompile_circuit, read_circuit_file
+from statetransition import IDENTITY_BYTES, gate_translation
+from config import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS circuits (
+    fingerprint TEXT NOT NULL,
+    circuit BLOB NOT NULL,
+    length INTEGER NOT NULL,
+    fitness REAL NOT NULL,
+    PRIMARY KEY (fingerprint, circuit)
+);
+CREATE TABLE IF NOT EXISTS permutations (
+    gates TEXT NOT NULL,
+    permutation BLOB NOT NULL,
+    circuit BLOB NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (gates, permutation)
+);
+"""
+
+# Content address of the register and gate set: the stored opcodes and permutations only
+# mean the same circuits under the same lines, base and control value
+def gate_set_fingerprint():
+    content = repr((NUM_QULINES, QUBASE, CONTROL_VALUE))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+# Content address of a truth table (together with the register and the checked lines)
+def table_fingerprint(truth_table):
+    content = repr((NUM_QULINES, QUBASE, CONTROL_VALUE, checked_lines(truth_table),
+                    sorted(truth_table.items())))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def _pack(circuit):
+    return compile_circuit(circuit).tobytes()
+
+def _unpack(blob):
+    codes = array('H')
+    codes.frombytes(blob)
+    return decompile_circuit(codes)
+
+# Permutation of every window of up to max_window gates: (start, end, permutation)
+# (none for registers of more than 256 states, which have no byte permutations)
+def circuit_windows(circuit, max_window):
+    if IDENTITY_BYTES is None:
+        return
+    for i in range(len(circuit)):
+        perm = IDENTITY_BYTES
+        for j in range(i, min(len(circuit), i + max_window)):
+            perm = perm.translate(gate_translation(circuit[j]))
+            yield i, j + 1, perm
+
+class CircuitStore:
+    """Best circuits per truth table and shortest known circuit per state permutation.
+
+    Every process opens its own connection; the database is in WAL mode with a busy
+    timeout, so concurrent runs can record their results in the same file.
+    """
+    def __init__(self, path, max_window=STORE_MAX_WINDOW):
+        self.path = path
+        self.max_window = max_window
+        self.connection = None
+        self.pid = None
+        self.shortcuts = None
+
+    def connect(self):
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA busy_timeout=60000")
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(permutations)")]
+            if columns and "gates" not in columns:
+                # Stores from before the gate set was recorded: their shortcuts cannot be trusted
+                with self.connection:
+                    self.connection.execute("DROP TABLE permutations")
+            self.connection.executescript(SCHEMA)
+            self.pid = os.getpid()
+            self.shortcuts = None
+        return self.connection
+
+    def record(self, truth_table, circuit, fitness_value=None):
+        """Store a circuit found for truth_table, and its windows as permutation implementations"""
+        if not circuit:
+            return
+        if fitness_value is None:
+            fitness_value = fitness(circuit, truth_table)
+        connection = self.connect()
+        gates = gate_set_fingerprint()
+        with connection:
+            connection.execute("INSERT OR IGNORE INTO circuits VALUES (?, ?, ?, ?)",
+                               (table_fingerprint(truth_table), _pack(circuit), len(circuit), fitness_value))
+            connection.executemany(
+                "INSERT INTO permutations VALUES (?, ?, ?, ?) ON CONFLICT(gates, permutation) DO UPDATE "
+                "SET circuit = excluded.circuit, length = excluded.length WHERE excluded.length < length",
+                [(gates, perm, _pack(circuit[i:j]), j - i)
+                 for i, j, perm in circuit_windows(circuit, self.max_window)])
+        self.shortcuts = None
+
+    def best_circuits(self, truth_table, count):
+        rows = self.connect().execute(
+            "SELECT circuit FROM circuits WHERE fingerprint = ? ORDER BY fitness DESC, length LIMIT ?",
+            (table_fingerprint(truth_table), count)).fetchall()
+        return [_unpack(blob) for blob, in rows]
+
+    # Shortest known circuit for each permutation, loaded once per process
+    def shortcut_table(self):
+        if self.shortcuts is None:
+            rows = self.connect().execute("SELECT permutation, circuit FROM permutations WHERE gates = ?",
+                                          (gate_set_fingerprint(),)).fetchall()
+            self.shortcuts = {perm: _unpack(blob) for perm, blob in rows}
+            # Windows that do nothing are simply dropped
+            self.shortcuts[IDENTITY_BYTES] = []
+        return self.shortcuts
+
+    def shorten(self, circuit):
+        """Replace windows of the circuit with shorter known circuits of the same permutation.
+
+        The permutation of the whole circuit is unchanged, so its fitness can only improve.
+        """
+        if IDENTITY_BYTES is None:
+            return circuit
+        shortcuts = self.shortcut_table()
+        if not shortcuts:
+            return circuit
+        circuit = list(circuit)
+        i = 0
+        while i < len(circuit):
+            best = None
+            perm = IDENTITY_BYTES
+            for j in range(i, min(len(circuit), i + self.max_window)):
+                perm = perm.translate(gate_translation(circuit[j]))
+                known = shortcuts.get(perm)
+                if known is not None and len(known) < j + 1 - i:
+                    best = (j + 1, known)
+            if best is None:
+                i += 1
+            else:
+                circuit[i:best[0]] = best[1]
+        return circuit
+
+# Store of this process: none unless a run enables it (main.py --store)
+STORE = CircuitStore(CIRCUIT_STORE) if CIRCUIT_STORE else None
+
+def use_store(path):
+    """Make the store at path the store of this process (None disables it)"""
+    global STORE
+    if path != (STORE.path if STORE is not None else None):
+        STORE = CircuitStore(path) if path else None
+    return STORE
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import circuits into the circuit store or list them")
+    parser.add_argument("table", choices=sorted(TRUTH_TABLES), help="truth table the circuits realize")
+    parser.add_argument("files", nargs="*", help="circuit files to import (e.g. best_circuit_*.txt)")
+    parser.add_argument("--store", default=CIRCUIT_STORE or "circuit_store.db", help="database file")
+    args = parser.parse_args()
+
+    store = CircuitStore(args.store)
+    truth_table = TRUTH_TABLES[args.table]()
+    for path in args.files:
+        circuit = read_circuit_file(path)
+        store.record(truth_table, circuit)
+        print(f"{path}: {len(circuit)} gates, fitness {fitness(circuit, truth_table)}")
+    for circuit in store.best_circuits(truth_table, 10):
+        print(f"Length {len(circuit)}, fitness {fitness(circuit, truth_table)}")
@@ -0,0 +1,158 @@
+# n-qudit comparators chained from 1-qudit full comparator and subcomparator circuits
+
+import argparse
+import numpy as np
+from batchsimulator import simulate_batch
+from peephole import peephole_optimize
+from gateencoding import read_circuit_file, write_circuit_file
+from util import LOWER_VALUE, GREATER_VALUE, EQUAL_VALUE
+from config import *
+
+# Comparison results, as in generate_ququart_truth_table
+LOWER, GREATER, EQUAL = LOWER_VALUE, GREATER_VALUE, EQUAL_VALUE
+
+class ComparatorLayout:
+    """Lines of an n-qudit comparator of A and B (digit 0 the most significant).
+
+    Digit k uses lines 3k, 3k+1, 3k+2 for a_k, b_k and the result c_k of the 1-qudit full
+    comparator; merges[j] is the ancilla receiving the subcomparator result of digits 0..j+1,
+    the last one being the output (c_0 for a single digit). Ancillas start from 0.
+    """
+    def __init__(self, digits):
+        self.digits = digits
+        self.a = [3 * k for k in range(digits)]
+        self.b = [3 * k + 1 for k in range(digits)]
+        self.c = [3 * k + 2 for k in range(digits)]
+        self.merges = [3 * digits + j for j in range(digits - 1)]
+        self.num_lines = 3 * digits + len(self.merges)
+        self.output = self.merges[-1] if self.merges else self.c[0]
+
+# Circuit acting on lines[0], lines[1], ... instead of lines 0, 1, ...
+def relabel(circuit, lines):
+    return [(lines[ctrl], lines[tgt], gtype) for ctrl, tgt, gtype in circuit]
+
+def compose_comparator(digits, full_comparator, subcomparator):
+    """Layout and blocks (circuits on the layout lines) of the n-qudit comparator, in order.
+
+    Each digit runs the full comparator on (a_k, b_k, c_k); from the second digit on, the
+    subcomparator merges c_k with the result of the more significant digits (c_0 or the
+    previous merge), which is its second input: the result is c_k when those digits are
+    equal, theirs otherwise. Both circuits only have to be correct on their ancilla line.
+    """
+    layout = ComparatorLayout(digits)
+    blocks = []
+    for k in range(digits):
+        blocks.append(relabel(full_comparator, [layout.a[k], layout.b[k], layout.c[k]]))
+        if k > 0:
+            previous = layout.c[0] if k == 1 else layout.merges[k - 2]
+            blocks.append(relabel(subcomparator, [layout.c[k], previous, layout.merges[k - 1]]))
+    return layout, blocks
+
+# Lines touched by a gate
+def gate_lines(gate):
+    return {gate[0], gate[1]}
+
+def seam_window(circuit, seam, max_lines):
+    """Indices of the gates that can be gathered at a seam, and the lines they touch.
+
+    Gates are picked outwards from the seam while they touch at most max_lines lines in
+    total. A gate on other lines is skipped, and its lines are blocked on that side, so
+    the picked gates beyond it commute with it. The scan of a side stops at a gate that
+    shares lines with the window but does not fit.
+    """
+    picked, lines = [], set()
+    for indices in (range(seam - 1, -1, -1), range(seam, len(circuit))):
+        blocked = set()
+        for i in indices:
+            touched = gate_lines(circuit[i])
+            if touched & blocked:
+                break
+            if len(lines | touched) <= max_lines:
+                lines |= touched
+                picked.append(i)
+            elif touched & lines:
+                break
+            else:
+                blocked |= touched
+    return sorted(picked), lines
+
+def optimize_seams(blocks, max_lines=NUM_QULINES, lookahead=PEEPHOLE_LOOKAHEAD):
+    """Peephole pass over the gates gathered around each seam between two blocks.
+
+    The window is relabelled onto lines 0..max_lines-1, so the rewrite tables of the
+    configured register apply, and the rewritten gates are mapped back and placed at the
+    seam. The permutation of the touched lines is preserved, so the composed circuit
+    computes the same function.
+    """
+    circuit = [g for block in blocks for g in block]
+    seam = 0
+    for block in blocks[:-1]:
+        seam += len(block)
+        picked, lines = seam_window(circuit, seam, max_lines)
+        if len(picked) < 2:
+            continue
+        wires = sorted(lines)
+        local = relabel([circuit[i] for i in picked], {line: i for i, line in enumerate(wires)})
+        optimized = relabel(peephole_optimize(local, lookahead), wires)
+        if len(optimized) < len(picked):
+            chosen = set(picked)
+            before = [g for i, g in enumerate(circuit[:seam]) if i not in chosen]
+            after = [g for i, g in enumerate(circuit[seam:], seam) if i not in chosen]
+            circuit = before + optimized + after
+            seam = len(before) + len(optimized)
+    return circuit
+
+def comparator_rows(layout, max_rows=COMPOSE_VERIFY_ROWS, rng=None):
+    """Input states and expected outputs of the comparator, as arrays.
+
+    Every pair (A, B) when there are at most max_rows, otherwise max_rows random pairs,
+    half of them with B sharing a random number of leading digits with A (so that the
+    merges of equal digits are exercised too).
+    """
+    digits = layout.digits
+    count = QUBASE ** (2 * digits)
+    if count <= max_rows:
+        pairs = np.arange(count, dtype=np.int64)
+        a, b = pairs // QUBASE ** digits, pairs % QUBASE ** digits
+    else:
+        rng = rng if rng is not None else np.random.default_rng(0)
+        a = rng.integers(0, QUBASE ** digits, max_rows)
+        b = rng.integers(0, QUBASE ** digits, max_rows)
+        half = max_rows // 2
+        shared = QUBASE ** rng.integers(0, digits + 1, half)
+        b[:half] = a[:half] // shared * shared + b[:half] % shared
+    weights = QUBASE ** np.arange(digits - 1, -1, -1)
+    inputs = np.zeros((len(a), layout.num_lines), dtype=np.int64)
+    inputs[:, layout.a] = a[:, None] // weights % QUBASE
+    inputs[:, layout.b] = b[:, None] // weights % QUBASE
+    expected = np.where(a == b, EQUAL, np.where(a > b, GREATER, LOWER))
+    return inputs, expected
+
+# Fraction of the rows on which the output line of the circuit holds the comparison result
+def verify_comparator(circuit, layout, max_rows=COMPOSE_VERIFY_ROWS):
+    inputs, expected = comparator_rows(layout, max_rows)
+    outputs = simulate_batch(circuit, inputs)
+    return np.count_nonzero(outputs[:, layout.output] == expected) / len(expected)
+
+def build_comparator(digits, full_path=COMPOSE_FULL_COMPARATOR, sub_path=COMPOSE_SUBCOMPARATOR, seams=True):
+    """n-qudit comparator from the stored 1-qudit circuits: (circuit, layout, accuracy)"""
+    layout, blocks = compose_comparator(digits, read_circuit_file(full_path), read_circuit_file(sub_path))
+    circuit = optimize_seams(blocks) if seams else [g for block in blocks for g in block]
+    return circuit, layout, verify_comparator(circuit, layout)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chain 1-qudit comparators into an n-qudit comparator")
+    parser.add_argument("digits", type=int, help="number of qudits of each operand")
+    parser.add_argument("--full", default=COMPOSE_FULL_COMPARATOR, help="1-qudit full comparator circuit file")
+    parser.add_argument("--sub", default=COMPOSE_SUBCOMPARATOR, help="subcomparator circuit file")
+    parser.add_argument("--no-seams", action="store_true", help="skip the peephole pass over the seams")
+    parser.add_argument("--output", help="file to write the composed circuit to")
+    args = parser.parse_args()
+
+    circuit, layout, accuracy = build_comparator(args.digits, args.full, args.sub, not args.no_seams)
+    print(f"{args.digits}-qudit comparator: {layout.num_lines} lines, output on line {layout.output}, "
+          f"{len(circuit)} gates, correct on {accuracy:.2%} of the checked rows")
+    if args.output:
+        write_circuit_file(args.output, circuit,
+                           f"{args.digits}-qudit comparator (Lines: {layout.num_lines}, Output: {layout.output}, "
+                           f"Length: {len(circuit)})")
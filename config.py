@@ -1,10 +1,51 @@
 # Parameters
 NUM_QULINES = 3
 QUBASE = 4
+CONTROL_VALUE = QUBASE - 1
+ANCILLA_LINES = (2,)
+OUTPUT_LINES = (2,)
 MAX_GENES = 50
 MIN_GENES = 1
 POP_SIZE = 1000
 GENERATIONS = 50000
+TIME_LIMIT = 0
+TARGET_LENGTH = 0
+LENGTH_PATIENCE = None
+RESTART_PATIENCE = 0
+PARETO_GENERATIONS = 500
+DEPTH_TIEBREAK = False
 MUTATION_RATE = 0.2
 CROSSOVER_RATE = 0.7
 STAGNATION_LIMIT = 15
+LOCAL_SEARCH_STRATEGY = "steepest"
+LOCAL_SEARCH_NEIGHBOURHOOD = 0
+LOCAL_SEARCH_ITERATIONS = 10
+FITNESS_BACKEND = "auto"
+MAX_TABLE_STATES = 4096
+EARLY_EXIT_EVALUATION = True
+FITNESS_CACHE_SIZE = 100000
+CANONICAL_DEDUPE = False
+EVALUATOR_PROCESSES = 1
+EVALUATOR_CHUNK_SIZE = 250
+RUN_PROCESSES = 1
+BASE_SEED = 0
+TELEMETRY_FORMAT = "jsonl"
+TELEMETRY_INTERVAL = 1
+TELEMETRY_BUFFER = 1000
+CONSOLE_PROGRESS = False
+CHECKPOINT_INTERVAL = 100
+ISLANDS = 1
+MIGRATION_INTERVAL = 50
+MIGRATION_SIZE = 5
+MIGRATION_TOPOLOGY = "ring"
+EXACT_MAX_LENGTH = 8
+EXACT_MAX_NODES = 8000000
+EXACT_SEEDS = 0
+CIRCUIT_STORE = None
+STORE_MAX_WINDOW = 6
+STORE_WARM_START = 0
+PEEPHOLE_LOOKAHEAD = 4
+PEEPHOLE_OFFSPRING = True
+COMPOSE_FULL_COMPARATOR = "results/best_circuit_FullComparator.txt"
+COMPOSE_SUBCOMPARATOR = "results/best_circuit_SubComparator.txt"
+COMPOSE_VERIFY_ROWS = 65536
@@ -0,0 +1,159 @@
+# Exact synthesis of minimal circuits by meet-in-the-middle breadth-first search
+
+import argparse
+import numpy as np
+from util import ALL_GATES, TRUTH_TABLES
+from statetransition import NUM_STATES, GATE_TRANSLATIONS, state_truth_table
+from gateencoding import gate_to_text
+from config import *
+
+# Translation tables of the gate alphabet, in opcode order
+GATE_TABLES = [GATE_TRANSLATIONS[g] for g in ALL_GATES] if GATE_TRANSLATIONS is not None else None
+
+# Pads a backward node to the 256 entries of a translation table
+PADDING = bytes(256 - NUM_STATES)
+
+class SearchLimitReached(Exception):
+    """A search layer would exceed the memory cap"""
+
+class Frontier:
+    """Breadth-first layers of one search direction.
+
+    parents maps every node seen so far to (previous node, opcode), so that the gates
+    leading to a node can be recovered; layers[d] holds the nodes first reached with d
+    gates, which are the only ones a minimal circuit can use at that depth.
+    """
+    def __init__(self, start, step, max_nodes):
+        self.parents = {start: None}
+        self.layers = [[start]]
+        self.step = step
+        self.max_nodes = max_nodes
+
+    def layer(self, depth):
+        while len(self.layers) <= depth:
+            nodes = []
+            for node in self.layers[-1]:
+                for op, table in enumerate(GATE_TABLES):
+                    child = self.step(node, table)
+                    if child not in self.parents:
+                        self.parents[child] = (node, op)
+                        nodes.append(child)
+                if len(self.parents) > self.max_nodes:
+                    raise SearchLimitReached(f"more than {self.max_nodes} nodes at depth {len(self.layers)}")
+            self.layers.append(nodes)
+        return self.layers[depth]
+
+    # Opcodes from the start node to node, in the order they were applied
+    def path(self, node):
+        ops = []
+        while self.parents[node] is not None:
+            node, op = self.parents[node]
+            ops.append(op)
+        return ops[::-1]
+
+# Forward nodes: the state of every truth-table row after a prefix of the circuit
+def forward_step(rows, table):
+    return rows.translate(table)
+
+# Backward nodes: the value of the output lines after a suffix, as a function of the state it starts
+# from. Prepending gate g to the suffix gives h'(x) = h(g(x)).
+def backward_step(observable, table):
+    return table[:NUM_STATES].translate(observable + PADDING)
+
+def join(forward_nodes, backward_nodes, expected, num_values, batch_bytes=1 << 25):
+    """First pair (forward, backward) forming a correct circuit, or None.
+
+    Row r is correct when h(v[r]) == expected[r]. The backward nodes are indexed as
+    bitsets: index[s, e] has bit i set when node i maps state s to e. The nodes
+    matching a forward node v are then the AND of index[v[r], expected[r]] over the
+    rows, computed for a batch of forward nodes at a time.
+    """
+    if not forward_nodes or not backward_nodes:
+        return None
+    observables = np.frombuffer(b"".join(backward_nodes), dtype=np.uint8).reshape(len(backward_nodes), -1)
+    words = (len(backward_nodes) + 63) // 64
+    index = np.zeros((NUM_STATES, num_values, words * 8), dtype=np.uint8)
+    for e in range(num_values):
+        index[:, e, :(len(backward_nodes) + 7) // 8] = np.packbits(observables.T == e, axis=1, bitorder="little")
+    index = index.view(np.uint64)
+
+    states = np.frombuffer(b"".join(forward_nodes), dtype=np.uint8).reshape(len(forward_nodes), -1)
+    batch = max(1, batch_bytes // (8 * words))
+    for start in range(0, len(forward_nodes), batch):
+        rows = states[start:start + batch]
+        matches = index[rows[:, 0], expected[0]]
+        for r in range(1, len(expected)):
+            matches &= index[rows[:, r], expected[r]]
+        found = np.flatnonzero(matches.any(axis=1))
+        if len(found):
+            v = found[0]
+            word = int(np.flatnonzero(matches[v])[0])
+            bits = int(matches[v, word])
+            h = word * 64 + (bits & -bits).bit_length() - 1
+            return forward_nodes[start + v], backward_nodes[h]
+    return None
+
+def _search(truth_table, max_length, max_nodes):
+    table = state_truth_table(truth_table)
+    if GATE_TABLES is None or table.values_bytes is None:
+        raise ValueError("Exact synthesis needs byte state translations (at most 256 states, within "
+                         "MAX_TABLE_STATES) and at most 256 values of the checked lines")
+    forward = Frontier(bytes(table.inputs.tolist()), forward_step, max_nodes)
+    backward = Frontier(table.values_bytes, backward_step, max_nodes)
+
+    for length in range(1, max_length + 1):
+        try:
+            forward_nodes = forward.layer((length + 1) // 2)
+            backward_nodes = backward.layer(length // 2)
+        except SearchLimitReached:
+            return None, length - 1, forward
+        pair = join(forward_nodes, backward_nodes, table.expected, table.num_values)
+        if pair is not None:
+            rows, observable = pair
+            ops = forward.path(rows) + backward.path(observable)[::-1]
+            return [ALL_GATES[op] for op in ops], length, forward
+    return None, max_length, forward
+
+def synthesize(truth_table, max_length=EXACT_MAX_LENGTH, max_nodes=EXACT_MAX_NODES):
+    """Shortest circuit realizing truth_table, by meet-in-the-middle search.
+
+    Lengths are tried in increasing order; length L joins the forward layer of depth
+    ceil(L/2) with the backward layer of depth floor(L/2). Returns (circuit, bound):
+    the circuit is None when none exists with at most bound gates, bound being
+    max_length or the last length completed before a layer exceeded max_nodes.
+    """
+    circuit, bound, _ = _search(truth_table, max_length, max_nodes)
+    return circuit, bound
+
+def seed_circuits(truth_table, count, max_length=EXACT_MAX_LENGTH, max_nodes=EXACT_MAX_NODES):
+    """Circuits for the GA's initial population: the minimal circuit if the search finds one,
+    then the prefixes of the deepest forward layer explored with the most correct rows.
+    """
+    circuit, _, forward = _search(truth_table, max_length, max_nodes)
+    seeds = [circuit] if circuit is not None else []
+
+    table = state_truth_table(truth_table)
+    nodes = forward.layers[-1]
+    states = np.frombuffer(b"".join(nodes), dtype=np.uint8).reshape(len(nodes), -1)
+    values = np.frombuffer(table.values_bytes, dtype=np.uint8)
+    correct = np.count_nonzero(values[states] == table.expected, axis=1)
+    for i in np.argsort(-correct, kind="stable")[:max(0, count - len(seeds))].tolist():
+        if forward.parents[nodes[i]] is not None:
+            seeds.append([ALL_GATES[op] for op in forward.path(nodes[i])])
+    return seeds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find a minimal circuit by exhaustive search")
+    parser.add_argument("table", choices=sorted(TRUTH_TABLES), help="truth table to synthesize")
+    parser.add_argument("--max-length", type=int, default=EXACT_MAX_LENGTH, help="longest circuit to try")
+    parser.add_argument("--max-nodes", type=int, default=EXACT_MAX_NODES,
+                        help="nodes kept per search direction before giving up")
+    args = parser.parse_args()
+
+    circuit, bound = synthesize(TRUTH_TABLES[args.table](), args.max_length, args.max_nodes)
+    if circuit is None:
+        print(f"No circuit with at most {bound} gates")
+    else:
+        print(f"Minimal circuit (Length: {len(circuit)})")
+        for i, g in enumerate(circuit):
+            print(gate_to_text(i + 1, g))
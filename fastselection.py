@@ -0,0 +1,76 @@
+import random
+import numpy as np
+from jmetal.core.operator import Selection
+
+# Fitness of each solution as an array (unevaluated solutions rank last)
+def fitness_array(solutions):
+    fitnesses = np.array([s.objectives[0] for s in solutions], dtype=float)
+    fitnesses[np.isnan(fitnesses)] = -np.inf
+    return fitnesses
+
+def top_solutions(solutions, count, fitnesses=None):
+    """The count fittest solutions, best first.
+
+    Same order as a stable sort by descending fitness (equal fitnesses keep their
+    relative order), computed on the fitness array instead of a Python key function.
+    """
+    if fitnesses is None:
+        fitnesses = fitness_array(solutions)
+    order = np.argsort(-fitnesses, kind="stable")[:count]
+    return [solutions[i] for i in order.tolist()]
+
+def ranked_solutions(solutions, chunk_size, fitnesses=None):
+    """The solutions in the order of top_solutions, ranked chunk_size at a time.
+
+    Each chunk is split off the remaining solutions with a partition, so a consumer that
+    stops after the first chunks never sorts the rest. Ties at the edge of a chunk go to
+    the earlier solutions, as in a stable sort.
+    """
+    if fitnesses is None:
+        fitnesses = fitness_array(solutions)
+    keys = -fitnesses
+    remaining = np.arange(len(solutions))
+    while len(remaining):
+        if len(remaining) > chunk_size:
+            remaining_keys = keys[remaining]
+            edge = np.partition(remaining_keys, chunk_size - 1)[chunk_size - 1]
+            taken = remaining_keys < edge
+            ties = np.flatnonzero(remaining_keys == edge)
+            taken[ties[:chunk_size - np.count_nonzero(taken)]] = True
+            chunk, remaining = remaining[taken], remaining[~taken]
+        else:
+            chunk, remaining = remaining, remaining[:0]
+        for i in chunk[np.argsort(keys[chunk], kind="stable")].tolist():
+            yield solutions[i]
+
+class VectorizedBinaryTournamentSelection(Selection):
+    """Binary tournament drawing all the tournaments of a mating pool at once.
+
+    Each tournament compares two distinct solutions the way jMetal's
+    BinaryTournamentSelection does with its default DominanceComparator: the smaller
+    objective wins and ties are broken at random. The numpy generator is seeded from
+    the random module, so seeded runs stay reproducible.
+    """
+    def execute(self, front):
+        return self.select(front, 1)[0]
+
+    def select(self, front, count):
+        if front is None:
+            raise Exception("The front is null")
+        elif len(front) == 0:
+            raise Exception("The front is empty")
+        if len(front) == 1:
+            return [front[0]] * count
+
+        rng = np.random.default_rng(random.getrandbits(64))
+        first = rng.integers(0, len(front), count)
+        second = rng.integers(0, len(front) - 1, count)
+        second += second >= first
+        fitnesses = fitness_array(front)
+        f1, f2 = fitnesses[first], fitnesses[second]
+        pick_second = np.where(f1 == f2, rng.random(count) < 0.5, f2 < f1)
+        winners = np.where(pick_second, second, first)
+        return [front[i] for i in winners.tolist()]
+
+    def get_name(self):
+        return "Vectorized binary tournament selection"
@@ -0,0 +1,66 @@
+import util
+import batchsimulator
+import statetransition
+from fitnesscache import FitnessCache
+from config import *
+
+# Available fitness implementations, all with the signature fitness(circuit, truth_table)
+FITNESS_BACKENDS = {
+    "python": util.fitness,
+    "batch": batchsimulator.fitness,
+    "table": statetransition.fitness,
+}
+
+# "auto": the state tables while they fit in MAX_TABLE_STATES, then all truth-table rows
+# at once
+def resolve_backend(backend):
+    if backend == "auto":
+        return "table" if statetransition.GATE_TRANSITIONS is not None else "batch"
+    return backend
+
+def get_fitness(backend=FITNESS_BACKEND):
+    backend = resolve_backend(backend)
+    if backend not in FITNESS_BACKENDS:
+        raise ValueError(f"Unknown fitness backend '{backend}', expected one of {list(FITNESS_BACKENDS)}")
+    return FITNESS_BACKENDS[backend]
+
+# Early-exit versions, all with the signature bounded_fitness(circuit, truth_table, threshold)
+# (the batch backend has no row-by-row mode and shares the state table one)
+BOUNDED_BACKENDS = {
+    "python": util.bounded_fitness,
+    "batch": statetransition.bounded_fitness,
+    "table": statetransition.bounded_fitness,
+}
+
+def get_bounded_fitness(backend=FITNESS_BACKEND):
+    backend = resolve_backend(backend)
+    if backend not in BOUNDED_BACKENDS:
+        raise ValueError(f"Unknown fitness backend '{backend}', expected one of {list(BOUNDED_BACKENDS)}")
+    return BOUNDED_BACKENDS[backend]
+
+# Cache shared by every evaluation path (problem, mutation operators, local search)
+FITNESS_CACHE = FitnessCache(get_fitness())
+
+fitness = FITNESS_CACHE.fitness if FITNESS_CACHE_SIZE > 0 else get_fitness()
+
+_bounded_fitness = get_bounded_fitness() if EARLY_EXIT_EVALUATION else None
+
+# Fitness if it is above threshold, otherwise an upper bound not above threshold (see
+# util.bounded_fitness). Cached values are used as they are; exact results are cached.
+def bounded_fitness(circuit, truth_table, threshold=1.0):
+    if _bounded_fitness is None:
+        return fitness(circuit, truth_table)
+    key = None
+    if FITNESS_CACHE.max_size > 0:
+        key = FITNESS_CACHE.key(circuit, truth_table)
+        value = FITNESS_CACHE.lookup(key)
+        if value is not None:
+            return value
+    value = _bounded_fitness(circuit, truth_table, threshold)
+    if key is not None and value > threshold:
+        FITNESS_CACHE.store(key, value)
+    return value
+
+# Correctness probe, stopping at the first wrong row
+def is_correct(circuit, truth_table):
+    return bounded_fitness(circuit, truth_table, 1.0) >= 1.0
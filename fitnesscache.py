@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from canonicalform import canonical_ops
+from util import checked_lines, derived_data
+from config import *
+
+# Contents of the truth tables seen so far -> small integer id
+_TABLE_IDS = {}
+
+def _content_id(truth_table):
+    content = (checked_lines(truth_table), tuple(sorted(truth_table.items())))
+    return _TABLE_IDS.setdefault(content, len(_TABLE_IDS))
+
+# Identity of a truth table: equal tables (checked on the same lines) share the same key
+def table_key(truth_table):
+    return derived_data(truth_table, "key", _content_id)
+
+# Opcodes of the canonical form of a circuit: circuits equal up to commuting gates share
+# their fitness
+def circuit_key(circuit):
+    return canonical_ops(circuit)
+
+class FitnessCache:
+    """Bounded LRU cache of fitness values keyed by canonical circuit and truth table"""
+    def __init__(self, fitness_function, max_size=FITNESS_CACHE_SIZE):
+        self.fitness_function = fitness_function
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, circuit, truth_table):
+        return (table_key(truth_table), circuit_key(circuit))
+
+    # Cached value for key, or None (counted as a miss)
+    def lookup(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def fitness(self, circuit, truth_table):
+        key = self.key(circuit, truth_table)
+        value = self.lookup(key)
+        if value is None:
+            value = self.fitness_function(circuit, truth_table)
+            self.store(key, value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,94 @@
+import re
+from array import array
+from util import QSG_TABLE, GATE_INFO, CONTROLLED_PREFIX, ALL_GATES, intern_gate, normalize_gate
+from config import *
+
+# Permutation ids follow the order of QSG_TABLE
+PERM_NAMES = list(QSG_TABLE)
+PERM_ID = {label: i for i, label in enumerate(PERM_NAMES)}
+PERMS = [tuple(QSG_TABLE[label]) for label in PERM_NAMES]
+NUM_PERMS = len(PERMS)
+IDENTITY_PERM = PERMS.index(tuple(range(QUBASE)))
+
+# COMPOSE_TABLE[i][j]: id of the permutation obtained applying i and then j
+_PERM_INDEX = {p: i for i, p in enumerate(PERMS)}
+COMPOSE_TABLE = [[_PERM_INDEX[tuple(PERMS[j][x] for x in PERMS[i])] for j in range(NUM_PERMS)]
+                 for i in range(NUM_PERMS)]
+INVERSE_TABLE = [row.index(IDENTITY_PERM) for row in COMPOSE_TABLE]
+
+# Opcode of a gate: its index in ALL_GATES
+NUM_OPCODES = len(ALL_GATES)
+OPCODES = {gate: op for op, gate in enumerate(ALL_GATES)}
+
+# Decoded fields of each opcode
+OPCODE_CTRL = array('B', [g[0] for g in ALL_GATES])
+OPCODE_TGT = array('B', [g[1] for g in ALL_GATES])
+OPCODE_CONTROLLED = array('B', [GATE_INFO[g[2]][0] for g in ALL_GATES])
+OPCODE_PERM = array('H', [PERM_ID[g[2][len(CONTROLLED_PREFIX):] if GATE_INFO[g[2]][0] else g[2][1:]] for g in ALL_GATES])
+
+# Opcode of the gate with the given fields
+def make_opcode(ctrl, tgt, perm_id, controlled):
+    gtype = (CONTROLLED_PREFIX if controlled else "Z") + PERM_NAMES[perm_id]
+    return encode_gate((ctrl, tgt, gtype))
+
+def encode_gate(gate):
+    op = OPCODES.get(gate)
+    if op is None:
+        op = OPCODES.get(normalize_gate(gate))
+        if op is None:
+            raise ValueError(f"Gate {gate} is not in the gate set")
+    return op
+
+def decode_gate(op):
+    return ALL_GATES[op]
+
+# Compact form of a circuit: one unsigned 16-bit opcode per gate
+def compile_circuit(circuit):
+    return array('H', [encode_gate(g) for g in circuit])
+
+def decompile_circuit(codes):
+    return [ALL_GATES[op] for op in codes]
+
+# Simulate a compiled circuit on a single input state
+def simulate_compiled(codes, input_state):
+    lines = list(input_state)
+    for op in codes:
+        if OPCODE_CONTROLLED[op] and lines[OPCODE_CTRL[op]] != CONTROL_VALUE:
+            continue
+        tgt = OPCODE_TGT[op]
+        lines[tgt] = PERMS[OPCODE_PERM[op]][lines[tgt]]
+    return tuple(lines)
+
+# Text form used in the best_circuit_*.txt files
+_GATE_LINE = re.compile(r"^\s*\d+:\s*Control=(\d+),\s*Target=(\d+),\s*Gate=(\S+)\s*$")
+
+def gate_to_text(index, gate):
+    return f"{index}: Control={gate[0]}, Target={gate[1]}, Gate={gate[2]}"
+
+def circuit_to_text(circuit, header=None):
+    lines = [f"# {header}"] if header is not None else []
+    lines += [gate_to_text(i + 1, g) for i, g in enumerate(circuit)]
+    return "\n".join(lines) + "\n"
+
+def circuit_from_text(text):
+    circuit = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _GATE_LINE.match(line)
+        if match is None:
+            raise ValueError(f"Cannot parse gate line: {line}")
+        ctrl, tgt, gtype = int(match.group(1)), int(match.group(2)), match.group(3)
+        if gtype not in GATE_INFO:
+            raise ValueError(f"Unknown gate type: {gtype}")
+        circuit.append(intern_gate((ctrl, tgt, gtype)))
+    return circuit
+
+def read_circuit_file(path):
+    with open(path) as f:
+        return circuit_from_text(f.read())
+
+def write_circuit_file(path, circuit, header=None):
+    with open(path, "w") as f:
+        f.write(circuit_to_text(circuit, header))
@@ -1,29 +1,66 @@
 import random
+import time
 from jmetal.algorithm.singleobjective.genetic_algorithm import GeneticAlgorithm
+from jmetal.config import store
 from quantumcircuitproblem import QuantumCircuitProblem
+from safemutation import CircuitMutation
+from circuitcrossover import CircuitCrossover
+from termination import TerminationByFitness, AdaptiveTermination
 from util import *
+import neighbourhood
+from fastselection import fitness_array, top_solutions, ranked_solutions, VectorizedBinaryTournamentSelection
+from peephole import peephole_optimize
+from canonicalform import distinct_first
+from fitnessbackend import FITNESS_CACHE
+from telemetry import PHASES
+from checkpoint import save_checkpoint
 from config import *
 
 class ElitistGeneticAlgorithm(GeneticAlgorithm):
     def __init__(self, problem, population_size, offspring_population_size, 
-                 mutation, crossover, termination_criterion, selection, elite_size=5):
+                 mutation, crossover, termination_criterion, selection, elite_size=5,
+                 population_evaluator=store.default_evaluator, telemetry=None, checkpoint=None):
         super().__init__(problem, population_size, offspring_population_size,
-                        mutation, crossover, selection, termination_criterion)
+                        mutation, crossover, selection, termination_criterion,
+                        population_evaluator=population_evaluator)
         self.elite_size = elite_size
+        # telemetry.TelemetryWriter receiving a record per sampled generation (or None)
+        self.telemetry = telemetry
+        # File the state of the run is saved to every CHECKPOINT_INTERVAL generations (or None)
+        self.checkpoint = checkpoint
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.events = []
+        self.cache_counts = (FITNESS_CACHE.hits, FITNESS_CACHE.misses)
         self.best_fitness_history = []
         self.generation_count = 0
         self.stagnation_count = 0
         self.best_seen = 0.0
+        # Generation of the last new best fitness and of the last restart
+        self.last_improvement = 0
+        self.last_restart = 0
+        # Length of the shortest correct circuit so far (None before the first one) and the
+        # generation it was found
+        self.shortest_correct = None
+        self.last_shorter = 0
+        self.restarts = 0
+        # Best solution of the populations discarded by restarts
+        self.archive = None
+        self.first_correct_generation = None
+        self.first_correct_time = None
 
     def replacement(self, population, offspring_population):
         self.generation_count += 1
 
-        # Combine populations
-        all_solutions = population + offspring_population
-
-        # Sort by fitness (descending for maximization)
-        all_solutions.sort(key=lambda x: x.objectives[0] if x.objectives[0] is not None else float('-inf'), 
-                          reverse=True)
+        # Combine populations and keep the best population_size, sorted by descending fitness
+        # (every branch below only looks at these)
+        combined = population + offspring_population
+        if CANONICAL_DEDUPE:
+            # One solution per circuit up to commuting gates, duplicates only to fill up (the
+            # ranking stops at the chunk where population_size distinct solutions are found)
+            ranked = ranked_solutions(combined, self.population_size)
+            all_solutions = distinct_first(ranked, self.population_size, key=lambda s: s.variables[0])
+        else:
+            all_solutions = top_solutions(combined, self.population_size)
 
         # Check for stagnation
         current_best = all_solutions[0].objectives[0] if all_solutions[0].objectives[0] is not None else 0.0
@@ -32,19 +69,20 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
         else:
             self.best_seen = current_best
             self.stagnation_count = 0
-            print(f"NEW BEST FITNESS: {current_best:.6f} at generation {self.generation_count}")
+            self.last_improvement = self.generation_count
+            self.log("new_best", f"NEW BEST FITNESS: {current_best:.6f} at generation {self.generation_count}")
 
             # Apply local search to new best solutions
             if current_best > 0.8:  # Only for high-fitness solutions
-                print("Applying local search to best solution...")
                 improved = self.local_search(all_solutions[0])
                 if improved.objectives[0] > current_best:
                     all_solutions[0] = improved
-                    print(f"Local search improvement: {improved.objectives[0]:.6f}")
+                    self.log("local_search", f"Local search improvement: {improved.objectives[0]:.6f}")
 
         # Diversity injection if stagnated
         if self.stagnation_count > STAGNATION_LIMIT and current_best > 0.8:
-            print(f"AGGRESSIVE DIVERSITY INJECTION at generation {self.generation_count}")
+            self.log("aggressive_diversity_injection",
+                     f"AGGRESSIVE DIVERSITY INJECTION at generation {self.generation_count}")
             elite_solutions = all_solutions[:self.elite_size]
 
             # Replace 50% with diverse solutions when close to optimum
@@ -60,7 +98,7 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
             new_population = elite_solutions + diverse_solutions + remaining_solutions
             self.stagnation_count = 0
         elif self.stagnation_count > STAGNATION_LIMIT:
-            print(f"DIVERSITY INJECTION at generation {self.generation_count}")
+            self.log("diversity_injection", f"DIVERSITY INJECTION at generation {self.generation_count}")
             # Keep elite but replace 30% with new random solutions
             elite_solutions = all_solutions[:self.elite_size]
             diverse_solutions = []
@@ -79,55 +117,148 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
             # Standard elitist selection
             new_population = all_solutions[:self.population_size]
 
+        # Restart from a fresh population when the best fitness has stalled for RESTART_PATIENCE generations
+        if RESTART_PATIENCE > 0 and self.generation_count - max(self.last_improvement, self.last_restart) >= RESTART_PATIENCE:
+            new_population = self.restart(all_solutions[0])
+
+        # Time to the first fully correct circuit
+        best = all_solutions[0].objectives[0]
+        if self.first_correct_generation is None and best is not None and best >= 1.0:
+            self.first_correct_generation = self.generation_count
+            self.first_correct_time = time.time() - self.start_computing_time
+        # The fittest correct circuit is the shortest (see scheduling.DEPTH_TIEBREAK_SCALE)
+        if best is not None and best >= 1.0:
+            length = len(all_solutions[0].variables[0])
+            if self.shortest_correct is None or length < self.shortest_correct:
+                self.shortest_correct = length
+                self.last_shorter = self.generation_count
+
         # Track fitness
         self.best_fitness_history.append(current_best)
 
         # Progress reporting
-        if self.generation_count % 50 == 0:
+        if CONSOLE_PROGRESS and self.generation_count % 50 == 0:
             avg_fitness = sum(sol.objectives[0] for sol in new_population[:10] if sol.objectives[0] is not None) / 10
             diversity = self.calculate_diversity(new_population[:20])
             print(f"Gen {self.generation_count:3d}: Best={current_best:.4f}, Avg={avg_fitness:.4f}, Diversity={diversity:.3f}")
 
         return new_population
     
+    def restart(self, best):
+        """New random population from a fresh seed; the best solution so far is archived
+        (it stays the result until a better one is found) rather than kept in the population"""
+        if self.archive is None or best.objectives[0] > self.archive.objectives[0]:
+            self.archive = best
+        seed = random.getrandbits(32)
+        random.seed(seed)
+        self.restarts += 1
+        self.last_restart = self.generation_count
+        self.stagnation_count = 0
+        self.log("restart", f"RESTART {self.restarts} at generation {self.generation_count} (seed {seed})")
+        return top_solutions(self.evaluate(self.create_initial_solutions()), self.population_size)
+
+    def result(self):
+        best = super().result()
+        if self.archive is not None and (best.objectives[0] is None or self.archive.objectives[0] > best.objectives[0]):
+            return self.archive
+        return best
+
+    def observable_data(self):
+        # Progress read by AdaptiveTermination
+        data = super().observable_data()
+        data.update(GENERATION=self.generation_count, BEST_SEEN=self.best_seen,
+                    SHORTEST_CORRECT=self.shortest_correct, LAST_SHORTER=self.last_shorter)
+        return data
+
+    # Events go to the telemetry; the console only gets them with CONSOLE_PROGRESS
+    def log(self, event, message):
+        self.events.append(event)
+        if CONSOLE_PROGRESS:
+            print(message)
+
+    def step(self):
+        # jMetal's step, timing each phase for the telemetry
+        start = time.perf_counter()
+        mating_population = self.selection(self.solutions)
+        selected = time.perf_counter()
+        offspring_population = self.reproduction(mating_population)
+        reproduced = time.perf_counter()
+        offspring_population = self.evaluate(offspring_population)
+        evaluated = time.perf_counter()
+        self.solutions = self.replacement(self.solutions, offspring_population)
+        self.phase_times["selection"] += selected - start
+        self.phase_times["evaluation"] += evaluated - reproduced
+        self.phase_times["replacement"] += time.perf_counter() - evaluated
+
+    def update_progress(self):
+        super().update_progress()
+        if self.telemetry is not None and (self.generation_count % TELEMETRY_INTERVAL == 0 or self.events):
+            self.record_generation()
+        if self.checkpoint is not None and CHECKPOINT_INTERVAL > 0 and self.generation_count % CHECKPOINT_INTERVAL == 0:
+            save_checkpoint(self, self.checkpoint)
+
+    def record_generation(self):
+        """Send the state of the population and the time spent in each phase since the last
+        record to the telemetry (generations with events are always recorded)"""
+        fitnesses = fitness_array(self.solutions)
+        fitnesses = fitnesses[fitnesses > float("-inf")]
+        hits, misses = FITNESS_CACHE.hits, FITNESS_CACHE.misses
+        record = {
+            "generation": self.generation_count,
+            "evaluations": self.evaluations,
+            "time": time.time() - self.start_computing_time,
+            "best": float(fitnesses.max()) if len(fitnesses) else None,
+            "average": float(fitnesses.mean()) if len(fitnesses) else None,
+            "diversity": self.calculate_diversity(self.solutions),
+            "cache_hits": hits - self.cache_counts[0],
+            "cache_misses": misses - self.cache_counts[1],
+            "events": ",".join(self.events),
+        }
+        record.update((f"{phase}_time", t) for phase, t in self.phase_times.items())
+        self.telemetry.record(record)
+        self.cache_counts = (hits, misses)
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.events = []
+
+    def reproduction(self, mating_population):
+        # jMetal's reproduction, timing the crossover and mutation operators (CircuitMutation
+        # returns a new solution rather than mutating its argument, so that one is kept)
+        number_of_parents = self.crossover_operator.get_number_of_parents()
+        if len(mating_population) % number_of_parents != 0:
+            raise Exception("Wrong number of parents")
+        times = self.phase_times
+        offspring_population = []
+        for i in range(0, self.offspring_population_size, number_of_parents):
+            start = time.perf_counter()
+            offspring = self.crossover_operator.execute(mating_population[i:i + number_of_parents])
+            crossed = time.perf_counter()
+            for solution in offspring:
+                offspring_population.append(self.mutation_operator.execute(solution))
+                if len(offspring_population) >= self.offspring_population_size:
+                    break
+            times["crossover"] += crossed - start
+            times["mutation"] += time.perf_counter() - crossed
+
+        if PEEPHOLE_OFFSPRING:
+            # Exact peephole rewrites: same permutation, fewer gates
+            start = time.perf_counter()
+            for solution in offspring_population:
+                circuit = solution.variables[0]
+                optimized = peephole_optimize(circuit)
+                if MIN_GENES <= len(optimized) < len(circuit):
+                    solution.variables[0] = tuple(optimized)
+            times["peephole"] += time.perf_counter() - start
+        return offspring_population
+
+    def selection(self, population):
+        # The whole mating pool in one vectorized draw when the operator supports it
+        if isinstance(self.selection_operator, VectorizedBinaryTournamentSelection):
+            return self.selection_operator.select(population, self.mating_pool_size)
+        return super().selection(population)
+
     def local_search(self, solution):
-        """Hill climbing local search on a solution"""
-        best_solution = solution.copy()
-        current_fitness = solution.objectives[0] if solution.objectives[0] is not None else 0.0
-
-        # Try multiple local modifications
-        for attempt in range(20):  # 20 local search attempts
-            # Create a neighbor by small modification
-            neighbor = best_solution.copy()
-            circuit = neighbor.variables[0]
-
-            if len(circuit) == 0:
-                continue
-
-            # Choose modification type
-            mod_type = random.choice(['change', 'add', 'remove', 'swap'])
-
-            if mod_type == 'change' and len(circuit) > 0:
-                idx = random.randint(0, len(circuit) - 1)
-                circuit[idx] = random_gate()
-            elif mod_type == 'add' and len(circuit) < MAX_GENES:
-                pos = random.randint(0, len(circuit))
-                circuit.insert(pos, random_gate())
-            elif mod_type == 'remove' and len(circuit) > MIN_GENES:
-                idx = random.randint(0, len(circuit) - 1)
-                del circuit[idx]
-            elif mod_type == 'swap' and len(circuit) > 1:
-                i, j = random.sample(range(len(circuit)), 2)
-                circuit[i], circuit[j] = circuit[j], circuit[i]
-
-            # Evaluate neighbor
-            self.problem.evaluate(neighbor)
-
-            if neighbor.objectives[0] > current_fitness:
-                best_solution = neighbor.copy()
-                current_fitness = neighbor.objectives[0]
-
-        return best_solution
+        """Hill climbing on the single-edit neighbourhood of a solution, scored in batches"""
+        return neighbourhood.local_search(solution, self.problem.truth_table)
 
     def calculate_diversity(self, solutions):
         """Calculate diversity based on circuit length variation"""
@@ -136,4 +267,24 @@ class ElitistGeneticAlgorithm(GeneticAlgorithm):
         lengths = [len(sol.variables[0]) for sol in solutions if sol.variables]
         if len(set(lengths)) <= 1:
             return 0.0
-        return len(set(lengths)) / len(lengths)
\ No newline at end of file
+        return len(set(lengths)) / len(lengths)
+
+# The algorithm as configured for a run of main.py
+# (with adaptive=False only the evaluation budget stops it, as islands must keep migrating in step)
+def build_algorithm(truth_table, population_size=POP_SIZE, evaluator=None, seed_circuits=None, telemetry=None,
+                    checkpoint=None, adaptive=True):
+    max_evaluations = population_size * GENERATIONS
+    return ElitistGeneticAlgorithm(
+        problem=QuantumCircuitProblem(truth_table, seed_circuits),
+        population_size=population_size,
+        offspring_population_size=population_size,
+        mutation=CircuitMutation(MUTATION_RATE, truth_table),
+        crossover=CircuitCrossover(CROSSOVER_RATE),
+        termination_criterion=(AdaptiveTermination(max_evaluations) if adaptive
+                               else TerminationByFitness(1.0, max_evaluations)),
+        elite_size=10,
+        selection=VectorizedBinaryTournamentSelection(),
+        population_evaluator=evaluator if evaluator is not None else store.default_evaluator,
+        telemetry=telemetry,
+        checkpoint=checkpoint
+    )
@@ -0,0 +1,121 @@
+import multiprocessing
+import queue
+import random
+import time
+from circuitsolution import CircuitSolution
+from geneticalgorithm import build_algorithm
+from gateencoding import compile_circuit, decompile_circuit
+from telemetry import TelemetryWriter, telemetry_path
+from config import *
+
+# Island receiving the migrants of each island at a given migration epoch
+def migration_targets(n_islands, epoch, topology=MIGRATION_TOPOLOGY, seed=BASE_SEED):
+    if topology == "ring":
+        return [(i + 1) % n_islands for i in range(n_islands)]
+    elif topology == "random":
+        # Random cycle through all islands, the same in every process for a given epoch
+        order = list(range(n_islands))
+        random.Random(f"{seed}:{epoch}").shuffle(order)
+        targets = [0] * n_islands
+        for k, island in enumerate(order):
+            targets[island] = order[(k + 1) % n_islands]
+        return targets
+    raise ValueError(f"Unknown migration topology '{topology}', expected 'ring' or 'random'")
+
+# Receive the migrants of a given epoch, keeping any that arrive early for a later one
+def receive_migrants(inbox, pending, epoch, timeout):
+    while epoch not in pending:
+        sent_epoch, codes = inbox.get(timeout=timeout)
+        pending[sent_epoch] = codes
+    return pending.pop(epoch)
+
+def run_island(island, n_islands, truth_table, seed, population_size, inboxes, results,
+               interval, n_migrants, topology, timeout, log_path=None):
+    random.seed(seed + island)
+    telemetry = None
+    if TELEMETRY_FORMAT and log_path is not None:
+        telemetry = TelemetryWriter(telemetry_path(log_path, island), seed=seed, island=island)
+    algorithm = build_algorithm(truth_table, population_size, telemetry=telemetry, adaptive=False)
+    problem = algorithm.problem
+
+    algorithm.start_computing_time = time.time()
+    algorithm.solutions = algorithm.evaluate(algorithm.create_initial_solutions())
+    algorithm.init_progress()
+
+    pending = {}
+    generation = 0
+    while not algorithm.stopping_condition_is_met():
+        algorithm.step()
+        algorithm.update_progress()
+        generation += 1
+
+        if n_islands > 1 and generation % interval == 0:
+            # Send the best circuits as opcode arrays, replace the worst with the ones received
+            epoch = generation // interval
+            target = migration_targets(n_islands, epoch, topology, seed)[island]
+            algorithm.solutions.sort(key=lambda x: x.objectives[0] if x.objectives[0] is not None else float('-inf'),
+                                     reverse=True)
+            inboxes[target].put((epoch, [compile_circuit(s.variables[0]) for s in algorithm.solutions[:n_migrants]]))
+
+            migrants = []
+            for codes in receive_migrants(inboxes[island], pending, epoch, timeout):
+                migrant = CircuitSolution(decompile_circuit(codes))
+                problem.evaluate(migrant)
+                migrants.append(migrant)
+            if migrants:
+                algorithm.solutions[-len(migrants):] = migrants
+
+    result = algorithm.result()
+    if telemetry is not None:
+        telemetry.close()
+    results.put({
+        "island": island,
+        "fitness": result.objectives[0],
+        "circuit": compile_circuit(result.variables[0]),
+        "generations": generation,
+        "first_correct_generation": algorithm.first_correct_generation,
+        "first_correct_time": algorithm.first_correct_time,
+        "time": time.time() - algorithm.start_computing_time,
+    })
+
+def run_islands(truth_table, seed=BASE_SEED, n_islands=ISLANDS, interval=MIGRATION_INTERVAL,
+                n_migrants=MIGRATION_SIZE, topology=MIGRATION_TOPOLOGY, timeout=600, log_path=None):
+    """Evolve n_islands sub-populations of POP_SIZE // n_islands circuits, each in its own
+    process, exchanging their n_migrants best circuits every interval generations (with a
+    log_path, each island writes its telemetry next to it).
+
+    Returns the best circuit over all islands and one report per island, including the
+    generation and time at which it first held a fully correct circuit.
+    """
+    population_size = max(2, POP_SIZE // n_islands)
+    inboxes = [multiprocessing.Queue() for _ in range(n_islands)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_island,
+                                         args=(i, n_islands, truth_table, seed, population_size, inboxes,
+                                               results, interval, n_migrants, topology, timeout, log_path))
+                 for i in range(n_islands)]
+    for p in processes:
+        p.start()
+    reports = []
+    while len(reports) < n_islands:
+        try:
+            reports.append(results.get(timeout=1))
+        except queue.Empty:
+            if any(p.exitcode not in (None, 0) for p in processes):
+                for p in processes:
+                    p.terminate()
+                raise RuntimeError("An island process failed before reporting its result")
+    for p in processes:
+        p.join()
+
+    reports.sort(key=lambda r: r["island"])
+    best = max(reports, key=lambda r: r["fitness"])
+    return decompile_circuit(best["circuit"]), best["fitness"], reports
+
+def print_island_reports(reports):
+    for r in reports:
+        if r["first_correct_generation"] is None:
+            first = "no correct circuit"
+        else:
+            first = f"first correct at generation {r['first_correct_generation']} ({r['first_correct_time']:.1f}s)"
+        print(f"Island {r['island']}: fitness {r['fitness']}, length {len(r['circuit'])}, {first}")
@@ -0,0 +1,314 @@
+# Multi-objective synthesis: NSGA-II over correctness, gate count, controlled gates and depth
+
+import argparse
+import itertools
+import random
+import time
+import numpy as np
+from jmetal.algorithm.multiobjective.nsgaii import NSGAII
+from jmetal.core.operator import Selection
+from jmetal.util.evaluator import Evaluator
+from jmetal.util.termination_criterion import StoppingByEvaluations
+from quantumcircuitproblem import QuantumCircuitProblem
+from safemutation import CircuitMutation
+from circuitcrossover import CircuitCrossover
+from canonicalform import distinct_first
+from peephole import peephole_optimize
+from gateencoding import OPCODES, OPCODE_CTRL, OPCODE_TGT, encode_gate, circuit_to_text
+from statetransition import GATE_TRANSITIONS, OP_CONTROLLED, apply_ops, state_truth_table
+from util import TRUTH_TABLES
+from config import *
+
+OBJECTIVE_LABELS = ['Wrong rows', 'Gates', 'Controlled gates', 'Depth']
+
+_OP_CTRL = np.array(OPCODE_CTRL, dtype=np.intp)
+_OP_TGT = np.array(OPCODE_TGT, dtype=np.intp)
+
+def opcode_matrix(circuits):
+    """(circuits, longest) opcode array, and the length of each circuit.
+
+    Positions past the end of a circuit hold opcode 0 and are masked out by the callers.
+    """
+    lengths = np.fromiter(map(len, circuits), dtype=np.intp, count=len(circuits))
+    gates = itertools.chain.from_iterable(circuits)
+    try:
+        codes = np.fromiter(map(OPCODES.__getitem__, gates), dtype=np.intp, count=int(lengths.sum()))
+    except KeyError:
+        codes = np.array([encode_gate(g) for g in itertools.chain.from_iterable(circuits)], dtype=np.intp)
+    ops = np.zeros((len(circuits), int(lengths.max(initial=0))), dtype=np.intp)
+    ops[np.arange(ops.shape[1]) < lengths[:, None]] = codes
+    return ops, lengths
+
+def circuit_objectives(circuits, truth_table):
+    """(circuits, 4) array of the objectives of each circuit, all to be minimized.
+
+    The whole population is simulated at once: gate position k of every circuit is
+    applied to the truth-table rows of every circuit in one gather, through the
+    transition tables when they exist. The depth is scheduling.circuit_depth.
+    """
+    table = state_truth_table(truth_table)
+    ops, lengths = opcode_matrix(circuits)
+    rows = np.arange(len(circuits))
+    states = np.broadcast_to(table.inputs, (len(circuits), table.rows))
+    levels = np.zeros((len(circuits), NUM_QULINES), dtype=np.intp)
+    for k in range(ops.shape[1]):
+        active = k < lengths
+        op = ops[:, k]
+        if GATE_TRANSITIONS is not None:
+            moved = GATE_TRANSITIONS[op[:, None], states]
+        else:
+            moved = apply_ops(op[:, None], states)
+        states = np.where(active[:, None], moved, states)
+        at, op = rows[active], op[active]
+        ctrl, tgt = _OP_CTRL[op], _OP_TGT[op]
+        level = np.maximum(levels[at, ctrl], levels[at, tgt]) + 1
+        levels[at, ctrl] = level
+        levels[at, tgt] = level
+    objectives = np.empty((len(circuits), 4), dtype=np.int64)
+    objectives[:, 0] = np.count_nonzero(table.values[states] != table.expected, axis=1)
+    objectives[:, 1] = lengths
+    objectives[:, 2] = np.count_nonzero(OP_CONTROLLED[ops] & (np.arange(ops.shape[1]) < lengths[:, None]), axis=1)
+    objectives[:, 3] = levels.max(axis=1)
+    return objectives
+
+def nondominated_ranks(objectives):
+    """Pareto front index of each row of an objectives array (0 for the non-dominated ones).
+
+    The first objective (wrong rows) acts as a constraint, as in Deb's constrained
+    domination: fewer wrong rows always dominates, and only correct circuits are compared
+    by Pareto dominance on the other objectives. Correct circuits are never traded for
+    shorter incorrect ones, and incorrect circuits may grow as in the single-objective GA.
+    Deb's fast non-dominated sort then runs on the dominance matrix: the number of rows
+    dominating each row is counted once, then each front releases the rows it dominates.
+    """
+    # dominates[i, j]: row i dominates row j
+    wrong = objectives[:, 0]
+    lower_equal = (wrong[:, None] == 0) & (wrong[None, :] == 0)
+    lower = np.zeros_like(lower_equal)
+    for column in objectives[:, 1:].T:
+        lower_equal &= column[:, None] <= column[None, :]
+        lower |= column[:, None] < column[None, :]
+    dominates = (lower_equal & lower) | (wrong[:, None] < wrong[None, :])
+    counts = np.count_nonzero(dominates, axis=0)
+    ranks = np.empty(len(objectives), dtype=np.intp)
+    front = np.flatnonzero(counts == 0)
+    rank = 0
+    while front.size:
+        ranks[front] = rank
+        counts[front] = -1
+        counts -= np.count_nonzero(dominates[front], axis=0)
+        front = np.flatnonzero(counts == 0)
+        rank += 1
+    return ranks
+
+def crowding_distances(objectives, ranks):
+    """Crowding distance of each row within its front (infinite at the ends of a front)"""
+    objectives = objectives.astype(float)
+    distances = np.zeros(len(objectives))
+    for rank in range(int(ranks.max(initial=-1)) + 1):
+        members = np.flatnonzero(ranks == rank)
+        if len(members) <= 2:
+            distances[members] = np.inf
+            continue
+        values = objectives[members]
+        for m in range(values.shape[1]):
+            order = np.argsort(values[:, m], kind="stable")
+            column = values[order, m]
+            spread = column[-1] - column[0]
+            distances[members[order[[0, -1]]]] = np.inf
+            if spread > 0:
+                distances[members[order[1:-1]]] += (column[2:] - column[:-2]) / spread
+    return distances
+
+def objectives_array(solutions):
+    return np.array([s.objectives for s in solutions], dtype=float)
+
+def rank_solutions(solutions):
+    """Store the front and crowding distance of each solution in its attributes (under
+    jMetal's names) and return the solutions from the best: by front, then by
+    decreasing crowding distance"""
+    objectives = objectives_array(solutions)
+    ranks = nondominated_ranks(objectives)
+    distances = crowding_distances(objectives, ranks)
+    for solution, rank, distance in zip(solutions, ranks.tolist(), distances.tolist()):
+        solution.attributes["dominance_ranking"] = rank
+        solution.attributes["crowding_distance"] = distance
+    order = np.lexsort((-distances, ranks))
+    return [solutions[i] for i in order.tolist()]
+
+def pareto_front(solutions, ranked=False):
+    """The non-dominated solutions, one per point of the front, by increasing wrong rows
+    and gates. With ranked, the fronts stored by rank_solutions are used as they are.
+
+    When no circuit is correct, the first front holds every circuit with the fewest wrong
+    rows: only the Pareto-optimal ones on the other objectives are kept.
+    """
+    if not ranked:
+        solutions = rank_solutions(list(solutions))
+    front = {}
+    for solution in solutions:
+        if solution.attributes["dominance_ranking"] == 0:
+            front.setdefault(tuple(solution.objectives), solution)
+    points = np.array(sorted(front), dtype=float).reshape(-1, len(OBJECTIVE_LABELS))
+    points[:, 0] = 0
+    optimal = nondominated_ranks(points) == 0
+    return [front[point] for point, keep in zip(sorted(front), optimal.tolist()) if keep]
+
+class MultiObjectiveCircuitProblem(QuantumCircuitProblem):
+    """QuantumCircuitProblem with the objectives of OBJECTIVE_LABELS, all minimized.
+
+    The single-objective fitness is kept in the "fitness" attribute of each solution, for
+    the adaptive rate of the mutation.
+    """
+    def __init__(self, truth_table, seed_circuits=None):
+        super(MultiObjectiveCircuitProblem, self).__init__(truth_table, seed_circuits)
+        self.number_of_objectives = len(OBJECTIVE_LABELS)
+        self.obj_directions = [self.MINIMIZE] * len(OBJECTIVE_LABELS)
+        self.obj_labels = list(OBJECTIVE_LABELS)
+
+    def evaluate(self, solution):
+        self.evaluate_batch([solution])
+
+    def evaluate_batch(self, solutions):
+        rows = state_truth_table(self.truth_table).rows
+        objectives = circuit_objectives([s.variables[0] for s in solutions], self.truth_table)
+        for solution, values in zip(solutions, objectives.tolist()):
+            wrong, length = values[0], values[1]
+            solution.objectives = values
+            solution.attributes["fitness"] = (rows - wrong) / rows if wrong else 1 + 1 / length
+
+    def name(self):
+        return "MultiObjectiveCircuitProblem"
+
+    def number_of_objectives(self):
+        return len(OBJECTIVE_LABELS)
+
+class BatchEvaluator(Evaluator):
+    """Evaluates a whole population with a single call to problem.evaluate_batch"""
+    def evaluate(self, solution_list, problem):
+        problem.evaluate_batch(solution_list)
+        return solution_list
+
+class ParetoCircuitMutation(CircuitMutation):
+    # The adaptive rate follows the single-objective fitness, not the first objective
+    def solution_fitness(self, solution):
+        return solution.attributes.get("fitness", 0.0)
+
+class CrowdedTournamentSelection(Selection):
+    """NSGA-II's binary tournament drawn for a whole mating pool at once: the lower front
+    wins, then the larger crowding distance, and ties are broken at random"""
+    def execute(self, front):
+        return self.select(front, 1)[0]
+
+    def select(self, front, count):
+        if not front:
+            raise Exception("The front is empty")
+        if len(front) == 1:
+            return [front[0]] * count
+
+        rng = np.random.default_rng(random.getrandbits(64))
+        first = rng.integers(0, len(front), count)
+        second = rng.integers(0, len(front) - 1, count)
+        second += second >= first
+        ranks = np.array([s.attributes["dominance_ranking"] for s in front])
+        distances = np.array([s.attributes["crowding_distance"] for s in front])
+        r1, r2 = ranks[first], ranks[second]
+        d1, d2 = distances[first], distances[second]
+        pick_second = np.where(r1 != r2, r2 < r1,
+                               np.where(d1 != d2, d2 > d1, rng.random(count) < 0.5))
+        winners = np.where(pick_second, second, first)
+        return [front[i] for i in winners.tolist()]
+
+    def get_name(self):
+        return "Crowded binary tournament selection"
+
+class ParetoGeneticAlgorithm(NSGAII):
+    """NSGA-II on circuits, with the vectorized ranking, selection and evaluation above.
+
+    The offspring are the circuits returned by the mutation, and go through the peephole
+    optimizer with PEEPHOLE_OFFSPRING as in ElitistGeneticAlgorithm. With
+    CANONICAL_DEDUPE, the population keeps at most one solution per canonical circuit.
+    """
+    def __init__(self, problem, population_size, mutation, crossover, termination_criterion,
+                 population_evaluator=None):
+        super().__init__(problem, population_size, population_size, mutation, crossover,
+                         selection=CrowdedTournamentSelection(),
+                         termination_criterion=termination_criterion,
+                         population_evaluator=population_evaluator or BatchEvaluator())
+        self.generation_count = 0
+
+    def init_progress(self):
+        self.solutions = rank_solutions(self.solutions)
+        super().init_progress()
+
+    def selection(self, population):
+        return self.selection_operator.select(population, self.mating_pool_size)
+
+    def reproduction(self, mating_population):
+        number_of_parents = self.crossover_operator.get_number_of_parents()
+        offspring_population = []
+        for i in range(0, self.offspring_population_size, number_of_parents):
+            for solution in self.crossover_operator.execute(mating_population[i:i + number_of_parents]):
+                offspring_population.append(self.mutation_operator.execute(solution))
+                if len(offspring_population) >= self.offspring_population_size:
+                    break
+        if PEEPHOLE_OFFSPRING:
+            for solution in offspring_population:
+                circuit = solution.variables[0]
+                optimized = peephole_optimize(circuit)
+                if MIN_GENES <= len(optimized) < len(circuit):
+                    solution.variables[0] = tuple(optimized)
+        return offspring_population
+
+    def replacement(self, population, offspring_population):
+        self.generation_count += 1
+        ranked = rank_solutions(population + offspring_population)
+        if CANONICAL_DEDUPE:
+            return distinct_first(ranked, self.population_size, key=lambda s: s.variables[0])
+        return ranked[:self.population_size]
+
+    def result(self):
+        # The population is ranked by the replacement (and init_progress)
+        return pareto_front(self.solutions, ranked=True)
+
+    def get_name(self):
+        return "ParetoGeneticAlgorithm"
+
+def build_pareto_algorithm(truth_table, population_size=POP_SIZE, generations=PARETO_GENERATIONS, seed_circuits=None):
+    return ParetoGeneticAlgorithm(
+        problem=MultiObjectiveCircuitProblem(truth_table, seed_circuits),
+        population_size=population_size,
+        mutation=ParetoCircuitMutation(MUTATION_RATE, truth_table),
+        crossover=CircuitCrossover(CROSSOVER_RATE),
+        termination_criterion=StoppingByEvaluations(population_size * (generations + 1))
+    )
+
+def front_to_text(front):
+    blocks = []
+    for solution in front:
+        wrong, gates, controlled, depth = solution.objectives
+        blocks.append(circuit_to_text(solution.variables[0], f"Wrong rows: {wrong}, Length: {gates}, "
+                                                             f"Controlled: {controlled}, Depth: {depth}"))
+    return "\n".join(blocks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the Pareto front of wrong rows, gates, controlled gates and depth")
+    parser.add_argument("table", choices=sorted(TRUTH_TABLES), help="truth table to synthesize")
+    parser.add_argument("--population", type=int, default=POP_SIZE, help="population size")
+    parser.add_argument("--generations", type=int, default=PARETO_GENERATIONS, help="number of generations")
+    parser.add_argument("--seed", type=int, default=BASE_SEED, help="seed of the run")
+    parser.add_argument("--output", help="file to write the circuits of the front to")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    algorithm = build_pareto_algorithm(TRUTH_TABLES[args.table](), args.population, args.generations)
+    start = time.time()
+    algorithm.run()
+    front = algorithm.result()
+    print(f"Pareto front after {algorithm.generation_count} generations ({time.time() - start:.1f}s):")
+    print("  ".join(OBJECTIVE_LABELS))
+    for solution in front:
+        print("  ".join(f"{value:>{len(label)}}" for value, label in zip(solution.objectives, OBJECTIVE_LABELS)))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(front_to_text(front))
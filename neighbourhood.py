@@ -0,0 +1,115 @@
+import random
+import numpy as np
+from circuitsolution import CircuitSolution
+from util import ALL_GATES
+from statetransition import (GATE_TRANSITIONS, IDENTITY, STATE_DTYPE, apply_ops,
+                             gate_transition, state_truth_table)
+from scheduling import depth_tiebreak
+from config import *
+
+# Gate transitions plus a last identity row, used for deletions (none for registers too
+# large for transition tables: the edited gate is then applied digit-wise)
+NO_GATE = len(ALL_GATES)
+MOVE_TRANSITIONS = np.vstack([GATE_TRANSITIONS, IDENTITY]) if GATE_TRANSITIONS is not None else None
+
+OPS = np.arange(len(ALL_GATES))
+
+# Every single-edit neighbour of a circuit of length n, as (before, op, after, length):
+# the edited circuit is the first `before` gates, gate op (NO_GATE for a deletion) and
+# the gates from index `after` on
+def single_edit_moves(n):
+    moves = []
+    # Change gate i
+    if n > 0:
+        i = np.repeat(np.arange(n), len(OPS))
+        moves.append((i, np.tile(OPS, n), i + 1, np.full(len(i), n)))
+    # Insert before position p
+    if n < MAX_GENES:
+        p = np.repeat(np.arange(n + 1), len(OPS))
+        moves.append((p, np.tile(OPS, n + 1), p, np.full(len(p), n + 1)))
+    # Delete gate i
+    if n > MIN_GENES:
+        i = np.arange(n)
+        moves.append((i, np.full(n, NO_GATE), i + 1, np.full(n, n - 1)))
+    if not moves:
+        return tuple(np.empty(0, dtype=np.intp) for _ in range(4))
+    return tuple(np.concatenate(parts) for parts in zip(*moves))
+
+def apply_move(circuit, before, op, after):
+    middle = () if op == NO_GATE else (ALL_GATES[op],)
+    return circuit[:before] + middle + circuit[after:]
+
+def neighbourhood_fitness(circuit, truth_table, moves):
+    """Fitness of every neighbour in moves, computed in one vectorized pass.
+
+    prefix[k] holds the state of every truth-table row after the first k gates and
+    suffix[k] the value of the checked lines once the gates from k on are applied to each state,
+    so a neighbour only costs two gathers whatever the length of the circuit.
+    """
+    table = state_truth_table(truth_table)
+    n = len(circuit)
+    steps = [gate_transition(g) for g in circuit]
+
+    prefix = np.empty((n + 1, table.rows), dtype=STATE_DTYPE)
+    prefix[0] = table.inputs
+    for k, step in enumerate(steps):
+        prefix[k + 1] = step[prefix[k]]
+
+    suffix = np.empty((n + 1, len(IDENTITY)), dtype=table.values.dtype)
+    suffix[n] = table.values
+    for k in range(n - 1, -1, -1):
+        suffix[k] = suffix[k + 1][steps[k]]
+
+    before, op, after, length = moves
+    if MOVE_TRANSITIONS is not None:
+        states = MOVE_TRANSITIONS[op[:, None], prefix[before]]
+    else:
+        states = prefix[before].astype(np.int64)
+        edited = op != NO_GATE
+        states[edited] = apply_ops(op[edited, None], states[edited])
+    correct = np.count_nonzero(suffix[after[:, None], states] == table.expected, axis=1)
+
+    # Same expressions as util.fitness, so the values are identical
+    fits = correct / table.rows
+    complete = correct == table.rows
+    fits[complete] = 1 + 1 / length[complete]
+    return fits
+
+def local_search(solution, truth_table, strategy=LOCAL_SEARCH_STRATEGY,
+                 neighbourhood_size=LOCAL_SEARCH_NEIGHBOURHOOD, iterations=LOCAL_SEARCH_ITERATIONS):
+    """Hill climbing over single-gate changes, insertions and deletions.
+
+    At each iteration the whole neighbourhood (or a random sample of neighbourhood_size
+    moves, if positive) is scored at once; "steepest" moves to the best improving
+    neighbour, "first" to a random improving one. Stops at a local optimum.
+    """
+    if strategy not in ("steepest", "first"):
+        raise ValueError(f"Unknown local search strategy '{strategy}', expected 'steepest' or 'first'")
+    circuit = solution.variables[0]
+    current = solution.objectives[0] if solution.objectives[0] is not None else 0.0
+
+    for _ in range(iterations):
+        moves = single_edit_moves(len(circuit))
+        if neighbourhood_size > 0 and len(moves[0]) > neighbourhood_size:
+            picked = np.array(sorted(random.sample(range(len(moves[0])), neighbourhood_size)))
+            moves = tuple(m[picked] for m in moves)
+        if len(moves[0]) == 0:
+            break
+
+        fits = neighbourhood_fitness(circuit, truth_table, moves)
+        improving = np.flatnonzero(fits > current)
+        if len(improving) == 0:
+            break
+        if strategy == "steepest":
+            best = improving[fits[improving] == fits[improving].max()]
+            chosen = best[0]
+        else:
+            chosen = improving[random.randrange(len(improving))]
+
+        circuit = apply_move(circuit, int(moves[0][chosen]), int(moves[1][chosen]), int(moves[2][chosen]))
+        current = float(fits[chosen])
+
+    result = CircuitSolution(circuit)
+    # The scores of the moves do not include the depth tie-breaker
+    result.objectives[0] = current if circuit is solution.variables[0] else depth_tiebreak(current, circuit)
+    return result
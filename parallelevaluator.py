@@ -0,0 +1,84 @@
+import multiprocessing
+from array import array
+from jmetal.util.evaluator import Evaluator
+from gateencoding import compile_circuit, decompile_circuit
+from fitnessbackend import fitness, FITNESS_CACHE
+from scheduling import depth_tiebreak
+from config import *
+
+# Truth table of the worker process, received once when the worker starts
+_worker_truth_table = None
+
+def _init_worker(truth_table):
+    global _worker_truth_table
+    _worker_truth_table = truth_table
+
+# A batch is the lengths of its circuits and all their opcodes back to back
+def _evaluate_batch(batch):
+    lengths, codes = batch
+    results = []
+    start = 0
+    for length in lengths:
+        circuit = decompile_circuit(codes[start:start + length])
+        results.append(fitness(circuit, _worker_truth_table))
+        start += length
+    return results
+
+def _pack_batch(circuits):
+    lengths = array('H', [len(c) for c in circuits])
+    codes = array('H')
+    for c in circuits:
+        codes.extend(compile_circuit(c))
+    return lengths, codes
+
+class ProcessPoolEvaluator(Evaluator):
+    """Evaluates populations on a pool of worker processes.
+
+    Circuits travel as compiled opcode arrays in chunks of chunk_size and only the
+    fitness values come back. Values already in the fitness cache are not sent.
+    """
+    def __init__(self, processes=EVALUATOR_PROCESSES, chunk_size=EVALUATOR_CHUNK_SIZE):
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.pool = None
+        self.truth_table = None
+
+    def start(self, truth_table):
+        self.close()
+        self.truth_table = truth_table
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker, initargs=(truth_table,))
+
+    def evaluate(self, solution_list, problem):
+        if self.pool is None or self.truth_table is not problem.truth_table:
+            self.start(problem.truth_table)
+
+        pending, keys = [], []
+        for solution in solution_list:
+            key = FITNESS_CACHE.key(solution.variables[0], problem.truth_table)
+            fit = FITNESS_CACHE.lookup(key) if FITNESS_CACHE.max_size > 0 else None
+            if fit is None:
+                pending.append(solution)
+                keys.append(key)
+            else:
+                solution.objectives[0] = depth_tiebreak(fit, solution.variables[0])
+
+        batches = [_pack_batch([s.variables[0] for s in pending[i:i + self.chunk_size]])
+                   for i in range(0, len(pending), self.chunk_size)]
+        # map keeps the order of the batches, so results do not depend on worker scheduling
+        fits = [fit for batch in self.pool.map(_evaluate_batch, batches) for fit in batch]
+        for solution, key, fit in zip(pending, keys, fits):
+            solution.objectives[0] = depth_tiebreak(fit, solution.variables[0])
+            FITNESS_CACHE.store(key, fit)
+        return solution_list
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
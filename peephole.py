@@ -0,0 +1,108 @@
+# Peephole optimizer: rewrites windows of up to 3 gates into the shortest equivalent
+# circuit, looked up by the window's state permutation
+
+from util import ALL_GATES
+from gateencoding import OPCODES, NUM_OPCODES, encode_gate
+from statetransition import IDENTITY_BYTES, GATE_TRANSLATIONS
+from config import *
+
+class RewriteTables:
+    """Tables built once over all gate pairs (NUM_OPCODES ** 2 entries each).
+
+    shortest maps every permutation realizable with at most 2 gates to a shortest
+    circuit (as opcodes) realizing it. pair_perm[a * NUM_OPCODES + b] is the
+    permutation of gate a followed by gate b, pair_rewrite the shorter replacement of
+    that pair (or None) and commutes whether a and b give the same permutation in
+    either order.
+    """
+    def __init__(self):
+        n = NUM_OPCODES
+        single = [GATE_TRANSLATIONS[g] for g in ALL_GATES]
+        self.single = single
+        self.shortest = {IDENTITY_BYTES: ()}
+        for a in range(n):
+            self.shortest.setdefault(single[a][:len(IDENTITY_BYTES)], (a,))
+        self.pair_perm = []
+        for a in range(n):
+            perm_a = single[a][:len(IDENTITY_BYTES)]
+            for b in range(n):
+                perm = perm_a.translate(single[b])
+                self.pair_perm.append(perm)
+                self.shortest.setdefault(perm, (a, b))
+        self.pair_rewrite = [None] * (n * n)
+        for k, perm in enumerate(self.pair_perm):
+            rewrite = self.shortest[perm]
+            if len(rewrite) < 2:
+                self.pair_rewrite[k] = rewrite
+        self.commutes = [self.pair_perm[a * n + b] == self.pair_perm[b * n + a]
+                         for a in range(n) for b in range(n)]
+        # Gates acting as the identity (e.g. Z+0)
+        self.identity = [single[a][:len(IDENTITY_BYTES)] == IDENTITY_BYTES for a in range(n)]
+
+_TABLES = None
+
+def rewrite_tables():
+    global _TABLES
+    if _TABLES is None:
+        _TABLES = RewriteTables()
+    return _TABLES
+
+def peephole_optimize(circuit, lookahead=PEEPHOLE_LOOKAHEAD):
+    """Shorter circuit with the same state permutation, in one left-to-right pass.
+
+    At each gate, the next gates that can be moved next to it (commuting with every
+    gate they would cross, at most lookahead positions away) are joined to it in
+    windows of 2 and 3 gates, and a window is replaced when the tables know a
+    shorter circuit for its permutation (identity gates are dropped). After a rewrite
+    the pass steps back one gate.
+
+    The tables only hold circuits of up to 2 gates, so a 3-gate window is rewritten
+    only when it collapses to 2 gates or fewer. Registers of more than 256 states have
+    no byte translations: the circuit is then returned unchanged.
+    """
+    if GATE_TRANSLATIONS is None:
+        return list(circuit)
+    tables = rewrite_tables()
+    n = NUM_OPCODES
+    commutes, pair_rewrite, pair_perm = tables.commutes, tables.pair_rewrite, tables.pair_perm
+    single, shortest, identity = tables.single, tables.shortest, tables.identity
+    ops = [OPCODES.get(g) for g in circuit]
+    if None in ops:
+        ops = [encode_gate(g) for g in circuit]
+
+    i = 0
+    while i < len(ops):
+        a = ops[i]
+        if identity[a]:
+            del ops[i]
+            continue
+        partner, moved, skipped = None, None, []
+        rewrite = None
+        for j in range(i + 1, min(len(ops), i + 1 + lookahead)):
+            b = ops[j]
+            if skipped and not all([commutes[b * n + s] for s in skipped]):
+                skipped.append(b)
+                continue
+            # b can move next to gate i: try the pair, then the triple with the first such gate
+            # (alone, it also has to cross the first such gate)
+            if partner is None or commutes[b * n + ops[partner]]:
+                rewrite = pair_rewrite[a * n + b]
+                if rewrite is not None:
+                    moved = (j,)
+                    break
+            if partner is None:
+                partner = j
+                continue
+            rewrite = shortest.get(pair_perm[a * n + ops[partner]].translate(single[b]))
+            if rewrite is not None:
+                moved = (partner, j)
+                break
+            skipped.append(b)
+
+        if rewrite is None:
+            i += 1
+            continue
+        # The moved gates join gate i, then the window is replaced
+        ops = ops[:i] + list(rewrite) + [ops[k] for k in range(i + 1, len(ops)) if k not in moved]
+        i = max(i - 1, 0)
+    return [ALL_GATES[op] for op in ops]
@@ -1,12 +1,14 @@
 from jmetal.core.problem import Problem
 import random
-from util import fitness, random_gate
+from util import random_gate
+from fitnessbackend import get_fitness, FITNESS_CACHE
+from scheduling import depth_tiebreak
 from config import *
 from circuitsolution import CircuitSolution
 
 # The problem class
 class QuantumCircuitProblem(Problem):
-    def __init__(self,truth_table):
+    def __init__(self,truth_table, seed_circuits=None):
         super(QuantumCircuitProblem, self).__init__()
         self.number_of_variables = 1
         self.number_of_objectives = 1
@@ -16,13 +18,29 @@ class QuantumCircuitProblem(Problem):
         self.obj_directions = [self.MAXIMIZE]
         self.obj_labels = ['Fitness']
         self.truth_table = truth_table
+        self.fitness_function = get_fitness()
+        # Circuits handed out first by create_solution (e.g. from exactsynthesis)
+        self.seed_circuits = list(seed_circuits) if seed_circuits else []
 
     def evaluate(self, solution):
-        circuit = solution.variables[0]
-        fit = fitness(circuit, self.truth_table)
-        solution.objectives[0] = fit 
+        if FITNESS_CACHE.max_size > 0:
+            key = FITNESS_CACHE.key(solution.variables[0], self.truth_table)
+            fit = FITNESS_CACHE.lookup(key)
+            if fit is None:
+                fit = self.compute_fitness(solution)
+                FITNESS_CACHE.store(key, fit)
+        else:
+            fit = self.compute_fitness(solution)
+        # The cache is keyed by canonical circuit, which ignores the gate order: the depth
+        # is added afterwards
+        solution.objectives[0] = depth_tiebreak(fit, solution.variables[0])
+
+    def compute_fitness(self, solution):
+        return self.fitness_function(solution.variables[0], self.truth_table)
 
     def create_solution(self):
+        if self.seed_circuits:
+            return CircuitSolution(self.seed_circuits.pop(0))
          # More diverse initial circuit lengths
         num_genes = random.choices([1,2,3,4,5,6,7,8], 
                                  weights=[10,15,20,20,15,10,5,5])[0]
@@ -42,6 +42,9 @@ def analyze_output_files():
 
             # Parse the data
             data = []
+            stop_reasons = {}
+            # Depth of the correct circuits (output files from before it was recorded have none)
+            depths = []
             header_found = False
 
             for line_num, line in enumerate(lines):
@@ -67,6 +70,11 @@ def analyze_output_files():
                     best_fitness = float(parts[1])
                     circuit_length = int(parts[2])
                     data.append((best_fitness, circuit_length))
+                    # Stop reason of the run (output files from before it was recorded have none)
+                    if len(parts) >= 6:
+                        stop_reasons[parts[5]] = stop_reasons.get(parts[5], 0) + 1
+                    if len(parts) >= 7 and best_fitness >= 1.0:
+                        depths.append(int(parts[6]))
 
                 except (ValueError, IndexError) as e:
                     print(f"Line {line_num + 1} parsing error: {line} ({e})")
@@ -83,6 +91,8 @@ def analyze_output_files():
             print(f"Total rows processed: {len(data)}")
             print(f"Rows with Best Fitness >= 1.0: {len(perfect_solutions)}")
             print(f"Rows with Best Fitness < 1.0: {len(imperfect_solutions)}")
+            if stop_reasons:
+                print("Stop reasons: " + ", ".join(f"{reason} {count}" for reason, count in sorted(stop_reasons.items())))
 
             if perfect_solutions:
                 # Extract circuit lengths for perfect solutions
@@ -102,6 +112,13 @@ def analyze_output_files():
                 print(f"   Median:         {median_length}")
                 print(f"   Maximum:        {max_length}")
 
+                if depths:
+                    print(f"\nCIRCUIT DEPTH STATISTICS (Best Fitness >= 1.0):")
+                    print(f"   Average:        {np.mean(depths):.2f}")
+                    print(f"   Minimum:        {min(depths)}")
+                    print(f"   Median:         {statistics.median(depths)}")
+                    print(f"   Maximum:        {max(depths)}")
+
                 # Show distribution
                 """
                 unique_lengths = sorted(set(circuit_lengths))
@@ -119,5 +136,68 @@ def analyze_output_files():
 
     print(f"\nAnalysis complete!")
 
+def read_telemetry(filename):
+    """Load a telemetry file written by telemetry.TelemetryWriter (JSON Lines or Parquet)"""
+    if filename.endswith(".parquet"):
+        return pd.read_parquet(filename)
+    return pd.read_json(filename, lines=True)
+
+def analyze_telemetry_files():
+    """
+    Analyze the per-generation telemetry of the runs (runs_*/*_telemetry.jsonl or .parquet).
+    Report the best fitness reached, the first generation with a correct circuit,
+    the share of time spent in each phase and the fitness cache hit rate
+    """
+
+    files = glob.glob("runs_*/*_telemetry.jsonl") + glob.glob("runs_*/*_telemetry.parquet")
+
+    if not files:
+        print("No telemetry files (runs_*/*_telemetry.jsonl or .parquet) found.")
+        return
+
+    print("\nANALYZING TELEMETRY FILES")
+    print("=" * 60)
+
+    for filename in sorted(files):
+        print(f"\nFile: {filename}")
+        print("-" * 40)
+
+        try:
+            df = read_telemetry(filename)
+            if df.empty:
+                print("File is empty")
+                continue
+
+            last = df.iloc[-1]
+            print(f"Generations recorded: {len(df)} (last: {int(last['generation'])}, "
+                  f"evaluations: {int(last['evaluations'])}, time: {last['time']:.1f}s)")
+            print(f"Best fitness:         {df['best'].max():.6f}")
+            correct = df[df['best'] >= 1.0]
+            if not correct.empty:
+                print(f"First correct at generation {int(correct['generation'].iloc[0])} "
+                      f"({correct['time'].iloc[0]:.1f}s)")
+
+            # Time per phase, summed over the run
+            phase_columns = [c for c in df.columns if c.endswith("_time")]
+            totals = df[phase_columns].sum()
+            total = totals.sum()
+            print("\nTIME PER PHASE:")
+            for column, seconds in totals.items():
+                share = seconds / total * 100 if total > 0 else 0.0
+                print(f"   {column[:-len('_time')]:<12} {seconds:8.2f}s ({share:.1f}%)")
+
+            lookups = df['cache_hits'].sum() + df['cache_misses'].sum()
+            if lookups:
+                print(f"\nFitness cache hit rate: {df['cache_hits'].sum() / lookups:.1%}")
+
+            events = df['events'].fillna("").str.split(",").explode()
+            events = events[events != ""]
+            if not events.empty:
+                print("Events: " + ", ".join(f"{name} x{count}" for name, count in events.value_counts().items()))
+
+        except Exception as e:
+            print(f"\nError processing {filename}: {e}")
+
 if __name__ == "__main__":
-    analyze_output_files()
\ No newline at end of file
+    analyze_output_files()
+    analyze_telemetry_files()
\ No newline at end of file
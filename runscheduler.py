@@ -0,0 +1,224 @@
+import contextlib
+import os
+import random
+import string
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from jmetal.util.evaluator import SequentialEvaluator
+from jmetal.util.observer import PrintObjectivesObserver
+from circuitsolution import CircuitSolution
+from geneticalgorithm import build_algorithm
+from islandmodel import run_islands, print_island_reports
+from exactsynthesis import seed_circuits
+import circuitstore
+from parallelevaluator import ProcessPoolEvaluator
+from telemetry import TelemetryWriter, telemetry_path, truncate_telemetry
+from checkpoint import checkpoint_path, load_checkpoint, resume_run
+from gateencoding import gate_to_text, read_circuit_file, write_circuit_file
+from scheduling import circuit_depth, scheduled_depth
+from util import simulate_circuit, output_value, checked_lines, DATA_LINES
+from config import *
+
+OUTPUT_HEADER = "Run,Best Fitness,Circuit Length,Time,Seed,Stop Reason,Circuit Depth\n"
+
+# One full GA run (single population, or ISLANDS islands); returns the best solution, the elapsed time
+# and the reason the run stopped (see termination.AdaptiveTermination).
+# With a log_path, the telemetry and the checkpoints of the run are written next to it, and with
+# resume a single-population run continues from its checkpoint when there is one.
+def run_genetic_algorithm(truth_table, seed=BASE_SEED, log_path=None, resume=False):
+    if ISLANDS > 1:
+        start_time = time.time()
+        circuit, fitness_value, reports = run_islands(truth_table, seed, ISLANDS, log_path=log_path)
+        print_island_reports(reports)
+        result = CircuitSolution(circuit)
+        result.objectives[0] = fitness_value
+        # Islands only stop on the evaluation budget
+        return result, time.time() - start_time, "evaluations"
+
+    evaluator = ProcessPoolEvaluator() if EVALUATOR_PROCESSES > 1 else SequentialEvaluator()
+    seeds = seed_circuits(truth_table, EXACT_SEEDS) if EXACT_SEEDS > 0 else []
+    if circuitstore.STORE is not None and STORE_WARM_START > 0:
+        seeds += circuitstore.STORE.best_circuits(truth_table, STORE_WARM_START)
+    checkpoint = checkpoint_path(log_path) if CHECKPOINT_INTERVAL > 0 and log_path is not None else None
+    resumed = resume and checkpoint is not None and os.path.exists(checkpoint)
+    state = load_checkpoint(checkpoint) if resumed else None
+    telemetry = None
+    if TELEMETRY_FORMAT and log_path is not None:
+        if resumed:
+            truncate_telemetry(telemetry_path(log_path), state.generation)
+        telemetry = TelemetryWriter(telemetry_path(log_path), append=resumed, seed=seed)
+    algorithm = build_algorithm(truth_table, POP_SIZE, evaluator, seeds, telemetry, checkpoint)
+
+    if CONSOLE_PROGRESS:
+        algorithm.observable.register(observer=PrintObjectivesObserver(POP_SIZE))
+
+    if resumed:
+        print(f"Resuming from {checkpoint}")
+        resume_run(algorithm, state)
+    else:
+        algorithm.run()
+    result = algorithm.result()
+    if telemetry is not None:
+        telemetry.close()
+
+    if algorithm.first_correct_generation is not None:
+        print(f"First correct circuit at generation {algorithm.first_correct_generation} "
+              f"({algorithm.first_correct_time:.1f}s)")
+    if isinstance(evaluator, ProcessPoolEvaluator):
+        evaluator.close()
+    if algorithm.restarts:
+        print(f"Restarts: {algorithm.restarts}")
+    print(f"Stopped by {algorithm.termination_criterion.reason} at generation {algorithm.generation_count}")
+    # Includes the time before the checkpoint of a resumed run
+    return result, algorithm.total_computing_time, algorithm.termination_criterion.reason
+
+# Print the circuit and check it against the truth table
+def report_circuit(circuit, truth_table):
+    print("Circuit Length:", len(circuit))
+    # Gates on disjoint lines share a layer; commuting gates may be reordered (see scheduling.py)
+    print(f"Circuit Depth: {scheduled_depth(circuit)} ({circuit_depth(circuit)} in the order below)")
+    print("Circuit Gates:")
+    for i, g in enumerate(circuit):
+        print(gate_to_text(i+1, g))
+
+    print("Truth Table Check for the given circuit:")
+    success = True
+    lines = checked_lines(truth_table)
+    for inp, expected in truth_table.items():
+        output = simulate_circuit(circuit, inp)
+        check_result = "✔️" if output_value(output, lines) == output_value(expected, lines) else "❌"
+        if check_result == "❌":
+            success = False
+        inputs = " ".join(f"{name}={inp[line]}" for name, line in zip(string.ascii_lowercase, DATA_LINES))
+        f = ",".join(str(output[line]) for line in lines)
+        f_expected = ",".join(str(expected[line]) for line in lines)
+        print(f"{inputs} → f={f} (expected {f_expected}) {check_result}")
+
+    if success:
+        print("\nSUCCESS: Circuit correctly detects the given function")
+    else:
+        print("\n!!WARNING!!: Circuit has issues detecting the given function")
+    return success
+
+# Files of a single run, kept in runs_<circuit name>/
+def run_paths(circuit_name, run):
+    run_dir = f"runs_{circuit_name}"
+    return os.path.join(run_dir, f"run{run}.log"), os.path.join(run_dir, f"run{run}_circuit.txt")
+
+# Execute one seeded run (possibly in a worker process), logging to its own file
+# (with resume, a run interrupted after a checkpoint continues its log; with a store path, the
+# run uses and records into that circuit store)
+def execute_run(run, seed, truth_table, circuit_name, resume=False, store=CIRCUIT_STORE):
+    log_path, circuit_path = run_paths(circuit_name, run)
+    store = circuitstore.use_store(store)
+    random.seed(seed)
+    with open(log_path, "a" if resume else "w") as log, contextlib.redirect_stdout(log):
+        print(f"\n--- RUN {run} (seed {seed}) ---\n")
+        result, elapsed, reason = run_genetic_algorithm(truth_table, seed, log_path, resume)
+        best_circuit = result.variables[0]
+        report_circuit(best_circuit, truth_table)
+    if store is not None:
+        store.record(truth_table, best_circuit, result.objectives[0])
+    write_circuit_file(circuit_path, best_circuit,
+                       f"Run {run} (Fitness: {result.objectives[0]}, Length: {len(best_circuit)})")
+    return run, result.objectives[0], len(best_circuit), elapsed, seed, reason, scheduled_depth(best_circuit)
+
+# Rows already in the output file, by run number (a row cut short by a crash is ignored)
+def recorded_runs(output_file):
+    rows = {}
+    if not os.path.exists(output_file):
+        return rows
+    with open(output_file) as f:
+        lines = f.read().split("\n")
+    for line in lines[1:]:
+        parts = line.split(",")
+        if len(parts) >= 4 and parts[0].isdigit():
+            try:
+                rows[int(parts[0])] = (float(parts[1]), int(parts[2]))
+            except ValueError:
+                continue
+    return rows
+
+def append_row(f, row):
+    # One write per row, flushed to disk before the next run is recorded
+    f.write(",".join(str(v) for v in row) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+# Same rule as the sequential loop: first run with the strictly highest fitness >= 1
+def save_best_circuit(circuit_name, rows, best_circuit_file):
+    best_fitness, best_circuit = 0, None
+    for run in sorted(rows):
+        fitness_value = rows[run][0]
+        circuit_path = run_paths(circuit_name, run)[1]
+        if fitness_value > best_fitness and fitness_value >= 1 and os.path.exists(circuit_path):
+            best_fitness, best_circuit = fitness_value, read_circuit_file(circuit_path)
+    if best_circuit is not None:
+        write_circuit_file(best_circuit_file, best_circuit,
+                           f"Best circuit found (Fitness: {best_fitness}, Length: {len(best_circuit)})")
+    return best_circuit
+
+def upgrade_header(content, output_file):
+    """Content of an output file with the current header.
+
+    Columns were only ever added at the end, so the rows of a file written by an earlier
+    version keep their meaning under the current header (without the newer values);
+    a file with other columns cannot be resumed.
+    """
+    header, _, rows = content.partition("\n")
+    columns = header.split(",")
+    expected = OUTPUT_HEADER.rstrip("\n").split(",")
+    if columns != expected[:len(columns)]:
+        raise ValueError(f"Cannot resume {output_file}: its columns ({header}) "
+                         f"are not those of the output file ({OUTPUT_HEADER.rstrip()})")
+    return OUTPUT_HEADER + rows
+
+def schedule_runs(truth_table, circuit_name, n_repetitions, output_file, best_circuit_file,
+                  processes=RUN_PROCESSES, base_seed=BASE_SEED, resume=False, store=CIRCUIT_STORE):
+    """Run the repetitions on a pool of processes (run n is seeded with base_seed + n).
+
+    Each finished run is appended to output_file as soon as it completes; with resume,
+    runs already recorded there are skipped and interrupted runs continue from their
+    last checkpoint. With a store path, the runs share the circuit store in that file
+    (see circuitstore.py). The best circuit is picked once all runs are done.
+    """
+    os.makedirs(f"runs_{circuit_name}", exist_ok=True)
+    done = recorded_runs(output_file) if resume else {}
+    if not done:
+        with open(output_file, "w") as f:
+            f.write(OUTPUT_HEADER)
+    todo = [n for n in range(1, n_repetitions + 1) if n not in done]
+
+    with open(output_file, "r+") as f:
+        content = f.read()
+        # Drop a partial last row left by a crash
+        if not content.endswith("\n"):
+            content = content[:content.rfind("\n") + 1] or OUTPUT_HEADER
+        content = upgrade_header(content, output_file)
+        f.seek(0)
+        f.truncate()
+        f.write(content)
+        f.seek(0, os.SEEK_END)
+
+        def record(row):
+            append_row(f, row)
+            run, fitness_value, length, elapsed, seed, reason, depth = row
+            # The run is recorded: its checkpoint is no longer needed
+            checkpoint = checkpoint_path(run_paths(circuit_name, run)[0])
+            if os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            print(f"Run {run}/{n_repetitions}: fitness {fitness_value}, length {length}, depth {depth}, "
+                  f"{elapsed:.1f}s (seed {seed}), stopped by {reason}")
+
+        if processes > 1:
+            with ProcessPoolExecutor(processes) as executor:
+                futures = [executor.submit(execute_run, n, base_seed + n, truth_table, circuit_name, resume,
+                                           store)
+                           for n in todo]
+                for future in as_completed(futures):
+                    record(future.result())
+        else:
+            for n in todo:
+                record(execute_run(n, base_seed + n, truth_table, circuit_name, resume, store))
+
+    return save_best_circuit(circuit_name, recorded_runs(output_file), best_circuit_file)
@@ -1,9 +1,11 @@
 import random
 from circuitsolution import CircuitSolution
 from config import *
-from copy import deepcopy
 from jmetal.operator.mutation import Mutation
 from util import *
+from fitnessbackend import is_correct
+import circuitstore
+from peephole import peephole_optimize
 
 class CircuitMutation(Mutation):
     def __init__(self, mutation_probability: float = 0.1, TRUTH_TABLE = None):
@@ -12,15 +14,11 @@ class CircuitMutation(Mutation):
         self.truth_table = TRUTH_TABLE
 
     def execute(self, solution):
-        # Create proper copy
-        new_solution = CircuitSolution()
-        new_solution.variables = [deepcopy(solution.variables[0])]
-        new_solution.objectives = [None]
-        new_solution.constraints = []
-        new_solution.attributes = {}
+        # New solution sharing the (immutable) circuit
+        new_solution = CircuitSolution(solution.variables[0])
 
         # Adaptive mutation rate (lower for better solutions)
-        fitness_val = solution.objectives[0] if solution.objectives[0] is not None else 0.0
+        fitness_val = self.solution_fitness(solution)
         # Higher fitness = lower mutation rate
         adaptive_rate = self.mutation_probability * (1.0 - fitness_val * 0.5)
 
@@ -46,89 +44,44 @@ class CircuitMutation(Mutation):
             if mutation_type == 'add':
                 # Insert at random position
                 pos = random.randint(0, len(circuit))
-                circuit.insert(pos, random_gate())
+                circuit = circuit[:pos] + (random_gate(),) + circuit[pos:]
+                new_solution.variables[0] = circuit
             elif mutation_type == 'remove':
                 # Remove random gate
                 idx = random.randint(0, len(circuit) - 1)
-                del circuit[idx]
+                circuit = circuit[:idx] + circuit[idx + 1:]
+                new_solution.variables[0] = circuit
             elif mutation_type == 'change':
                 # Change random gate with another
                 idx = random.randint(0, len(circuit) - 1)
-                circuit[idx] = random_gate()
+                circuit = circuit[:idx] + (random_gate(),) + circuit[idx + 1:]
+                new_solution.variables[0] = circuit
             elif mutation_type == 'swap':
                 # Swap two random gates
                 if len(circuit) > 1:
-                    i, j = random.sample(range(len(circuit)), 2)
-                    circuit[i], circuit[j] = circuit[j], circuit[i]
+                    i, j = sorted(random.sample(range(len(circuit)), 2))
+                    circuit = circuit[:i] + (circuit[j],) + circuit[i + 1:j] + (circuit[i],) + circuit[j + 1:]
+                    new_solution.variables[0] = circuit
             elif mutation_type == 'split':
                 # Consider only a subset of the circuit
                 if len(circuit) > 2:
                     start = random.randint(0, len(circuit) - 2)
                     end = random.randint(start + 1, len(circuit) - 1)
                     circuit = circuit[start:end]
+                    new_solution.variables[0] = circuit
             elif mutation_type == 'optimize':
                 # Perform post-optimization
-                circuit = self.post_optimize(circuit)
+                optimized = tuple(self.post_optimize(circuit))
+                if len(optimized) >= MIN_GENES:
+                    new_solution.variables[0] = optimized
 
         return new_solution
 
     def get_name(self) -> str:
         return "SafeMutation"
 
-    def perm_order(self, p):
-        idp = [0,1,2,3]
-        cur = p[:]
-        for k in range(1, 25): 
-            if cur == idp:
-                return k
-            cur = self.perm_compose(cur, p)
-        return 24
-
-    def perm_compose(self, p, q):
-        return [q[p[i]] for i in range(4)]
-
-    def gate_perm(self, gtype):
-        key = gtype[3:] if gtype.startswith("C") else gtype[1:]
-        return QSG_TABLE[key]
-
-    def gates_same_wire(self, g1, g2):
-        return (g1[0] == g2[0]) and (g1[1] == g2[1])
-
-    def simplify_local(self,circ):
-        if not circ:
-            return circ
-        out = []
-        for g in circ:
-            g = normalize_gate(g)
-            # drop exact duplicates
-            if out and g == out[-1]:
-                continue
-            # inverse cancellation on same wires (Z-like)
-            if out and self.gates_same_wire(g, out[-1]) and g[2][0] == out[-1][2][0]:
-                p1 = self.gate_perm(out[-1][2])
-                p2 = self.gate_perm(g[2])
-                comp = self.perm_compose(p1, p2)
-                if comp == [0,1,2,3]:
-                    out.pop()
-                    continue
-            out.append(g)
-
-        # power reduction: k repeats modulo permutation order
-        reduced = []
-        i = 0
-        while i < len(out):
-            j = i + 1
-            while j < len(out) and out[j] == out[i]:
-                j += 1
-            run_len = j - i
-            if run_len > 1:
-                ordk = self.perm_order(self.gate_perm(out[i][2]))
-                keep = run_len % ordk
-                reduced.extend([out[i]] * keep)
-            else:
-                reduced.append(out[i])
-            i = j
-        return reduced
+    def solution_fitness(self, solution):
+        return solution.objectives[0] if solution.objectives[0] is not None else 0.0
 
     def greedy_prune(self,circ):
         circ = circ[:]
@@ -143,84 +96,18 @@ class CircuitMutation(Mutation):
                     changed = True
                 else:
                     i += 1
-            circ = self.simplify_local(circ)
+            circ = peephole_optimize(circ)
         return circ
 
     def post_optimize(self,circ):
-        c1 = self.simplify_local(circ)
+        # Windows with a shorter known implementation (same permutation) are replaced first
+        if circuitstore.STORE is not None:
+            circ = circuitstore.STORE.shorten(circ)
+        # Peephole rewrites keep the permutation, then gates are pruned while the circuit stays correct
+        c1 = peephole_optimize(circ)
         if self.is_circuit_correct(c1):
-            c2 = self.merge_only(c1, 2)
-            if self.is_circuit_correct(c2):
-                c3 = self.greedy_prune(c2)
-                return c3
-            return c1
-        return circ
+            return self.greedy_prune(c1)
+        return c1
     
     def is_circuit_correct(self, circuit):
-        return fitness(circuit, self.truth_table) >= 1.0
-    
-    def merge_only(self, circuit, target_qudit=2):
-        def try_merge_cross_control(g1, g2):
-            if g1[2].startswith("C3Z") and g2[2].startswith("Z") and g1[1] == g2[0]:
-                p1, p2 = QSG_TABLE.get(g1[2][3:]), QSG_TABLE.get(g2[2][1:])
-                if p1 and p2:
-                    composed = [p2[i] for i in p1]
-                    for label, val in QSG_TABLE.items():
-                        if val == composed:
-                            return (g1[0], g2[1], f"C3Z{label}")
-            return None
-
-        merged, i = [], 0
-        while i < len(circuit):
-            g1 = circuit[i]
-            if g1[0] == g1[1]:
-                current_label = g1[2][1:] if g1[2].startswith("Z") else g1[2]
-                j = i + 1
-                while j < len(circuit) and circuit[j][:2] == g1[:2]:
-                    label2 = circuit[j][2][1:] if circuit[j][2].startswith("Z") else circuit[j][2]
-                    key = (f"Z{current_label}", f"Z{label2}")
-                    if key in MERGE_PATTERNS:
-                        current_label = MERGE_PATTERNS[key][1:]
-                        j += 1
-                    else: break
-                merged.append((g1[0], g1[1], f"Z{current_label}"))
-                i = j
-                continue
-            if i + 1 < len(circuit):
-                g2 = circuit[i + 1]
-                if g1[:2] == g2[:2] and (g1[2], g2[2]) in MERGE_PATTERNS:
-                    merged.append((g1[0], g1[1], MERGE_PATTERNS[(g1[2], g2[2])]))
-                    i += 2
-                    continue
-                cross = try_merge_cross_control(g1, g2)
-                if cross:
-                    merged.append(cross)
-                    i += 2
-                    continue
-            merged.append(g1)
-            i += 1
-        final = []
-        used_indices = set()
-        for i, g in enumerate(merged):
-            if i in used_indices: continue
-            ctrl, tgt, label = g
-            if ctrl == tgt:
-                composed_label = label
-                j = i + 1
-                while j < len(merged):
-                    if j in used_indices: j += 1; continue
-                    if merged[j][0] == merged[j][1] == ctrl:
-                        key = (composed_label, merged[j][2])
-                        if key in MERGE_PATTERNS:
-                            composed_label = MERGE_PATTERNS[key]
-                            used_indices.add(j)
-                            j += 1
-                            continue
-                        else: break
-                    elif ctrl in merged[j][:2] or tgt in merged[j][:2]: break
-                    j += 1
-                final.append((ctrl, tgt, composed_label))
-                used_indices.add(i)
-            else:
-                final.append(g)
-        return final
\ No newline at end of file
+        return is_correct(circuit, self.truth_table)
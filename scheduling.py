@@ -0,0 +1,152 @@
+# Depth of circuits and their schedule into layers of gates on disjoint lines
+
+import argparse
+from canonicalform import commuting_gates
+from gateencoding import OPCODES, encode_gate, read_circuit_file, write_circuit_file, gate_to_text
+from config import *
+
+# A correct circuit of n gates has fitness 1 + 1/n: the depth tie-breaker stays below half
+# the gap between two lengths, so it never reorders circuits of different lengths (and the
+# length is still round(1 / (fitness - 1)))
+DEPTH_TIEBREAK_SCALE = 1 / (2 * MAX_GENES * (MAX_GENES + 1))
+
+def line_levels(circuit, levels=None):
+    """Layer of the last gate on each line after the circuit, continuing from the levels of
+    a preceding circuit if given (so a circuit can be extended gate by gate)"""
+    levels = list(levels) if levels is not None else [0] * NUM_QULINES
+    for ctrl, tgt, _ in circuit:
+        level = (levels[ctrl] if levels[ctrl] > levels[tgt] else levels[tgt]) + 1
+        levels[ctrl] = levels[tgt] = level
+    return levels
+
+# Number of layers when each gate goes in the first layer after the gates sharing a line
+# with it, keeping the order of the circuit (a single-qudit gate has ctrl == tgt)
+def circuit_depth(circuit):
+    return max(line_levels(circuit))
+
+def depth_tiebreak(fitness_value, circuit):
+    """The fitness with DEPTH_TIEBREAK: among correct circuits of the same length, the
+    shallower one is fitter"""
+    if not DEPTH_TIEBREAK or fitness_value < 1.0 or not circuit:
+        return fitness_value
+    return fitness_value + (1 - circuit_depth(circuit) / len(circuit)) * DEPTH_TIEBREAK_SCALE
+
+def asap_layers(circuit):
+    """Gates of the circuit in layers, each gate as soon as the gates sharing a line with it
+    (in the order of the circuit)"""
+    levels = [0] * NUM_QULINES
+    layers = []
+    for gate in circuit:
+        ctrl, tgt, _ = gate
+        level = max(levels[ctrl], levels[tgt])
+        if level == len(layers):
+            layers.append([])
+        layers[level].append(gate)
+        levels[ctrl] = levels[tgt] = level + 1
+    return layers
+
+def alap_layers(circuit):
+    """Gates of the circuit in layers, each gate as late as the gates sharing a line with it
+    allow (same depth as asap_layers)"""
+    layers = asap_layers(list(reversed(circuit)))
+    return [list(reversed(layer)) for layer in reversed(layers)]
+
+def dependencies(circuit):
+    """predecessors[j]: indices of the earlier gates that gate j does not commute with.
+
+    Any order of the gates keeping each of them after its predecessors realizes the same
+    permutation. Only gates sharing a line can fail to commute; the commutation of each
+    pair comes from the permutations of the gate set (canonicalform.commuting_gates).
+    """
+    ops = [OPCODES.get(g) for g in circuit]
+    if None in ops:
+        ops = [encode_gate(g) for g in circuit]
+    on_line = [[] for _ in range(NUM_QULINES)]
+    predecessors = []
+    for j, (ctrl, tgt, _) in enumerate(circuit):
+        commutes = commuting_gates(ops[j])
+        earlier = set(on_line[ctrl]) | set(on_line[tgt])
+        predecessors.append(sorted(i for i in earlier if not commutes[ops[i]]))
+        on_line[ctrl].append(j)
+        if tgt != ctrl:
+            on_line[tgt].append(j)
+    return predecessors
+
+def commuting_layers(circuit):
+    """Gates in layers of gates on disjoint lines, reordering commuting gates to reduce the
+    depth.
+
+    List scheduling on the dependency graph: each layer is filled with the ready gates
+    (all their predecessors in earlier layers), those heading the longest chain of
+    dependent gates first. The result is never deeper than asap_layers.
+    """
+    predecessors = dependencies(circuit)
+    successors = [[] for _ in circuit]
+    for j, preds in enumerate(predecessors):
+        for i in preds:
+            successors[i].append(j)
+    # Length of the longest chain of dependent gates starting at each gate
+    chain = [1] * len(circuit)
+    for i in range(len(circuit) - 1, -1, -1):
+        if successors[i]:
+            chain[i] = 1 + max(chain[j] for j in successors[i])
+
+    waiting = [len(preds) for preds in predecessors]
+    ready = [j for j in range(len(circuit)) if waiting[j] == 0]
+    layers = []
+    while ready:
+        ready.sort(key=lambda j: (-chain[j], j))
+        layer, used, postponed = [], set(), []
+        for j in ready:
+            lines = {circuit[j][0], circuit[j][1]}
+            if lines & used:
+                postponed.append(j)
+            else:
+                layer.append(j)
+                used |= lines
+        for i in layer:
+            for j in successors[i]:
+                waiting[j] -= 1
+                if waiting[j] == 0:
+                    postponed.append(j)
+        layers.append([circuit[j] for j in sorted(layer)])
+        ready = postponed
+
+    asap = asap_layers(circuit)
+    return layers if len(layers) < len(asap) else asap
+
+# The circuit in the order of its commuting_layers (same gates, same permutation)
+def schedule_circuit(circuit):
+    return [gate for layer in commuting_layers(circuit) for gate in layer]
+
+def scheduled_depth(circuit):
+    return len(commuting_layers(circuit))
+
+def print_layers(layers):
+    index = 1
+    for number, layer in enumerate(layers, 1):
+        print(f"Layer {number}:")
+        for gate in layer:
+            print("  " + gate_to_text(index, gate))
+            index += 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the depth of circuit files and schedule their gates into layers")
+    parser.add_argument("files", nargs="+", help="circuit files (e.g. results/best_circuit_*.txt)")
+    parser.add_argument("--layers", action="store_true", help="print the layers of each scheduled circuit")
+    parser.add_argument("--output", help="file to write the scheduled circuit to (with a single input file)")
+    args = parser.parse_args()
+    if args.output and len(args.files) > 1:
+        parser.error("--output needs a single circuit file")
+
+    width = max(len(path) for path in args.files)
+    print(f"{'File':<{width}} {'Length':>6} {'Depth':>6} {'Scheduled':>9}")
+    for path in args.files:
+        circuit = read_circuit_file(path)
+        layers = commuting_layers(circuit)
+        print(f"{path:<{width}} {len(circuit):>6} {circuit_depth(circuit):>6} {len(layers):>9}")
+        if args.layers:
+            print_layers(layers)
+        if args.output:
+            write_circuit_file(args.output, [g for layer in layers for g in layer],
+                               f"Scheduled from {path} (Length: {len(circuit)}, Depth: {len(layers)})")
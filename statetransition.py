@@ -0,0 +1,257 @@
+import numpy as np
+from util import ALL_GATES, RowOrder, output_value, checked_lines, cone_of_influence, derived_data
+from gateencoding import OPCODES, NUM_OPCODES, OPCODE_CTRL, OPCODE_TGT, OPCODE_CONTROLLED, OPCODE_PERM, PERMS, encode_gate
+from config import *
+
+# The whole register as a single state index, line 0 being the most significant digit
+NUM_STATES = QUBASE ** NUM_QULINES
+
+def state_index(state):
+    index = 0
+    for value in state:
+        index = index * QUBASE + value
+    return index
+
+def state_tuple(index):
+    lines = []
+    for _ in range(NUM_QULINES):
+        index, value = divmod(index, QUBASE)
+        lines.append(value)
+    return tuple(reversed(lines))
+
+STATE_DTYPE = np.uint8 if NUM_STATES <= 256 else np.uint16 if NUM_STATES <= 65536 else np.uint32
+IDENTITY = np.arange(NUM_STATES, dtype=STATE_DTYPE)
+
+# Weight of each line's digit in a state index
+LINE_WEIGHTS = QUBASE ** np.arange(NUM_QULINES - 1, -1, -1, dtype=np.int64)
+
+# LINE_VALUES[line][s]: value of the line in state s
+LINE_VALUES = (IDENTITY.astype(np.int64) // LINE_WEIGHTS[:, None] % QUBASE).astype(np.uint8)
+
+# values[s]: util.output_value of state s on the given lines, the value checked against
+# a truth table checked on those lines
+def lines_values(lines):
+    values = np.zeros(NUM_STATES, dtype=np.uint8 if QUBASE ** len(lines) <= 256 else np.uint32)
+    for line in lines:
+        values = values * QUBASE + LINE_VALUES[line]
+    return values
+
+# The values of OUTPUT_LINES, checked for plain truth tables
+OUTPUT_VALUES = lines_values(OUTPUT_LINES)
+
+# Digit arithmetic of each opcode: OP_SHIFTS[op][v] is the change of the state index when
+# the target line holds v (and the gate is active)
+OP_SHIFTS = np.array([[(PERMS[OPCODE_PERM[op]][v] - v) * LINE_WEIGHTS[OPCODE_TGT[op]] for v in range(QUBASE)]
+                      for op in range(NUM_OPCODES)], dtype=np.int64)
+OP_TGT_WEIGHTS = LINE_WEIGHTS[np.array(OPCODE_TGT, dtype=np.intp)]
+OP_CTRL_WEIGHTS = LINE_WEIGHTS[np.array(OPCODE_CTRL, dtype=np.intp)]
+OP_CONTROLLED = np.array(OPCODE_CONTROLLED, dtype=bool)
+
+def apply_ops(ops, states):
+    """States reached from states through the gates with opcodes ops (broadcast together),
+    computed on the digits of the state indices, without any transition table"""
+    states = np.asarray(states, dtype=np.int64)
+    moved = states + OP_SHIFTS[ops, states // OP_TGT_WEIGHTS[ops] % QUBASE]
+    active = ~OP_CONTROLLED[ops] | (states // OP_CTRL_WEIGHTS[ops] % QUBASE == CONTROL_VALUE)
+    return np.where(active, moved, states)
+
+# Simulate a circuit on an array of state indices (e.g. the inputs of a truth table)
+def simulate_states(circuit, states):
+    states = np.asarray(states, dtype=np.int64)
+    for g in circuit:
+        op = OPCODES.get(g)
+        if op is None:
+            op = encode_gate(g)
+        moved = states + OP_SHIFTS[op][states // OP_TGT_WEIGHTS[op] % QUBASE]
+        if OP_CONTROLLED[op]:
+            moved = np.where(states // OP_CTRL_WEIGHTS[op] % QUBASE == CONTROL_VALUE, moved, states)
+        states = moved
+    return states
+
+# GATE_TRANSITIONS[op][s]: state reached from s through the gate with opcode op. Built only
+# for up to MAX_TABLE_STATES states; larger registers compute transitions when needed and
+# simulate the truth-table rows only
+if NUM_STATES <= MAX_TABLE_STATES:
+    GATE_TRANSITIONS = np.array([apply_ops(op, IDENTITY) for op in range(NUM_OPCODES)], dtype=STATE_DTYPE)
+else:
+    GATE_TRANSITIONS = None
+
+def gate_transition(gate):
+    op = OPCODES.get(gate)
+    if op is None:
+        op = encode_gate(gate)
+    if GATE_TRANSITIONS is not None:
+        return GATE_TRANSITIONS[op]
+    return apply_ops(op, IDENTITY).astype(STATE_DTYPE)
+
+# Transitions as byte strings padded to the 256 entries bytes.translate expects, so that
+# composing a gate into a permutation is a single C-level call (only for up to 256 states)
+if NUM_STATES <= 256 and GATE_TRANSITIONS is not None:
+    IDENTITY_BYTES = bytes(IDENTITY)
+    GATE_TRANSLATIONS = {g: bytes(GATE_TRANSITIONS[op]) + bytes(256 - NUM_STATES) for g, op in OPCODES.items()}
+else:
+    IDENTITY_BYTES = GATE_TRANSLATIONS = None
+
+def gate_translation(gate):
+    table = GATE_TRANSLATIONS.get(gate)
+    return table if table is not None else GATE_TRANSLATIONS[ALL_GATES[encode_gate(gate)]]
+
+def circuit_permutation_bytes(circuit):
+    perm = IDENTITY_BYTES
+    for g in circuit:
+        perm = perm.translate(gate_translation(g))
+    return perm
+
+# Permutation of the states realized by the whole circuit
+def circuit_permutation(circuit):
+    perm = IDENTITY
+    for g in circuit:
+        perm = gate_transition(g)[perm]
+    return perm
+
+# prefix[k]: permutation of the first k gates
+def prefix_permutations(circuit):
+    prefix = np.empty((len(circuit) + 1, NUM_STATES), dtype=STATE_DTYPE)
+    prefix[0] = IDENTITY
+    for k, g in enumerate(circuit):
+        prefix[k + 1] = gate_transition(g)[prefix[k]]
+    return prefix
+
+# suffix[k]: permutation of the gates from position k to the end
+def suffix_permutations(circuit):
+    n = len(circuit)
+    suffix = np.empty((n + 1, NUM_STATES), dtype=STATE_DTYPE)
+    suffix[n] = IDENTITY
+    for k in range(n - 1, -1, -1):
+        suffix[k] = suffix[k + 1][gate_transition(circuit[k])]
+    return suffix
+
+def inverse_permutation(perm):
+    inverse = np.empty_like(perm)
+    inverse[perm] = IDENTITY
+    return inverse
+
+# Permutation of the circuit after a single edit, from its prefix/suffix permutations
+def changed_permutation(prefix, suffix, index, gate):
+    return suffix[index + 1][gate_transition(gate)[prefix[index]]]
+
+def inserted_permutation(prefix, suffix, pos, gate):
+    return suffix[pos][gate_transition(gate)[prefix[pos]]]
+
+def removed_permutation(prefix, suffix, index):
+    return suffix[index + 1][prefix[index]]
+
+def swapped_permutation(prefix, suffix, circuit, i, j):
+    if i > j:
+        i, j = j, i
+    middle = prefix[j][inverse_permutation(prefix[i + 1])]
+    perm = gate_transition(circuit[j])[prefix[i]]
+    perm = gate_transition(circuit[i])[middle[perm]]
+    return suffix[j + 1][perm]
+
+class StateTruthTable:
+    """Truth table stored as input state indices and the expected value of the checked lines.
+
+    values[s] is the value of the checked lines in state s (OUTPUT_VALUES for plain truth
+    tables); values_bytes is None when there are more than 256 values.
+    """
+    def __init__(self, truth_table):
+        self.lines = checked_lines(truth_table)
+        self.num_values = QUBASE ** len(self.lines)
+        self.values = OUTPUT_VALUES if self.lines == tuple(OUTPUT_LINES) else lines_values(self.lines)
+        self.values_list = self.values.tolist()
+        self.values_bytes = bytes(self.values) if self.num_values <= 256 else None
+        self.inputs = np.array([state_index(inp) for inp in truth_table], dtype=np.intp)
+        self.expected = np.array([output_value(out, self.lines) for out in truth_table.values()],
+                                 dtype=self.values.dtype)
+        self.rows = len(truth_table)
+        self.row_pairs = list(zip(self.inputs.tolist(), self.expected.tolist()))
+        self.order = RowOrder(self.row_pairs)
+
+def state_truth_table(truth_table):
+    return derived_data(truth_table, "state", StateTruthTable)
+
+# Fitness of a circuit of the given length realizing perm: a single gather over the inputs
+def permutation_fitness(perm, length, truth_table):
+    table = state_truth_table(truth_table)
+    if isinstance(perm, bytes):
+        values = table.values_list
+        correct = 0
+        for inp, expected in table.row_pairs:
+            if values[perm[inp]] == expected:
+                correct += 1
+    else:
+        correct = int(np.count_nonzero(table.values[perm[table.inputs]] == table.expected))
+    if correct / table.rows < 1.0:
+        return correct / table.rows
+    else:
+        return 1 + (1/length)
+
+# Fitness of a circuit from the outputs of the truth-table rows
+def outputs_fitness(outputs, length, truth_table):
+    table = state_truth_table(truth_table)
+    correct = int(np.count_nonzero(table.values[outputs] == table.expected))
+    if correct / table.rows < 1.0:
+        return correct / table.rows
+    else:
+        return 1 + (1/length)
+
+# Drop-in replacement for util.fitness based on the circuit permutation
+def fitness(circuit, truth_table):
+    if GATE_TRANSLATIONS is not None:
+        return permutation_fitness(circuit_permutation_bytes(circuit), len(circuit), truth_table)
+    # Larger registers: only the truth-table rows go through the gates that can change
+    # the checked lines, with the transition tables if there are any
+    table = state_truth_table(truth_table)
+    gates = cone_of_influence(circuit, table.lines)
+    outputs = table.inputs
+    if GATE_TRANSITIONS is None:
+        outputs = simulate_states(gates, outputs)
+    else:
+        for g in gates:
+            outputs = gate_transition(g)[outputs]
+    return outputs_fitness(outputs, len(circuit), truth_table)
+
+# util.bounded_fitness on state indices. The row failed most often goes alone through
+# the gate tables, which is all a circuit failing it costs; the other rows are then
+# checked on the permutation of the whole circuit.
+def bounded_fitness(circuit, truth_table, threshold=1.0):
+    if GATE_TRANSITIONS is None:
+        # All rows are simulated together anyway: the exact fitness is as cheap
+        return fitness(circuit, truth_table)
+    table = state_truth_table(truth_table)
+    if GATE_TRANSLATIONS is not None:
+        steps = [GATE_TRANSLATIONS.get(g) or gate_translation(g) for g in circuit]
+    else:
+        # Whole-register permutations are costly: only the gates that matter are composed
+        gates = cone_of_influence(circuit, table.lines)
+        steps = [gate_transition(g) for g in gates]
+    values = table.values_list
+    order = table.order
+    rows = order.rows
+    wrong = 0
+
+    state, expected = rows[0]
+    for step in steps:
+        state = step[state]
+    if values[state] != expected:
+        wrong += 1
+        order.failed(rows[0])
+        if (table.rows - wrong) / table.rows <= threshold:
+            return (table.rows - wrong) / table.rows
+
+    if GATE_TRANSLATIONS is not None:
+        perm = IDENTITY_BYTES
+        for step in steps:
+            perm = perm.translate(step)
+    else:
+        perm = circuit_permutation(gates)
+    for row in rows[1:]:
+        if values[perm[row[0]]] != row[1]:
+            wrong += 1
+            order.failed(row)
+            if (table.rows - wrong) / table.rows <= threshold:
+                return (table.rows - wrong) / table.rows
+    if wrong:
+        return (table.rows - wrong) / table.rows
+    return 1 + (1/len(circuit))
@@ -0,0 +1,119 @@
+# Per-generation run telemetry, written as JSON Lines (or Parquet) by a background thread
+
+import json
+import os
+import queue
+import threading
+import time
+from config import *
+
+# Phases of a generation timed by ElitistGeneticAlgorithm.step
+PHASES = ("selection", "crossover", "mutation", "peephole", "evaluation", "replacement")
+
+class TelemetryWriter:
+    """Buffered writer of telemetry records.
+
+    record() only puts the record on a bounded queue, so the GA never waits for the disk;
+    a daemon thread writes the records in batches of buffer_size, or every flush_interval
+    seconds. When the queue is full the record is dropped and counted in self.dropped.
+    Use it as a context manager, or call close() to write what is left. With append, JSON
+    Lines records are added to an existing file.
+    """
+    def __init__(self, path, file_format=TELEMETRY_FORMAT, buffer_size=TELEMETRY_BUFFER,
+                 flush_interval=1.0, max_queue=100000, append=False, **fields):
+        if file_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown telemetry format '{file_format}', expected 'jsonl' or 'parquet'")
+        self.path = path
+        self.file_format = file_format
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        # Fields added to every record (e.g. run, island)
+        self.fields = fields
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0
+        self.parquet_writer = None
+        if file_format == "jsonl":
+            # A resumed run appends to the records written before it stopped
+            open(path, "a" if append else "w").close()
+        else:
+            # Parquet needs pyarrow (optional); fail here rather than in the writer thread
+            import pyarrow.parquet
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def record(self, data):
+        try:
+            self.queue.put_nowait({**self.fields, **data})
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_loop(self):
+        buffer = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ()
+            if item:
+                buffer.append(item)
+            if item is None or len(buffer) >= self.buffer_size or time.monotonic() >= deadline:
+                if buffer:
+                    self._write(buffer)
+                    buffer = []
+                deadline = time.monotonic() + self.flush_interval
+            if item is None:
+                break
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+    def _write(self, records):
+        if self.file_format == "jsonl":
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in records))
+            return
+        # Each batch becomes a row group
+        import pyarrow
+        import pyarrow.parquet
+        if self.parquet_writer is None:
+            table = pyarrow.Table.from_pylist(records)
+            self.parquet_writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        else:
+            table = pyarrow.Table.from_pylist(records, schema=self.parquet_writer.schema)
+        self.parquet_writer.write_table(table)
+
+def truncate_telemetry(path, generation):
+    """Drop the JSON Lines records after generation, written by a run that stopped after its
+    last checkpoint: the resumed run records those generations again"""
+    if not path.endswith(".jsonl") or not os.path.exists(path):
+        return
+    with open(path) as f:
+        lines = f.readlines()
+    kept = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A record cut short by the crash
+            continue
+        if record.get("generation", 0) <= generation:
+            kept.append(line)
+    with open(path, "w") as f:
+        f.writelines(kept)
+
+# Telemetry file of a run (or of one island of it), next to its log
+def telemetry_path(log_path, island=None):
+    stem = log_path[:-len(".log")] if log_path.endswith(".log") else log_path
+    suffix = f"_island{island}" if island is not None else ""
+    return f"{stem}{suffix}_telemetry.{TELEMETRY_FORMAT}"
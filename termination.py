@@ -0,0 +1,77 @@
+from jmetal.util.termination_criterion import TerminationCriterion
+from config import *
+
+class TerminationByFitness(TerminationCriterion):
+    def __init__(self, target_fitness: float, max_evaluation: int):
+        super(TerminationByFitness, self).__init__()
+        self.target_fitness = target_fitness
+        self.best_fitness = float('-inf')
+        self.max_evaluations = max_evaluation
+        self.evaluations = 0
+
+    @property
+    def is_met(self):
+        #return self.best_fitness == self.target_fitness or 
+        return self.evaluations >= self.max_evaluations
+    
+    def update(self, *args, **kwargs):
+        self.evaluations = kwargs["EVALUATIONS"]
+        # Best solution of the algorithm this criterion is registered to
+        result = kwargs.get("SOLUTIONS")
+        if result is not None:
+            current_best = max(result.objectives)
+            if current_best > self.best_fitness:
+                self.best_fitness = current_best
+
+class AdaptiveTermination(TerminationByFitness):
+    """Evaluation budget together with the stop policies of config.py (0 or None disables
+    each): "time_limit" after TIME_LIMIT seconds, "target_length" once a correct circuit
+    of at most TARGET_LENGTH gates is found, "length_stagnation" when no shorter correct
+    circuit has been found for LENGTH_PATIENCE generations, and "evaluations" when the
+    budget is spent. reason is the policy that stopped the run (None while running).
+
+    The progress is read from the algorithm at each update (GENERATION, BEST_SEEN,
+    SHORTEST_CORRECT, LAST_SHORTER), so a resumed run picks it up from its checkpoint.
+    """
+    def __init__(self, max_evaluation: int, time_limit=TIME_LIMIT, target_length=TARGET_LENGTH,
+                 length_patience=LENGTH_PATIENCE):
+        super(AdaptiveTermination, self).__init__(1.0, max_evaluation)
+        self.time_limit = time_limit
+        self.target_length = target_length
+        self.length_patience = length_patience
+        self.computing_time = 0.0
+        self.generation = 0
+        self.best_seen = 0.0
+        # Length of the shortest correct circuit (None before the first one) and the
+        # generation it was found
+        self.shortest_correct = None
+        self.last_shorter = 0
+        self.reason = None
+
+    @property
+    def is_met(self):
+        if self.reason is None:
+            self.reason = self.stop_reason()
+        return self.reason is not None
+
+    def stop_reason(self):
+        # A correct circuit of n gates has fitness 1 + 1/n
+        correct = self.best_seen > 1.0
+        if self.target_length and correct and round(1 / (self.best_seen - 1.0)) <= self.target_length:
+            return "target_length"
+        if (self.length_patience and self.shortest_correct is not None
+                and self.generation - self.last_shorter >= self.length_patience):
+            return "length_stagnation"
+        if self.time_limit and self.computing_time >= self.time_limit:
+            return "time_limit"
+        if self.evaluations >= self.max_evaluations:
+            return "evaluations"
+        return None
+
+    def update(self, *args, **kwargs):
+        super(AdaptiveTermination, self).update(*args, **kwargs)
+        self.computing_time = kwargs.get("COMPUTING_TIME", self.computing_time)
+        self.generation = kwargs.get("GENERATION", self.generation)
+        self.best_seen = kwargs.get("BEST_SEEN", self.best_seen)
+        self.shortest_correct = kwargs.get("SHORTEST_CORRECT", self.shortest_correct)
+        self.last_shorter = kwargs.get("LAST_SHORTER", self.last_shorter)
@@ -0,0 +1,40 @@
+import os
+import random
+import sys
+import pytest
+
+# The modules live at the root of the repository and read their paths from it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from util import TRUTH_TABLES, random_gate
+from gateencoding import read_circuit_file
+
+# Correct circuits of results/ and the truth table each realizes
+RESULT_CIRCUITS = {
+    "LowerThan": "lower",
+    "GreaterThan": "greater",
+    "Equal": "equal",
+    "FullComparator": "ququart",
+    "SubComparator": "subcomparator",
+}
+
+@pytest.fixture(params=sorted(TRUTH_TABLES))
+def truth_table(request):
+    return TRUTH_TABLES[request.param]()
+
+@pytest.fixture
+def circuits():
+    """Random circuits of every length up to 20, the same on every run"""
+    rng_state = random.getstate()
+    random.seed(1)
+    circuits = [tuple(random_gate() for _ in range(length)) for length in range(1, 21) for _ in range(3)]
+    random.setstate(rng_state)
+    return circuits
+
+@pytest.fixture(params=sorted(RESULT_CIRCUITS))
+def correct_circuit(request):
+    """(circuit, truth table) of a correct circuit from results/"""
+    circuit = read_circuit_file(f"results/best_circuit_{request.param}.txt")
+    return circuit, TRUTH_TABLES[RESULT_CIRCUITS[request.param]]()
@@ -0,0 +1,31 @@
+import numpy as np
+import batchsimulator
+import util
+
+def test_fitness_matches_util(truth_table, circuits):
+    for circuit in circuits:
+        assert batchsimulator.fitness(circuit, truth_table) == util.fitness(circuit, truth_table)
+
+def test_correct_circuits(correct_circuit):
+    circuit, truth_table = correct_circuit
+    assert batchsimulator.fitness(circuit, truth_table) == util.fitness(circuit, truth_table) > 1
+
+def test_simulate_batch_matches_simulate_circuit(truth_table, circuits):
+    states = np.array(list(truth_table))
+    for circuit in circuits[::5]:
+        outputs = batchsimulator.simulate_batch(circuit, states)
+        expected = [util.simulate_circuit(circuit, tuple(state)) for state in truth_table]
+        assert outputs.tolist() == [list(state) for state in expected]
+
+def test_batch_table_is_built_once_per_table(truth_table):
+    table = batchsimulator.batch_truth_table(truth_table)
+    assert batchsimulator.batch_truth_table(truth_table) is table
+    assert table.inputs.shape == table.expected.shape == (len(truth_table), util.NUM_QULINES)
+    assert table.columns == list(util.checked_lines(truth_table))
+
+def test_simulate_batch_leaves_its_input_unchanged(circuits):
+    states = np.array(list(util.generate_lower_truth_table()))
+    before = states.copy()
+    for circuit in circuits[-3:]:
+        assert not np.array_equal(batchsimulator.simulate_batch(circuit, states), states)
+        assert np.array_equal(states, before)
@@ -0,0 +1,36 @@
+import argparse
+from benchmark import PhaseCapture, compare_results, run_suite
+
+def results(**values):
+    return {"results": {name: {"value": value, "unit": "us"} for name, value in values.items()}}
+
+def test_compare_flags_slowdowns_and_lost_solutions():
+    old = results(fitness=10.0, copy=2.0, first=1.5, gone=1.0)
+    new = results(fitness=10.5, copy=3.0, first=None)
+    rows = {name: regression for name, _, _, regression in compare_results(old, new, 0.1)}
+    assert rows == {"fitness": False, "copy": True, "first": True}
+
+def test_capture_matches_its_phase_and_its_sized_entries():
+    capture = PhaseCapture("generation")
+    assert capture.matches("generation") and capture.matches("generation[20]")
+    assert not capture.matches("generations") and not capture.matches("first_correct[lower]")
+    assert not PhaseCapture(None).matches("generation")
+
+def test_threshold_of_the_comparison():
+    old, new = results(fitness=10.0), results(fitness=11.5)
+    assert [regression for *_, regression in compare_results(old, new, 0.2)] == [False]
+    assert [regression for *_, regression in compare_results(old, new, 0.1)] == [True]
+    # Entries of the new run only are not compared
+    assert compare_results(results(), new) == []
+
+def test_suite_entries_and_profiled_first_correct(tmp_path):
+    args = argparse.Namespace(circuits=10, length=10, repeat=1, populations=[20], generations=2,
+                              tables=["lower"], population=20, max_generations=3)
+    capture = PhaseCapture("first_correct", profile=True)
+    suite = run_suite(args, capture)
+    assert {"copy", "mutation", "generation[20]", "allocations[20]", "first_correct[lower]"} <= set(suite)
+    assert suite["allocations[20]"]["value"] > 0
+    assert "generations" in suite["first_correct[lower]"]
+    # The time-to-first-correct run happened inside the capture
+    profiled = {getattr(entry.code, "co_name", entry.code) for entry in capture.profiler.getstats()}
+    assert "first_correct" in profiled and "step" in profiled
@@ -0,0 +1,48 @@
+import util
+from canonicalform import canonical_circuit, canonical_ops, commuting_gates, distinct_first
+from gateencoding import encode_gate
+from statetransition import circuit_permutation_bytes
+
+def test_canonical_form_keeps_permutation_and_fitness(truth_table, circuits):
+    for circuit in circuits:
+        canonical = canonical_circuit(circuit)
+        assert len(canonical) == len(circuit)
+        assert circuit_permutation_bytes(canonical) == circuit_permutation_bytes(circuit)
+        assert util.fitness(canonical, truth_table) == util.fitness(circuit, truth_table)
+
+def test_swapping_commuting_gates_keeps_the_form(circuits):
+    for circuit in circuits:
+        for i in range(len(circuit) - 1):
+            a, b = circuit[i], circuit[i + 1]
+            if commuting_gates(encode_gate(b))[encode_gate(a)]:
+                swapped = circuit[:i] + (b, a) + circuit[i + 2:]
+                assert canonical_ops(swapped) == canonical_ops(circuit)
+
+def test_canonical_form_is_idempotent(circuits):
+    for circuit in circuits:
+        assert canonical_circuit(canonical_circuit(circuit)) == canonical_circuit(circuit)
+
+def test_distinct_first_puts_duplicates_last(circuits):
+    first, second = circuits[10], circuits[20]
+    items = [first, canonical_circuit(first), second]
+    assert distinct_first(items, 3) == [first, second, canonical_circuit(first)]
+    assert distinct_first(items, 2) == [first, second]
+
+def test_replacement_keeps_one_solution_per_canonical_circuit(monkeypatch, circuits):
+    import geneticalgorithm
+    from circuitsolution import CircuitSolution
+    monkeypatch.setattr(geneticalgorithm, "CANONICAL_DEDUPE", True)
+    algorithm = geneticalgorithm.build_algorithm(util.generate_lower_truth_table(), population_size=4)
+    # The fittest circuit, also in an equivalent order, then circuits of decreasing fitness
+    swapped = next(c for c in circuits if len(c) > 1 and commuting_gates(encode_gate(c[1]))[encode_gate(c[0])]
+                   and c[0] != c[1])
+    genomes = [swapped, swapped[1::-1] + swapped[2:], swapped] + [c for c in circuits[30:35]]
+    solutions = []
+    for k, genome in enumerate(genomes):
+        solution = CircuitSolution(genome)
+        solution.objectives[0] = 0.5 - k / 100
+        solutions.append(solution)
+    population = algorithm.replacement(solutions[:4], solutions[4:])
+    assert len(population) == 4
+    assert len({canonical_ops(s.variables[0]) for s in population}) == 4
+    assert population[0] is solutions[0] and population[1:] == solutions[3:6]
@@ -0,0 +1,74 @@
+import json
+import random
+import time
+import pytest
+import util
+from checkpoint import VERSION, load_checkpoint, restore_checkpoint, save_checkpoint
+from fitnessbackend import FITNESS_CACHE
+from geneticalgorithm import build_algorithm
+from telemetry import truncate_telemetry
+from util import generate_lower_truth_table, generate_equal_truth_table, random_gate
+
+def seeds():
+    random.seed(5)
+    return [tuple(random_gate() for _ in range(4)) for _ in range(30)]
+
+def started(truth_table):
+    random.seed(1)
+    FITNESS_CACHE.clear()
+    algorithm = build_algorithm(truth_table, 20, seed_circuits=seeds())
+    algorithm.start_computing_time = time.time()
+    algorithm.solutions = algorithm.evaluate(algorithm.create_initial_solutions())
+    algorithm.init_progress()
+    return algorithm
+
+def advance(algorithm, generations):
+    for _ in range(generations):
+        algorithm.step()
+        algorithm.update_progress()
+
+def test_resumed_run_continues_exactly(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    truth_table = generate_lower_truth_table()
+    uninterrupted = started(truth_table)
+    advance(uninterrupted, 4)
+    save_checkpoint(uninterrupted, path)
+    advance(uninterrupted, 4)
+
+    # As in runscheduler: a new algorithm, with the full seed queue, put in the saved state
+    resumed = build_algorithm(truth_table, 20, seed_circuits=seeds())
+    restore_checkpoint(resumed, load_checkpoint(path))
+    # The initial population took 20 of the 30 seeds
+    assert len(resumed.problem.seed_circuits) == 10
+    advance(resumed, 4)
+    assert [s.variables[0] for s in resumed.solutions] == [s.variables[0] for s in uninterrupted.solutions]
+    assert [s.objectives[0] for s in resumed.solutions] == [s.objectives[0] for s in uninterrupted.solutions]
+    assert resumed.problem.seed_circuits == uninterrupted.problem.seed_circuits
+    assert resumed.generation_count == uninterrupted.generation_count
+    assert (resumed.shortest_correct, resumed.last_shorter) == (uninterrupted.shortest_correct,
+                                                                uninterrupted.last_shorter)
+    for solution in resumed.solutions:
+        assert solution.objectives[0] == util.fitness(solution.variables[0], truth_table)
+
+def test_checkpoint_of_another_truth_table_is_refused(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    save_checkpoint(started(generate_lower_truth_table()), path)
+    with pytest.raises(ValueError):
+        restore_checkpoint(started(generate_equal_truth_table()), load_checkpoint(path))
+
+def test_truncate_drops_later_and_partial_records(tmp_path):
+    path = tmp_path / "run_telemetry.jsonl"
+    path.write_text("".join(json.dumps({"generation": g}) + "\n" for g in range(1, 6)) + '{"gener')
+    truncate_telemetry(str(path), 3)
+    assert [json.loads(line)["generation"] for line in path.read_text().splitlines()] == [1, 2, 3]
+
+def test_checkpoint_of_another_version_is_refused(tmp_path):
+    path = tmp_path / "run.ckpt"
+    save_checkpoint(started(generate_lower_truth_table()), str(path))
+    # The file is written in place of a temporary one
+    assert [p.name for p in tmp_path.iterdir()] == ["run.ckpt"]
+    data = bytearray(path.read_bytes())
+    data[4:6] = (VERSION - 1).to_bytes(2, "little")
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match=f"version {VERSION}"):
+        load_checkpoint(str(path))
@@ -0,0 +1,53 @@
+import random
+from circuitsolution import CircuitSolution
+from circuitcrossover import CircuitCrossover
+from safemutation import CircuitMutation
+from util import generate_lower_truth_table
+
+def test_copies_share_the_circuit(circuits):
+    solution = CircuitSolution(list(circuits[5]))
+    solution.objectives[0] = 0.5
+    copy = solution.copy()
+    assert isinstance(solution.variables[0], tuple)
+    assert copy.variables[0] is solution.variables[0]
+    assert copy.objectives == solution.objectives and copy.attributes is not solution.attributes
+
+def test_operators_leave_the_parents_unchanged(circuits):
+    random.seed(3)
+    truth_table = generate_lower_truth_table()
+    mutation, crossover = CircuitMutation(1.0, truth_table), CircuitCrossover(1.0)
+    parents = [CircuitSolution(c) for c in circuits]
+    for parent in parents:
+        parent.objectives[0] = 0.5
+    before = [p.variables[0] for p in parents]
+    for i in range(0, len(parents) - 1, 2):
+        for child in crossover.execute(parents[i:i + 2]):
+            mutation.execute(child)
+        mutation.execute(parents[i])
+    assert [p.variables[0] for p in parents] == before
+
+def test_mutations_edit_a_copy_of_the_circuit(circuits, monkeypatch):
+    import safemutation
+    random.seed(4)
+    truth_table = generate_lower_truth_table()
+    parent = CircuitSolution(circuits[30])
+    # Fitness 0: a rate of 1 always mutates
+    parent.objectives[0] = 0.0
+    circuit = parent.variables[0]
+    assert CircuitMutation(0.0, truth_table).execute(parent).variables[0] is circuit
+
+    choice = random.choice
+    def mutated(kind):
+        # random.choice also draws the gates
+        monkeypatch.setattr(safemutation.random, "choice", lambda seq: kind if kind in seq else choice(seq))
+        return CircuitMutation(1.0, truth_table).execute(parent).variables[0]
+
+    removed = mutated("remove")
+    assert len(removed) == len(circuit) - 1 and any(removed == circuit[:i] + circuit[i + 1:] for i in range(len(circuit)))
+    changed = mutated("change")
+    assert len(changed) == len(circuit) and sum(a != b for a, b in zip(changed, circuit)) <= 1
+    swapped = mutated("swap")
+    assert sorted(swapped) == sorted(circuit) and sum(a != b for a, b in zip(swapped, circuit)) <= 2
+    split = mutated("split")
+    assert 0 < len(split) < len(circuit) and any(split == circuit[i:i + len(split)] for i in range(len(circuit)))
+    assert parent.variables[0] is circuit
@@ -0,0 +1,84 @@
+import sqlite3
+import util
+import circuitstore
+from circuitstore import CircuitStore, table_fingerprint
+from statetransition import circuit_permutation_bytes
+from util import TruthSpec, generate_lower_truth_table
+
+def padded(circuit):
+    # Gates whose product is the identity, spliced into the circuit
+    gate = circuit[0]
+    order = 1
+    perm = util.GATE_INFO[gate[2]][1]
+    state = list(perm)
+    while state != list(range(util.QUBASE)):
+        state = [perm[v] for v in state]
+        order += 1
+    return list(circuit[:2]) + [gate] * order + list(circuit[2:])
+
+def test_shorten_keeps_permutation_and_fitness(tmp_path, correct_circuit, circuits):
+    circuit, truth_table = correct_circuit
+    store = CircuitStore(str(tmp_path / "store.db"))
+    store.record(truth_table, circuit)
+    for candidate in [padded(circuit)] + [list(c) for c in circuits]:
+        shortened = store.shorten(candidate)
+        assert len(shortened) <= len(candidate)
+        assert circuit_permutation_bytes(shortened) == circuit_permutation_bytes(candidate)
+        assert util.fitness(shortened, truth_table) >= util.fitness(candidate, truth_table)
+    assert len(store.shorten(padded(circuit))) <= len(circuit)
+
+def test_best_circuits_by_truth_table(tmp_path, correct_circuit):
+    circuit, truth_table = correct_circuit
+    store = CircuitStore(str(tmp_path / "store.db"))
+    store.record(truth_table, circuit)
+    store.record(truth_table, padded(circuit))
+    assert store.best_circuits(truth_table, 1) == [list(circuit)]
+    assert store.best_circuits(TruthSpec(truth_table, range(util.NUM_QULINES)), 1) == []
+
+def test_fingerprint_covers_the_control_value(monkeypatch):
+    truth_table = generate_lower_truth_table()
+    fingerprint = table_fingerprint(truth_table)
+    monkeypatch.setattr(circuitstore, "CONTROL_VALUE", circuitstore.CONTROL_VALUE - 1)
+    assert table_fingerprint(truth_table) != fingerprint
+
+def test_shortcuts_of_another_gate_set_are_ignored(tmp_path, monkeypatch, correct_circuit):
+    circuit, truth_table = correct_circuit
+    store = CircuitStore(str(tmp_path / "store.db"))
+    monkeypatch.setattr(circuitstore, "CONTROL_VALUE", circuitstore.CONTROL_VALUE - 1)
+    store.record(truth_table, circuit)
+    monkeypatch.undo()
+    assert list(store.shortcut_table()) == [circuitstore.IDENTITY_BYTES]
+
+def test_shortcuts_of_an_older_store_are_dropped(tmp_path):
+    path = str(tmp_path / "store.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE permutations (permutation BLOB PRIMARY KEY, circuit BLOB NOT NULL, "
+                       "length INTEGER NOT NULL)")
+    connection.execute("INSERT INTO permutations VALUES (?, ?, ?)", (b"x", b"", 0))
+    connection.commit()
+    connection.close()
+    assert list(CircuitStore(path).shortcut_table()) == [circuitstore.IDENTITY_BYTES]
+
+def test_stored_shortcuts_shorten_mutated_circuits(tmp_path, monkeypatch, correct_circuit):
+    import safemutation
+    from circuitsolution import CircuitSolution
+    circuit, truth_table = correct_circuit
+    store = CircuitStore(str(tmp_path / "store.db"))
+    store.record(truth_table, circuit)
+    monkeypatch.setattr(circuitstore, "STORE", store)
+    monkeypatch.setattr(safemutation.random, "choice", lambda types: "optimize")
+    parent = CircuitSolution(padded(circuit))
+    child = safemutation.CircuitMutation(1.0, truth_table).execute(parent)
+    assert len(child.variables[0]) <= len(circuit) < len(parent.variables[0])
+    assert util.fitness(child.variables[0], truth_table) >= 1
+
+def test_the_store_is_only_used_when_enabled(tmp_path):
+    assert circuitstore.STORE is None
+    path = str(tmp_path / "store.db")
+    try:
+        store = circuitstore.use_store(path)
+        assert circuitstore.STORE is store and store.path == path
+        assert circuitstore.use_store(path) is store
+    finally:
+        circuitstore.use_store(None)
+    assert circuitstore.STORE is None
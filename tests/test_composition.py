@@ -0,0 +1,32 @@
+import pytest
+import util
+from composition import ComparatorLayout, build_comparator, comparator_rows, optimize_seams, seam_window
+
+@pytest.mark.parametrize("digits", [1, 2, 3])
+def test_composed_comparators_are_correct(digits):
+    circuit, layout, accuracy = build_comparator(digits)
+    assert accuracy == 1.0
+    inputs, expected = comparator_rows(layout, max_rows=200)
+    for state, result in zip(inputs.tolist(), expected.tolist()):
+        assert util.simulate_circuit(circuit, tuple(state))[layout.output] == result
+
+def test_seam_optimization_never_lengthens():
+    plain, layout, _ = build_comparator(3, seams=False)
+    optimized, _, accuracy = build_comparator(3)
+    assert accuracy == 1.0 and len(optimized) <= len(plain)
+    inputs, _ = comparator_rows(layout, max_rows=500)
+    for state in inputs.tolist():
+        assert (util.simulate_circuit(optimized, tuple(state))[layout.output]
+                == util.simulate_circuit(plain, tuple(state))[layout.output])
+
+def test_layout_of_a_3_digit_comparator():
+    layout = ComparatorLayout(3)
+    assert (layout.a, layout.b, layout.c) == ([0, 3, 6], [1, 4, 7], [2, 5, 8])
+    assert layout.merges == [9, 10] and layout.output == 10 and layout.num_lines == 11
+
+def test_inverse_pair_across_a_seam_is_removed():
+    blocks = [[(0, 1, "C3Z+1"), (4, 4, "Z+1")], [(4, 4, "Z+1"), (0, 2, "C3Z+1")]]
+    circuit = [g for block in blocks for g in block]
+    # The last gate would take the window to 4 lines, and it shares line 0 with it
+    assert seam_window(circuit, 2, 3) == ([0, 1, 2], {0, 1, 4})
+    assert optimize_seams(blocks, 3) == [(0, 1, "C3Z+1"), (0, 2, "C3Z+1")]
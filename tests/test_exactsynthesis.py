@@ -0,0 +1,43 @@
+import subprocess
+import sys
+import util
+from exactsynthesis import synthesize, seed_circuits
+from util import generate_lower_truth_table, generate_subcomparator_truth_table
+
+def test_minimal_subcomparator():
+    truth_table = generate_subcomparator_truth_table()
+    assert synthesize(truth_table, 5) == (None, 5)
+    circuit, bound = synthesize(truth_table, 6)
+    assert bound == 6 and len(circuit) == 6
+    assert util.fitness(circuit, truth_table) == 1 + 1 / 6
+
+def test_node_limit_lowers_the_bound():
+    circuit, bound = synthesize(generate_lower_truth_table(), 8, max_nodes=1000)
+    assert circuit is None and bound < 8
+
+def test_seed_circuits_are_valid_circuits():
+    truth_table = generate_lower_truth_table()
+    seeds = seed_circuits(truth_table, 5, max_length=4, max_nodes=200000)
+    assert len(seeds) == 5
+    for seed in seeds:
+        assert 0 < len(seed) <= 2
+        assert 0 <= util.fitness(seed, truth_table) < 1
+
+BASE_5_SEARCH = """
+import random
+import config
+config.QUBASE, config.CONTROL_VALUE = 5, 4
+import util
+from exactsynthesis import synthesize
+from statetransition import NUM_STATES
+random.seed(2)
+circuit = [util.random_gate() for _ in range(2)]
+truth_table = {inp: util.simulate_circuit(circuit, inp) for inp in util.generate_lower_truth_table()}
+found, bound = synthesize(truth_table, 2)
+assert NUM_STATES == 125 and 0 < len(found) == bound <= 2
+assert util.fitness(found, truth_table) == 1 + 1 / len(found)
+"""
+
+def test_search_in_base_5():
+    # 125 states: the configuration has to be set before the modules are imported
+    subprocess.run([sys.executable, "-c", BASE_5_SEARCH], check=True)
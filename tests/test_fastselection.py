@@ -0,0 +1,49 @@
+import random
+import pytest
+from jmetal.operator.selection import BinaryTournamentSelection
+from circuitsolution import CircuitSolution
+from fastselection import VectorizedBinaryTournamentSelection, fitness_array, ranked_solutions, top_solutions
+from geneticalgorithm import build_algorithm
+from util import generate_lower_truth_table
+
+def population(fitnesses):
+    solutions = []
+    for value in fitnesses:
+        solution = CircuitSolution([])
+        solution.objectives[0] = value
+        solutions.append(solution)
+    return solutions
+
+def test_top_solutions_as_a_stable_sort():
+    solutions = population([0.5, None, 1.2, 0.5, 0.9])
+    expected = sorted(solutions, key=lambda s: s.objectives[0] if s.objectives[0] is not None else float("-inf"),
+                      reverse=True)
+    assert top_solutions(solutions, 5) == expected
+    assert top_solutions(solutions, 2, fitness_array(solutions)) == expected[:2]
+
+def test_tournament_keeps_the_jmetal_comparison():
+    # The smaller objective wins, as with BinaryTournamentSelection's DominanceComparator
+    random.seed(4)
+    selected = VectorizedBinaryTournamentSelection().select(population([0.2, 0.9]), 100)
+    assert {s.objectives[0] for s in selected} == {0.2}
+    solutions = population([k / 10 for k in range(10)])
+    vectorized = VectorizedBinaryTournamentSelection().select(solutions, 4000)
+    reference = [BinaryTournamentSelection().execute(solutions) for _ in range(4000)]
+    # Expected value of the smaller of two distinct draws: 0.27 (0.45 at random)
+    for selected in (vectorized, reference):
+        assert abs(sum(s.objectives[0] for s in selected) / len(selected) - 0.27) < 0.02
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 10])
+def test_ranked_solutions_in_the_order_of_top_solutions(chunk_size):
+    random.seed(6)
+    solutions = population([random.choice([None, 0.25, 0.5, 0.75, 1.1]) for _ in range(40)])
+    assert list(ranked_solutions(solutions, chunk_size)) == top_solutions(solutions, len(solutions))
+
+def test_replacement_keeps_the_fittest_in_sorted_order():
+    random.seed(2)
+    algorithm = build_algorithm(generate_lower_truth_table(), population_size=6)
+    parents, offspring = population([0.3, 0.6, 0.1, 0.6]), population([0.5, None, 0.7, 0.3])
+    survivors = algorithm.replacement(parents, offspring)
+    expected = sorted(parents + offspring, reverse=True,
+                      key=lambda s: s.objectives[0] if s.objectives[0] is not None else float("-inf"))[:6]
+    assert survivors == expected
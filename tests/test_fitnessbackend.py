@@ -0,0 +1,46 @@
+import pytest
+import util
+from fitnessbackend import BOUNDED_BACKENDS, FITNESS_BACKENDS, FITNESS_CACHE, bounded_fitness, get_fitness, is_correct
+
+@pytest.mark.parametrize("backend", sorted(FITNESS_BACKENDS))
+def test_backends_match_util(backend, truth_table, circuits):
+    for circuit in circuits:
+        assert FITNESS_BACKENDS[backend](circuit, truth_table) == util.fitness(circuit, truth_table)
+
+@pytest.mark.parametrize("backend", sorted(BOUNDED_BACKENDS))
+@pytest.mark.parametrize("threshold", [0.0, 0.5, 0.9, 1.0])
+def test_bounded_fitness_is_exact_above_threshold(backend, threshold, truth_table, circuits):
+    for circuit in circuits:
+        exact = util.fitness(circuit, truth_table)
+        value = BOUNDED_BACKENDS[backend](circuit, truth_table, threshold)
+        if value > threshold:
+            assert value == exact
+        else:
+            assert exact <= value <= threshold
+
+def test_cached_bounded_fitness_and_correctness(correct_circuit, circuits):
+    circuit, truth_table = correct_circuit
+    FITNESS_CACHE.clear()
+    for candidate in circuits + [circuit]:
+        for _ in range(2):
+            value = bounded_fitness(candidate, truth_table, 0.5)
+            exact = util.fitness(candidate, truth_table)
+            assert value == exact if value > 0.5 else exact <= value
+        assert is_correct(candidate, truth_table) == (util.fitness(candidate, truth_table) >= 1)
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_fitness("gpu")
+
+def test_rows_failed_most_often_are_checked_first():
+    order = util.RowOrder("abcd", resort_interval=3)
+    rows = order.rows
+    for row in "dcd":
+        order.failed(row)
+    assert order.rows == list("dcab") and rows == list("abcd")
+    # Not resorted before the next resort_interval failures
+    for row in "bb":
+        order.failed(row)
+    assert order.rows == list("dcab")
+    order.failed("b")
+    assert order.rows == list("bdca")
@@ -0,0 +1,38 @@
+import util
+from fitnesscache import FitnessCache, table_key
+from util import TruthSpec, generate_lower_truth_table
+
+def test_cached_values_match_util(truth_table, circuits):
+    cache = FitnessCache(util.fitness, max_size=1000)
+    for _ in range(2):
+        for circuit in circuits:
+            assert cache.fitness(circuit, truth_table) == util.fitness(circuit, truth_table)
+    assert cache.hits >= len(circuits)
+
+def test_least_recently_used_entry_is_evicted(circuits):
+    truth_table = generate_lower_truth_table()
+    cache = FitnessCache(util.fitness, max_size=2)
+    first, second, third = circuits[0], circuits[3], circuits[6]
+    cache.fitness(first, truth_table)
+    cache.fitness(second, truth_table)
+    cache.fitness(first, truth_table)
+    cache.fitness(third, truth_table)
+    assert cache.evictions == 1
+    assert cache.lookup(cache.key(second, truth_table)) is None
+    assert cache.lookup(cache.key(first, truth_table)) is not None
+
+def test_table_key_by_content_and_checked_lines():
+    assert table_key(generate_lower_truth_table()) == table_key(generate_lower_truth_table())
+    table = generate_lower_truth_table()
+    assert table_key(TruthSpec(table, range(util.NUM_QULINES))) != table_key(table)
+
+def test_circuits_equal_up_to_commuting_gates_share_an_entry():
+    truth_table = generate_lower_truth_table()
+    cache = FitnessCache(util.fitness, max_size=10)
+    circuit = ((0, 0, "Z+1"), (1, 1, "Z+2"), (0, 2, "C3Z+1"))
+    commuted = ((1, 1, "Z+2"), (0, 0, "Z+1"), (0, 2, "C3Z+1"))
+    assert cache.fitness(circuit, truth_table) == cache.fitness(commuted, truth_table)
+    assert (cache.hits, cache.misses, len(cache.entries)) == (1, 1, 1)
+    # The controlled gate does not commute with the gate on its control line: another entry
+    cache.fitness(((0, 2, "C3Z+1"), (0, 0, "Z+1"), (1, 1, "Z+2")), truth_table)
+    assert len(cache.entries) == 2
@@ -0,0 +1,43 @@
+import pytest
+import util
+from gateencoding import (compile_circuit, decompile_circuit, encode_gate, make_opcode, simulate_compiled,
+                          circuit_to_text, circuit_from_text, COMPOSE_TABLE, INVERSE_TABLE, PERMS, IDENTITY_PERM,
+                          OPCODE_CONTROLLED, OPCODE_CTRL, OPCODE_PERM, OPCODE_TGT)
+
+def test_every_gate_round_trips():
+    for op, gate in enumerate(util.ALL_GATES):
+        assert encode_gate(gate) == op
+        assert decompile_circuit(compile_circuit([gate]))[0] is gate
+
+def test_single_qudit_gates_are_normalized():
+    gate = next(g for g in util.ALL_GATES if not util.GATE_INFO[g[2]][0])
+    assert encode_gate((gate[0] + 1, gate[1], gate[2])) == encode_gate(gate)
+
+def test_unknown_gate_is_rejected():
+    with pytest.raises(ValueError):
+        encode_gate((0, 1, "X"))
+
+def test_simulate_compiled_matches_simulate_circuit(truth_table, circuits):
+    for circuit in circuits:
+        codes = compile_circuit(circuit)
+        for inp in truth_table:
+            assert simulate_compiled(codes, inp) == util.simulate_circuit(circuit, inp)
+
+def test_text_round_trip(correct_circuit):
+    circuit, truth_table = correct_circuit
+    parsed = circuit_from_text(circuit_to_text(circuit, "header"))
+    assert parsed == list(circuit)
+    assert util.fitness(parsed, truth_table) == util.fitness(circuit, truth_table)
+
+def test_compose_and_inverse_tables():
+    for i, first in enumerate(PERMS):
+        assert COMPOSE_TABLE[i][INVERSE_TABLE[i]] == IDENTITY_PERM
+        for j, second in enumerate(PERMS):
+            assert PERMS[COMPOSE_TABLE[i][j]] == tuple(second[x] for x in first)
+
+def test_opcode_fields_describe_the_gate():
+    for op, (ctrl, tgt, gtype) in enumerate(util.ALL_GATES):
+        controlled, perm = util.GATE_INFO[gtype]
+        assert (OPCODE_CTRL[op], OPCODE_TGT[op], OPCODE_CONTROLLED[op]) == (ctrl, tgt, controlled)
+        assert PERMS[OPCODE_PERM[op]] == tuple(perm)
+        assert make_opcode(ctrl, tgt, OPCODE_PERM[op], controlled) == op
@@ -0,0 +1,44 @@
+import queue
+import pytest
+import geneticalgorithm
+import islandmodel
+import util
+from gateencoding import decompile_circuit
+from islandmodel import migration_targets, receive_migrants, run_islands
+from util import generate_lower_truth_table
+
+@pytest.mark.parametrize("topology", ["ring", "random"])
+def test_migration_targets_form_a_cycle(topology):
+    for epoch in range(5):
+        targets = migration_targets(6, epoch, topology)
+        island, visited = 0, set()
+        for _ in range(6):
+            visited.add(island)
+            island = targets[island]
+        assert island == 0 and visited == set(range(6))
+
+def test_migrants_of_a_later_epoch_wait_for_it():
+    inbox, pending = queue.Queue(), {}
+    for epoch in (2, 1, 3):
+        inbox.put((epoch, [f"migrants {epoch}"]))
+    assert receive_migrants(inbox, pending, 1, timeout=1) == ["migrants 1"]
+    assert pending == {2: ["migrants 2"]}
+    assert receive_migrants(inbox, pending, 2, timeout=1) == ["migrants 2"]
+    assert receive_migrants(inbox, pending, 3, timeout=1) == ["migrants 3"]
+    assert not pending and inbox.empty()
+    with pytest.raises(queue.Empty):
+        receive_migrants(inbox, pending, 4, timeout=0.01)
+
+@pytest.mark.parametrize("n_migrants", [0, 3])
+def test_islands_report_their_fitness(monkeypatch, n_migrants):
+    # Islands are forked, so they see the patched budget: 4 x 40 evaluations, the initial
+    # population and 3 generations
+    monkeypatch.setattr(islandmodel, "POP_SIZE", 40)
+    monkeypatch.setattr(geneticalgorithm, "GENERATIONS", 4)
+    truth_table = generate_lower_truth_table()
+    circuit, fitness_value, reports = run_islands(truth_table, seed=1, n_islands=2, interval=1,
+                                                  n_migrants=n_migrants, timeout=60)
+    assert fitness_value == util.fitness(circuit, truth_table)
+    for report in reports:
+        assert report["generations"] == 3
+        assert report["fitness"] == util.fitness(decompile_circuit(report["circuit"]), truth_table)
@@ -0,0 +1,72 @@
+import random
+import numpy as np
+import util
+from circuitsolution import CircuitSolution
+from multiobjective import (MultiObjectiveCircuitProblem, build_pareto_algorithm, circuit_objectives,
+                            nondominated_ranks, pareto_front)
+from scheduling import circuit_depth
+from util import generate_lower_truth_table
+
+def wrong_rows(circuit, truth_table):
+    lines = util.checked_lines(truth_table)
+    return sum(util.output_value(util.simulate_circuit(circuit, inp), lines) != util.output_value(expected, lines)
+               for inp, expected in truth_table.items())
+
+def test_objectives_match_util(truth_table, circuits):
+    objectives = circuit_objectives(circuits, truth_table)
+    for circuit, (wrong, gates, controlled, depth) in zip(circuits, objectives.tolist()):
+        assert wrong == wrong_rows(circuit, truth_table)
+        assert gates == len(circuit)
+        assert controlled == sum(util.GATE_INFO[g[2]][0] for g in circuit)
+        assert depth == circuit_depth(circuit)
+
+def test_problem_keeps_the_single_objective_fitness(truth_table, circuits):
+    problem = MultiObjectiveCircuitProblem(truth_table)
+    solutions = [CircuitSolution(c) for c in circuits]
+    problem.evaluate_batch(solutions)
+    for solution in solutions:
+        assert solution.attributes["fitness"] == util.fitness(solution.variables[0], truth_table)
+
+def test_ranks_match_pairwise_domination():
+    rng = np.random.default_rng(0)
+    objectives = rng.integers(0, 4, (40, 4))
+    objectives[:20, 0] = 0
+    ranks = nondominated_ranks(objectives)
+    def dominates(a, b):
+        if a[0] != b[0]:
+            return a[0] < b[0]
+        return a[0] == 0 and all(a <= b) and any(a < b)
+    for i in range(len(objectives)):
+        for j in range(len(objectives)):
+            if dominates(objectives[i], objectives[j]):
+                assert ranks[i] < ranks[j]
+        if ranks[i] > 0:
+            assert any(dominates(objectives[k], objectives[i]) and ranks[k] == ranks[i] - 1
+                       for k in range(len(objectives)))
+
+def test_pareto_front_of_a_short_run():
+    random.seed(1)
+    truth_table = generate_lower_truth_table()
+    algorithm = build_pareto_algorithm(truth_table, population_size=30, generations=5)
+    algorithm.run()
+    front = algorithm.result()
+    assert front
+    for solution in front:
+        circuit = solution.variables[0]
+        assert solution.objectives[0] == wrong_rows(circuit, truth_table)
+        assert solution.attributes["fitness"] == util.fitness(circuit, truth_table)
+
+def test_pareto_front_keeps_one_solution_per_optimal_point(circuits):
+    def solutions(*points):
+        made = []
+        for circuit, point in zip(circuits, points):
+            solution = CircuitSolution(circuit)
+            solution.objectives = list(point)
+            made.append(solution)
+        return made
+
+    a, same, b, dominated, wrong = solutions([0, 5, 2, 3], [0, 5, 2, 3], [0, 4, 3, 4], [0, 6, 2, 3], [2, 1, 0, 1])
+    assert pareto_front([a, same, b, dominated, wrong]) == [b, a]
+    # Without a correct circuit, only the optimal circuits with the fewest wrong rows remain
+    fewest, longer, more = solutions([1, 3, 1, 2], [1, 4, 1, 2], [2, 1, 0, 1])
+    assert pareto_front([longer, more, fewest]) == [fewest]
@@ -0,0 +1,33 @@
+import util
+from circuitsolution import CircuitSolution
+from neighbourhood import apply_move, local_search, neighbourhood_fitness, single_edit_moves
+
+def test_every_neighbour_scores_like_util(truth_table, circuits):
+    for circuit in circuits[::12]:
+        moves = single_edit_moves(len(circuit))
+        fits = neighbourhood_fitness(circuit, truth_table, moves)
+        for k in range(0, len(fits), 7):
+            neighbour = apply_move(circuit, int(moves[0][k]), int(moves[1][k]), int(moves[2][k]))
+            assert len(neighbour) == moves[3][k]
+            assert fits[k] == util.fitness(neighbour, truth_table)
+
+def test_local_search_never_worsens(truth_table, circuits):
+    for circuit in circuits[::6]:
+        solution = CircuitSolution(circuit)
+        solution.objectives[0] = util.fitness(circuit, truth_table)
+        result = local_search(solution, truth_table, "steepest", 0, 3)
+        assert result.objectives[0] == util.fitness(result.variables[0], truth_table)
+        assert result.objectives[0] >= solution.objectives[0]
+
+def test_local_search_undoes_a_single_edit(correct_circuit):
+    circuit, truth_table = correct_circuit
+    circuit = tuple(circuit)
+    exact = util.fitness(circuit, truth_table)
+    # One changed gate, and one inserted gate: the original circuit is a neighbour of both
+    changed = next(circuit[:-1] + (g,) for g in util.ALL_GATES if util.fitness(circuit[:-1] + (g,), truth_table) < 1)
+    inserted = circuit + (circuit[-1],)
+    for edited in (changed, inserted):
+        solution = CircuitSolution(edited)
+        solution.objectives[0] = util.fitness(edited, truth_table)
+        result = local_search(solution, truth_table, "steepest", 0, 1)
+        assert result.objectives[0] >= exact and len(result.variables[0]) <= len(circuit)
@@ -0,0 +1,36 @@
+import util
+from circuitsolution import CircuitSolution
+from fitnessbackend import FITNESS_CACHE
+from parallelevaluator import ProcessPoolEvaluator, _evaluate_batch, _init_worker, _pack_batch
+from quantumcircuitproblem import QuantumCircuitProblem
+
+def test_batches_evaluate_like_util(truth_table, circuits):
+    _init_worker(truth_table)
+    assert _evaluate_batch(_pack_batch(circuits)) == [util.fitness(c, truth_table) for c in circuits]
+
+def test_pool_matches_util(circuits, correct_circuit):
+    circuit, truth_table = correct_circuit
+    problem = QuantumCircuitProblem(truth_table)
+    solutions = [CircuitSolution(c) for c in circuits + [tuple(circuit)]]
+    FITNESS_CACHE.clear()
+    with ProcessPoolEvaluator(processes=2, chunk_size=7) as evaluator:
+        evaluated = evaluator.evaluate(solutions, problem)
+    assert [s.variables[0] for s in evaluated] == [s.variables[0] for s in solutions]
+    for solution in evaluated:
+        assert solution.objectives[0] == util.fitness(solution.variables[0], truth_table)
+
+def test_only_uncached_circuits_are_sent(circuits):
+    truth_table = util.generate_lower_truth_table()
+    problem = QuantumCircuitProblem(truth_table)
+    FITNESS_CACHE.clear()
+    with ProcessPoolEvaluator(processes=2, chunk_size=4) as evaluator:
+        evaluator.evaluate([CircuitSolution(c) for c in circuits[:20]], problem)
+        sent = []
+        pool_map = evaluator.pool.map
+        evaluator.pool.map = lambda function, batches: sent.extend(batches) or pool_map(function, batches)
+        evaluated = evaluator.evaluate([CircuitSolution(c) for c in circuits[10:30]], problem)
+    assert [list(lengths) for lengths, _ in sent] == [[len(c) for c in circuits[20:24]],
+                                                       [len(c) for c in circuits[24:28]],
+                                                       [len(c) for c in circuits[28:30]]]
+    for solution in evaluated:
+        assert solution.objectives[0] == util.fitness(solution.variables[0], truth_table)
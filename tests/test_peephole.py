@@ -0,0 +1,41 @@
+import math
+import util
+from peephole import peephole_optimize
+from safemutation import CircuitMutation
+from statetransition import circuit_permutation_bytes
+
+def test_rewrites_keep_permutation_and_fitness(truth_table, circuits):
+    for circuit in circuits:
+        optimized = peephole_optimize(circuit)
+        assert len(optimized) <= len(circuit)
+        assert circuit_permutation_bytes(optimized) == circuit_permutation_bytes(circuit)
+        assert util.fitness(optimized, truth_table) >= util.fitness(circuit, truth_table)
+
+def test_inverse_pairs_are_removed(correct_circuit):
+    circuit, truth_table = correct_circuit
+    gate = circuit[0]
+    perm = util.GATE_INFO[gate[2]][1]
+    inverse = next(g for g in util.ALL_GATES
+                   if g[:2] == gate[:2] and [util.GATE_INFO[g[2]][1][v] for v in perm] == list(range(util.QUBASE)))
+    optimized = peephole_optimize([gate, inverse] + list(circuit))
+    assert len(optimized) <= len(circuit)
+    assert util.fitness(optimized, truth_table) >= util.fitness(circuit, truth_table)
+
+def test_post_optimize_keeps_correct_circuits_correct(correct_circuit):
+    circuit, truth_table = correct_circuit
+    # Any permutation of QUBASE values repeated lcm(1..QUBASE) times is the identity
+    padding = [circuit[-1]] * math.lcm(*range(1, util.QUBASE + 1))
+    optimized = CircuitMutation(0.2, truth_table).post_optimize(list(circuit) + padding)
+    assert util.fitness(optimized, truth_table) >= 1
+
+def test_windows_join_gates_they_commute_with():
+    assert peephole_optimize([(0, 0, "Z+0")]) == []
+    # Three gates collapsing to none
+    assert peephole_optimize([(0, 0, "Z+1"), (0, 0, "Z+2"), (0, 0, "Z+3")]) == []
+    # An inverse pair across gates on other lines, within the lookahead only
+    circuit = [(0, 0, "Z+1"), (1, 1, "Z+2"), (2, 2, "Z+3"), (0, 0, "Z+1")]
+    assert peephole_optimize(circuit, lookahead=3) == circuit[1:3]
+    assert peephole_optimize(circuit, lookahead=2) == circuit
+    # A gate reading the line in between blocks the pair
+    blocked = [(0, 0, "Z+1"), (0, 1, "C3Z+1"), (0, 0, "Z+1")]
+    assert peephole_optimize(blocked) == blocked
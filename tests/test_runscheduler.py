@@ -0,0 +1,56 @@
+import os
+import pytest
+import runscheduler
+import util
+from gateencoding import write_circuit_file, read_circuit_file
+from checkpoint import checkpoint_path
+from runscheduler import OUTPUT_HEADER, recorded_runs, run_paths, save_best_circuit, schedule_runs, upgrade_header
+
+def write_output(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+def test_recorded_runs_skip_a_partial_row(tmp_path):
+    output = tmp_path / "output.txt"
+    write_output(output, OUTPUT_HEADER + "1,1.125,8,3.5,1,target,5\n2,0.75,12,4.0,2,evaluations,9\n3,1.1")
+    assert recorded_runs(str(output)) == {1: (1.125, 8), 2: (0.75, 12)}
+
+def test_best_circuit_is_the_first_fittest_run(tmp_path, monkeypatch, correct_circuit):
+    circuit, truth_table = correct_circuit
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("runs_test")
+    fitness_value = util.fitness(circuit, truth_table)
+    for run in (1, 2):
+        write_circuit_file(run_paths("test", run)[1], circuit[:len(circuit) - run + 1])
+    rows = {1: (0.5, len(circuit)), 2: (fitness_value, len(circuit) - 1), 3: (fitness_value, 1)}
+    best = save_best_circuit("test", rows, "best.txt")
+    assert best == list(circuit[:len(circuit) - 1])
+    assert read_circuit_file("best.txt") == best
+
+def test_upgrade_header_of_an_older_output_file():
+    rows = "1,1.125,8,3.5\n"
+    assert upgrade_header("Run,Best Fitness,Circuit Length,Time\n" + rows, "output.txt") == OUTPUT_HEADER + rows
+    assert upgrade_header(OUTPUT_HEADER + rows, "output.txt") == OUTPUT_HEADER + rows
+
+def test_upgrade_header_refuses_other_columns():
+    with pytest.raises(ValueError):
+        upgrade_header("Run,Time,Best Fitness\n1,3.5,1.125\n", "output.txt")
+
+def test_resumed_schedule_runs_the_missing_runs_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    started = []
+    def execute_run(run, seed, truth_table, circuit_name, resume=False, store=None):
+        started.append((run, seed, resume))
+        return run, 0.5, 4, 1.0, seed, "evaluations", 3
+    monkeypatch.setattr(runscheduler, "execute_run", execute_run)
+    os.makedirs("runs_test")
+    write_output(checkpoint_path(run_paths("test", 3)[0]), "")
+    # Run 2 is recorded, run 3 was cut short
+    write_output("output.txt", OUTPUT_HEADER + "2,0.75,12,4.0,12,evaluations,9\n3,0.")
+
+    schedule_runs(util.generate_lower_truth_table(), "test", 3, "output.txt", "best.txt",
+                  processes=1, base_seed=10, resume=True)
+    assert started == [(1, 11, True), (3, 13, True)]
+    assert sorted(recorded_runs("output.txt")) == [1, 2, 3]
+    # Recorded runs no longer need their checkpoint
+    assert not os.path.exists(checkpoint_path(run_paths("test", 3)[0]))
@@ -0,0 +1,41 @@
+import util
+import scheduling
+from scheduling import (alap_layers, asap_layers, circuit_depth, commuting_layers, depth_tiebreak,
+                        schedule_circuit, scheduled_depth)
+from statetransition import circuit_permutation_bytes
+
+def disjoint(layer):
+    lines = [line for gate in layer for line in {gate[0], gate[1]}]
+    return len(lines) == len(set(lines))
+
+def test_layers_hold_gates_on_disjoint_lines(circuits):
+    for circuit in circuits:
+        for layers in (asap_layers(circuit), alap_layers(circuit), commuting_layers(circuit)):
+            assert all(disjoint(layer) for layer in layers)
+            assert sorted(g for layer in layers for g in layer) == sorted(circuit)
+        assert len(asap_layers(circuit)) == len(alap_layers(circuit)) == circuit_depth(circuit)
+
+def test_schedule_keeps_permutation_and_fitness(truth_table, circuits):
+    for circuit in circuits:
+        scheduled = schedule_circuit(circuit)
+        assert circuit_permutation_bytes(scheduled) == circuit_permutation_bytes(circuit)
+        assert util.fitness(scheduled, truth_table) == util.fitness(circuit, truth_table)
+        assert scheduled_depth(circuit) <= circuit_depth(circuit)
+        assert circuit_depth(scheduled) == scheduled_depth(circuit)
+
+def test_depth_tiebreak_never_reorders_lengths(monkeypatch, correct_circuit):
+    monkeypatch.setattr(scheduling, "DEPTH_TIEBREAK", True)
+    circuit, truth_table = correct_circuit
+    fitness_value = util.fitness(circuit, truth_table)
+    shorter = 1 + 1 / (len(circuit) - 1)
+    # Circuits as deep as long (every gate on a line of the previous one) get no bonus
+    assert fitness_value <= depth_tiebreak(fitness_value, circuit) < shorter
+    assert (depth_tiebreak(fitness_value, circuit) > fitness_value) == (circuit_depth(circuit) < len(circuit))
+    assert depth_tiebreak(0.75, circuit) == 0.75
+
+def test_commuting_gates_share_a_layer():
+    # The two gates adding to line 1 commute, so the last one can run next to the first
+    circuit = [(0, 0, "Z+1"), (0, 1, "C3Z+1"), (1, 1, "Z+1")]
+    assert circuit_depth(circuit) == 3 and scheduled_depth(circuit) == 2
+    assert commuting_layers(circuit) == [[(0, 0, "Z+1"), (1, 1, "Z+1")], [(0, 1, "C3Z+1")]]
+    assert schedule_circuit(circuit) == [(0, 0, "Z+1"), (1, 1, "Z+1"), (0, 1, "C3Z+1")]
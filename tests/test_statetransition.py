@@ -0,0 +1,48 @@
+import numpy as np
+import util
+import statetransition
+from statetransition import (circuit_permutation, circuit_permutation_bytes, prefix_permutations,
+                             suffix_permutations, changed_permutation, inserted_permutation,
+                             removed_permutation, swapped_permutation, permutation_fitness,
+                             state_index, state_tuple, IDENTITY)
+
+def test_fitness_matches_util(truth_table, circuits):
+    for circuit in circuits:
+        assert statetransition.fitness(circuit, truth_table) == util.fitness(circuit, truth_table)
+
+def test_permutation_realizes_the_circuit(circuits):
+    for circuit in circuits[::7]:
+        perm = circuit_permutation(circuit)
+        assert bytes(perm.tolist()) == circuit_permutation_bytes(circuit)
+        for index in range(len(IDENTITY)):
+            assert state_tuple(perm[index]) == util.simulate_circuit(circuit, state_tuple(index))
+
+def test_state_index_round_trip():
+    for index in range(len(IDENTITY)):
+        assert state_index(state_tuple(index)) == index
+
+def test_single_edit_permutations(circuits):
+    gate = util.ALL_GATES[5]
+    for circuit in circuits[::5]:
+        prefix, suffix = prefix_permutations(circuit), suffix_permutations(circuit)
+        for i in range(len(circuit)):
+            changed = circuit[:i] + (gate,) + circuit[i + 1:]
+            assert np.array_equal(changed_permutation(prefix, suffix, i, gate), circuit_permutation(changed))
+            removed = circuit[:i] + circuit[i + 1:]
+            assert np.array_equal(removed_permutation(prefix, suffix, i), circuit_permutation(removed))
+            inserted = circuit[:i] + (gate,) + circuit[i:]
+            assert np.array_equal(inserted_permutation(prefix, suffix, i, gate), circuit_permutation(inserted))
+
+def test_permutation_fitness_of_arrays_and_bytes(truth_table, circuits):
+    for circuit in circuits[::4]:
+        exact = util.fitness(circuit, truth_table)
+        assert permutation_fitness(circuit_permutation(circuit), len(circuit), truth_table) == exact
+        assert permutation_fitness(circuit_permutation_bytes(circuit), len(circuit), truth_table) == exact
+
+def test_swapped_permutations(circuits):
+    for circuit in circuits[::9]:
+        prefix, suffix = prefix_permutations(circuit), suffix_permutations(circuit)
+        for i in range(len(circuit)):
+            for j in range(i + 1, len(circuit)):
+                swapped = circuit[:i] + (circuit[j],) + circuit[i + 1:j] + (circuit[i],) + circuit[j + 1:]
+                assert np.array_equal(swapped_permutation(prefix, suffix, circuit, j, i), circuit_permutation(swapped))
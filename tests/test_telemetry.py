@@ -0,0 +1,58 @@
+import json
+import random
+import time
+from geneticalgorithm import build_algorithm
+from telemetry import TelemetryWriter
+from util import generate_lower_truth_table
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def started(truth_table, population_size, telemetry=None):
+    random.seed(1)
+    algorithm = build_algorithm(truth_table, population_size, telemetry=telemetry)
+    algorithm.start_computing_time = time.time()
+    algorithm.solutions = algorithm.evaluate(algorithm.create_initial_solutions())
+    algorithm.init_progress()
+    return algorithm
+
+def test_generations_are_recorded(tmp_path):
+    path = str(tmp_path / "run_telemetry.jsonl")
+    truth_table = generate_lower_truth_table()
+    with TelemetryWriter(path, file_format="jsonl", seed=7) as telemetry:
+        algorithm = started(truth_table, 30, telemetry)
+        for _ in range(3):
+            algorithm.step()
+            algorithm.update_progress()
+    records = read_records(path)
+    assert [r["generation"] for r in records] == [1, 2, 3]
+    assert all(r["seed"] == 7 and r["evaluations"] > 0 for r in records)
+    assert records[-1]["best"] == max(s.objectives[0] for s in algorithm.solutions)
+
+def test_sampled_generations_and_event_generations_are_recorded(tmp_path, monkeypatch):
+    import geneticalgorithm
+    monkeypatch.setattr(geneticalgorithm, "TELEMETRY_INTERVAL", 3)
+    path = str(tmp_path / "run_telemetry.jsonl")
+    with TelemetryWriter(path, file_format="jsonl") as telemetry:
+        algorithm = started(generate_lower_truth_table(), 30, telemetry)
+        for _ in range(7):
+            algorithm.step()
+            algorithm.update_progress()
+    records = read_records(path)
+    generations = [r["generation"] for r in records]
+    assert {3, 6} <= set(generations) and len(generations) == len(set(generations))
+    assert all(r["events"] for r in records if r["generation"] % 3)
+    # Each record counts the cache lookups since the previous one
+    assert sum(r["cache_hits"] + r["cache_misses"] for r in records) <= algorithm.evaluations
+
+def test_reproduction_keeps_the_mutated_offspring(monkeypatch):
+    import geneticalgorithm
+    monkeypatch.setattr(geneticalgorithm, "PEEPHOLE_OFFSPRING", False)
+    algorithm = started(generate_lower_truth_table(), 20)
+    mutated = []
+    execute = algorithm.mutation_operator.execute
+    algorithm.mutation_operator.execute = lambda solution: mutated.append(execute(solution)) or mutated[-1]
+    offspring = algorithm.reproduction(algorithm.selection(algorithm.solutions))
+    assert len(offspring) == 20 and all(a is b for a, b in zip(offspring, mutated))
+    assert sum(algorithm.phase_times.values()) > 0
@@ -0,0 +1,81 @@
+import pytest
+import config
+import geneticalgorithm
+from circuitsolution import CircuitSolution
+from geneticalgorithm import build_algorithm
+from termination import AdaptiveTermination
+from util import generate_lower_truth_table
+
+def progress(evaluations=0, time=0.0, generation=0, best=0.5, shortest=None, shorter=0):
+    return dict(EVALUATIONS=evaluations, COMPUTING_TIME=time, GENERATION=generation,
+                BEST_SEEN=best, SHORTEST_CORRECT=shortest, LAST_SHORTER=shorter)
+
+@pytest.mark.parametrize("update, reason", [
+    (progress(best=1 + 1 / 6, shortest=6), "target_length"),
+    (progress(best=1 + 1 / 9, shortest=9, generation=30, shorter=5), "length_stagnation"),
+    (progress(best=0.9, generation=30, shorter=5, time=11.0), "time_limit"),
+    (progress(evaluations=1000), "evaluations"),
+    (progress(best=1 + 1 / 9, shortest=9, generation=20, shorter=5, time=5.0, evaluations=999), None),
+])
+def test_stop_reason(update, reason):
+    criterion = AdaptiveTermination(1000, time_limit=10, target_length=7, length_patience=20)
+    criterion.update(**update)
+    assert criterion.is_met == (reason is not None)
+    assert criterion.reason == reason
+
+@pytest.mark.parametrize("disabled", [0, None])
+def test_disabled_policies_only_leave_the_budget(disabled):
+    criterion = AdaptiveTermination(1000, time_limit=disabled, target_length=disabled, length_patience=disabled)
+    criterion.update(**progress(best=1.5, shortest=2, generation=10 ** 6, time=10 ** 6, evaluations=999))
+    assert not criterion.is_met
+    criterion.update(**progress(evaluations=1000))
+    assert criterion.is_met and criterion.reason == "evaluations"
+
+def test_only_the_budget_stops_runs_by_default():
+    assert config.TIME_LIMIT == config.TARGET_LENGTH == 0 and config.LENGTH_PATIENCE is None
+
+def test_length_stagnation_counts_from_the_last_shorter_circuit(correct_circuit):
+    circuit, truth_table = correct_circuit
+    algorithm = build_algorithm(truth_table, population_size=1)
+    algorithm.local_search = lambda solution: solution
+
+    def generation(genome, fitness_value):
+        solution = CircuitSolution(genome)
+        solution.objectives[0] = fitness_value
+        algorithm.solutions = algorithm.replacement([solution], [])
+        return algorithm.observable_data()
+
+    data = generation(circuit, 1 + 1 / len(circuit))
+    assert data["SHORTEST_CORRECT"] == len(circuit) and data["LAST_SHORTER"] == 1
+    # A fitter circuit of the same length does not reset the patience, a shorter one does
+    data = generation(circuit, 1 + 1 / len(circuit) + 1e-4)
+    assert data["SHORTEST_CORRECT"] == len(circuit) and data["LAST_SHORTER"] == 1
+    data = generation(circuit[1:], 0.9)
+    assert data["SHORTEST_CORRECT"] == len(circuit) and data["LAST_SHORTER"] == 1
+    data = generation(circuit[1:], 1 + 1 / (len(circuit) - 1))
+    assert data["SHORTEST_CORRECT"] == len(circuit) - 1 and data["LAST_SHORTER"] == 4
+    criterion = AdaptiveTermination(10 ** 6, length_patience=3)
+    criterion.update(**{**data, "EVALUATIONS": 0, "GENERATION": 6})
+    assert not criterion.is_met
+    criterion.update(**{**data, "EVALUATIONS": 0, "GENERATION": 7})
+    assert criterion.is_met and criterion.reason == "length_stagnation"
+
+def test_restarts_archive_the_best_solution(correct_circuit, monkeypatch):
+    monkeypatch.setattr(geneticalgorithm, "RESTART_PATIENCE", 3)
+    circuit, truth_table = correct_circuit
+    algorithm = build_algorithm(truth_table, population_size=4)
+    algorithm.local_search = lambda solution: solution
+    best = CircuitSolution(circuit)
+    best.objectives[0] = 1 + 1 / len(circuit)
+
+    algorithm.solutions = algorithm.replacement([best], [])
+    assert algorithm.restarts == 0 and algorithm.solutions[0] is best
+    # The best fitness stalls from generation 1: restarts at generations 4 and 7
+    for generation in range(2, 8):
+        algorithm.solutions = algorithm.replacement(algorithm.solutions[:1], [])
+        restarts = (generation - 1) // 3
+        assert algorithm.restarts == restarts
+        assert algorithm.last_restart == (3 * restarts + 1 if restarts else 0)
+    assert algorithm.archive is best and algorithm.stagnation_count == 0
+    assert best not in algorithm.solutions and len(algorithm.solutions) == 4
+    assert algorithm.result() is best
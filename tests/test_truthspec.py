@@ -0,0 +1,56 @@
+import pytest
+import util
+from gateencoding import read_circuit_file
+from fitnessbackend import BOUNDED_BACKENDS, FITNESS_BACKENDS
+from util import TruthSpec, checked_lines, cone_of_influence, output_value, restoring_spec, simulate_circuit
+
+# util.fitness without the cone of influence: every gate is simulated
+def full_fitness(circuit, truth_table):
+    lines = checked_lines(truth_table)
+    correct = sum(output_value(simulate_circuit(circuit, inp), lines) == output_value(expected, lines)
+                  for inp, expected in truth_table.items())
+    return correct / len(truth_table) if correct < len(truth_table) else 1 + 1 / len(circuit)
+
+@pytest.fixture(params=["plain", "restoring", "partial"])
+def spec(request, truth_table):
+    if request.param == "restoring":
+        return restoring_spec(truth_table)
+    if request.param == "partial":
+        # Half of the rows (the others are don't-care), checked on the first line only
+        return TruthSpec(list(truth_table.items())[::2], [0])
+    return truth_table
+
+def test_cone_of_influence_keeps_the_checked_lines(spec, circuits):
+    for circuit in circuits:
+        gates = cone_of_influence(circuit, checked_lines(spec))
+        for inp in spec:
+            assert (output_value(simulate_circuit(gates, inp), checked_lines(spec))
+                    == output_value(simulate_circuit(circuit, inp), checked_lines(spec)))
+
+@pytest.mark.parametrize("backend", sorted(FITNESS_BACKENDS))
+def test_backends_on_specs(backend, spec, circuits):
+    for circuit in circuits:
+        assert FITNESS_BACKENDS[backend](circuit, spec) == full_fitness(circuit, spec)
+        bounded = BOUNDED_BACKENDS[backend](circuit, spec, 0.5)
+        assert bounded == full_fitness(circuit, spec) if bounded > 0.5 else full_fitness(circuit, spec) <= bounded
+
+def test_restoring_spec_of_correct_circuits(correct_circuit):
+    circuit, truth_table = correct_circuit
+    restoring = restoring_spec(truth_table)
+    assert restoring.lines == tuple(range(util.NUM_QULINES))
+    assert util.fitness(circuit, restoring) <= util.fitness(circuit, truth_table)
+
+@pytest.mark.parametrize("name, table", [("LowerThan", "lower"), ("GreaterThan", "greater"), ("Equal", "equal"),
+                                         ("FullComparator", "ququart"), ("Subcomparator", "subcomparator")])
+def test_restoring_circuits_of_results(name, table):
+    circuit = read_circuit_file(f"results/best_circuit_{name}_restoring.txt")
+    assert util.fitness(circuit, restoring_spec(util.TRUTH_TABLES[table]())) == 1 + 1 / len(circuit)
+
+def test_cone_of_influence_skips_the_gates_of_unread_lines():
+    # Line 2 is checked; line 1 only matters up to the last gate reading it
+    feeds = (1, 2, "C3Z+1")
+    circuit = [(0, 0, "Z+1"), (0, 1, "C3Z+2"), feeds, (2, 1, "C3Z+3"), (0, 0, "Z+2")]
+    assert cone_of_influence(circuit, (2,)) == [(0, 0, "Z+1"), (0, 1, "C3Z+2"), feeds]
+    # Line 1 reads line 2, which reads line 1 back
+    assert cone_of_influence(circuit, (1,)) == circuit[:4]
+    assert cone_of_influence(circuit, (0, 1, 2)) == circuit
@@ -0,0 +1,76 @@
+import subprocess
+import sys
+import pytest
+import util
+from util import (CONTROLLED_PREFIX, EQUAL_VALUE, GATE_INFO, GREATER_VALUE, LOWER_VALUE, SUB_F, TRUTH_TABLES,
+                  checked_lines, output_value)
+
+def test_comparator_tables(truth_table):
+    for inp, expected in truth_table.items():
+        a, b = inp[util.DATA_LINES[0]], inp[util.DATA_LINES[1]]
+        assert 0 <= output_value(expected, checked_lines(truth_table)) < util.QUBASE ** len(checked_lines(truth_table))
+        assert a < util.QUBASE and b < util.QUBASE
+
+def test_ququart_results():
+    for inp, expected in TRUTH_TABLES["ququart"]().items():
+        a, b = inp[util.DATA_LINES[0]], inp[util.DATA_LINES[1]]
+        result = expected[util.OUTPUT_LINES[-1]]
+        assert result == (EQUAL_VALUE if a == b else GREATER_VALUE if a > b else LOWER_VALUE)
+
+def test_subcomparator_merges_results():
+    # The first result decides unless the second one is EQUAL
+    assert SUB_F[(LOWER_VALUE, EQUAL_VALUE)] == LOWER_VALUE
+    assert SUB_F[(GREATER_VALUE, LOWER_VALUE)] == LOWER_VALUE
+    assert SUB_F[(EQUAL_VALUE, EQUAL_VALUE)] == EQUAL_VALUE
+    assert len(TRUTH_TABLES["subcomparator"]()) == 9
+
+@pytest.mark.parametrize("name", ["greater", "ququart", "subcomparator"])
+def test_tables_needing_a_larger_base(monkeypatch, name):
+    monkeypatch.setattr(util, "QUBASE", 2)
+    with pytest.raises(ValueError):
+        TRUTH_TABLES[name]()
+
+def test_equal_table_in_a_smaller_base(monkeypatch):
+    monkeypatch.setattr(util, "QUBASE", 3)
+    values = {expected[util.OUTPUT_LINES[-1]] for expected in TRUTH_TABLES["equal"]().values()}
+    assert values == {0, 2}
+
+def test_controlled_gates_are_named_after_the_control_value():
+    assert CONTROLLED_PREFIX == f"C{util.CONTROL_VALUE}Z"
+    assert all(controlled == gtype.startswith(CONTROLLED_PREFIX) for gtype, (controlled, _) in GATE_INFO.items())
+
+def test_derived_data_is_kept_for_the_recent_tables_only(circuits):
+    import gc
+    import weakref
+    import statetransition
+    first = util.TruthSpec(util.generate_lower_truth_table())
+    assert statetransition.state_truth_table(first) is statetransition.state_truth_table(first)
+    freed = weakref.ref(first)
+    del first
+    tables = [util.TruthSpec(util.generate_lower_truth_table()) for _ in range(util.DERIVED_TABLES)]
+    for table in tables:
+        assert util.bounded_fitness(circuits[5], table, -1) == util.fitness(circuits[5], table)
+    gc.collect()
+    assert freed() is None
+    assert len(util._DERIVED) <= util.DERIVED_TABLES
+
+FOUR_TERNARY_LINES = """
+import random
+import config
+config.QUBASE, config.NUM_QULINES, config.CONTROL_VALUE, config.OUTPUT_LINES = 3, 4, 2, (3,)
+import math
+import util
+from fitnessbackend import FITNESS_BACKENDS
+assert len(util.ALL_GATES) == math.factorial(3) * 4 * 4
+random.seed(3)
+for name in ("lower", "equal"):
+    truth_table = util.TRUTH_TABLES[name]()
+    for length in range(1, 12):
+        circuit = [util.random_gate() for _ in range(length)]
+        for backend in FITNESS_BACKENDS.values():
+            assert backend(circuit, truth_table) == util.fitness(circuit, truth_table)
+"""
+
+def test_backends_on_four_ternary_lines():
+    # The configuration has to be set before the modules are imported
+    subprocess.run([sys.executable, "-c", FOUR_TERNARY_LINES], check=True)
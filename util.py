@@ -1,21 +1,72 @@
+import itertools
 import random
+from collections import OrderedDict
 from config import *
 
-# Gate Table (QSG)
-QSG_TABLE = {
-    '+0': [0, 1, 2, 3], '+1': [1, 0, 3, 2], '+2': [2, 3, 0, 1], '+3': [3, 2, 1, 0],
-    '123': [0, 2, 3, 1], '013': [1, 3, 2, 0], '021': [2, 0, 1, 3], '032': [3, 1, 0, 2],
-    '132': [0, 3, 1, 2], '012': [1, 2, 0, 3], '023': [2, 1, 3, 0], '031': [3, 0, 2, 1],
-    '23': [0, 1, 3, 2], '01': [1, 0, 2, 3], '0213': [2, 3, 1, 0], '0312': [3, 2, 0, 1],
-    '12': [0, 2, 1, 3], '0132': [1, 3, 0, 2], '0231': [2, 0, 3, 1], '03': [3, 1, 2, 0],
-    '13': [0, 3, 2, 1], '0123': [1, 2, 3, 0], '02': [2, 1, 0, 3], '0321': [3, 0, 1, 2]
-}
+# Label of a permutation in cycle notation (cycles separated by dots), "+0" for the identity
+def permutation_label(perm):
+    seen, cycles = set(), []
+    for start in range(len(perm)):
+        cycle = [start]
+        while perm[cycle[-1]] != start:
+            cycle.append(perm[cycle[-1]])
+        if len(cycle) > 1 and start not in seen:
+            cycles.append("".join(map(str, cycle)))
+        seen.update(cycle)
+    return ".".join(cycles) or "+0"
+
+# Every permutation of the QUBASE values, labelled by permutation_label
+def generate_permutation_table(base):
+    return {permutation_label(p): list(p) for p in itertools.permutations(range(base))}
+
+# Gate Table (QSG): the quaternary table keeps its published labels (+k for the XOR
+# shifts), other bases get every permutation in cycle notation
+if QUBASE == 4:
+    QSG_TABLE = {
+        '+0': [0, 1, 2, 3], '+1': [1, 0, 3, 2], '+2': [2, 3, 0, 1], '+3': [3, 2, 1, 0],
+        '123': [0, 2, 3, 1], '013': [1, 3, 2, 0], '021': [2, 0, 1, 3], '032': [3, 1, 0, 2],
+        '132': [0, 3, 1, 2], '012': [1, 2, 0, 3], '023': [2, 1, 3, 0], '031': [3, 0, 2, 1],
+        '23': [0, 1, 3, 2], '01': [1, 0, 2, 3], '0213': [2, 3, 1, 0], '0312': [3, 2, 0, 1],
+        '12': [0, 2, 1, 3], '0132': [1, 3, 0, 2], '0231': [2, 0, 3, 1], '03': [3, 1, 2, 0],
+        '13': [0, 3, 2, 1], '0123': [1, 2, 3, 0], '02': [2, 1, 0, 3], '0321': [3, 0, 1, 2]
+    }
+else:
+    QSG_TABLE = generate_permutation_table(QUBASE)
+
+# Label of each permutation in QSG_TABLE
+PERM_LABELS = {tuple(v): k for k, v in QSG_TABLE.items()}
+
+# Name prefix of the controlled gates, after the control value they act on (C3Z in base 4)
+CONTROLLED_PREFIX = f"C{CONTROL_VALUE}Z"
 
 # All possible gate types
 GATE_TYPES = []
 for shift in QSG_TABLE:
     GATE_TYPES.append(f"Z{shift}")
-    GATE_TYPES.append(f"C3Z{shift}")
+    GATE_TYPES.append(f"{CONTROLLED_PREFIX}{shift}")
+
+# Gate types parsed once: gtype -> (controlled, permutation)
+GATE_INFO = {}
+for shift, perm in QSG_TABLE.items():
+    GATE_INFO[f"Z{shift}"] = (False, perm)
+    GATE_INFO[f"{CONTROLLED_PREFIX}{shift}"] = (True, perm)
+
+# Every distinct gate; circuits share these tuples instead of holding their own copies
+ALL_GATES = []
+for gtype in GATE_TYPES:
+    if GATE_INFO[gtype][0]:
+        for ctrl in range(NUM_QULINES):
+            for tgt in range(NUM_QULINES):
+                if tgt != ctrl:
+                    ALL_GATES.append((ctrl, tgt, gtype))
+    else:
+        for line in range(NUM_QULINES):
+            ALL_GATES.append((line, line, gtype))
+GATE_POOL = {g: g for g in ALL_GATES}
+
+# Shared instance of a gate, if it is part of the gate set
+def intern_gate(g):
+    return GATE_POOL.get(g, g)
 
 # Generate a random gate
 def random_gate():
@@ -25,70 +76,121 @@ def random_gate():
         tgt = random.choice([i for i in range(NUM_QULINES) if i != ctrl])
     else:
         ctrl = tgt = random.randint(0, NUM_QULINES - 1)
-    return (ctrl, tgt, gtype)
+    return GATE_POOL[(ctrl, tgt, gtype)]
+
+# Lines holding the inputs of a truth table; the ancilla lines start from 0
+DATA_LINES = [line for line in range(NUM_QULINES) if line not in ANCILLA_LINES]
+
+# Row of a two-input comparator: a and b on the first two data lines, f on the last output line
+def comparator_row(a, b, f):
+    inp = [0] * NUM_QULINES
+    inp[DATA_LINES[0]], inp[DATA_LINES[1]] = a, b
+    out = list(inp)
+    out[OUTPUT_LINES[-1]] = f
+    return tuple(inp), tuple(out)
+
+# Results of the full comparator (ququart) and inputs of the subcomparator
+LOWER_VALUE, GREATER_VALUE, EQUAL_VALUE = 1, 2, 3
+
+# Tables writing or reading values above QUBASE - 1 cannot be built in a smaller base
+def require_base(table_name, largest_value):
+    if largest_value >= QUBASE:
+        raise ValueError(f"The {table_name} truth table uses the value {largest_value}, "
+                         f"which needs QUBASE > {largest_value} (QUBASE is {QUBASE})")
 
 # Truth table for LOWER: f = 1 if a < b
 def generate_lower_truth_table():
     table = {}
     for a in range(QUBASE):
         for b in range(QUBASE):
-            f = 1 if a < b else 0
-            table[(a, b, 0)] = (a, b, f)
+            f = LOWER_VALUE if a < b else 0
+            inp, out = comparator_row(a, b, f)
+            table[inp] = out
     return table
 
 def generate_equal_truth_table():
     table = {}
     for a in range(QUBASE):
         for b in range(QUBASE):
-            f = 3 if a == b else 0
-            table[(a, b, 0)] = (a, b, f)
+            f = QUBASE - 1 if a == b else 0
+            inp, out = comparator_row(a, b, f)
+            table[inp] = out
     return table
 
 def generate_greater_truth_table():
+    require_base("greater", GREATER_VALUE)
     table = {}
     for a in range(QUBASE):
         for b in range(QUBASE):
-            f = 2 if a > b else 0
-            table[(a, b, 0)] = (a, b, f)
+            f = GREATER_VALUE if a > b else 0
+            inp, out = comparator_row(a, b, f)
+            table[inp] = out
     return table
 
 def generate_ququart_truth_table():
+    require_base("ququart", EQUAL_VALUE)
     table = {}
     for a in range(QUBASE):
         for b in range(QUBASE):
             if a == b:
-                f = 3
+                f = EQUAL_VALUE
             elif a > b:
-                f = 2
+                f = GREATER_VALUE
             else:
-                f = 1
-            table[(a, b, 0)] = (a, b, f)
+                f = LOWER_VALUE
+            inp, out = comparator_row(a, b, f)
+            table[inp] = out
     return table
 
-SUB_F = {
-    (1,1):1, (1,2):2, (1,3):1,
-    (2,1):1, (2,2):2, (2,3):2,
-    (3,1):1, (3,2):2, (3,3):3,
-}
+# Subcomparator result: the first input when the second one is EQUAL, the second one otherwise
+SUB_F = {(a, b): a if b == EQUAL_VALUE else b
+         for a in (LOWER_VALUE, GREATER_VALUE, EQUAL_VALUE)
+         for b in (LOWER_VALUE, GREATER_VALUE, EQUAL_VALUE)}
 
 def generate_subcomparator_truth_table():
+    require_base("subcomparator", EQUAL_VALUE)
     tt = {}
-    for a in (1,2,3):
-        for b in (1,2,3):
-            f = SUB_F[(a,b)]
-            tt[(a, b, 0)] = (a, b, f)   # only ancilla (index 2) is enforced
+    for (a, b), f in SUB_F.items():
+        inp, out = comparator_row(a, b, f)
+        tt[inp] = out   # only the output lines are enforced
     return tt
 
-# Apply a single gate to a state
+class TruthSpec(dict):
+    """Truth table checked on the given lines only (a plain dict is checked on OUTPUT_LINES).
+
+    Like a truth table it maps input states to expected states; input states it does not
+    hold are don't-care rows, and only the expected values of lines are compared.
+    """
+    def __init__(self, rows=(), lines=OUTPUT_LINES):
+        super().__init__(rows)
+        self.lines = tuple(sorted(set(lines)))
+
+# Lines a truth table is checked on
+def checked_lines(truth_table):
+    return getattr(truth_table, "lines", tuple(OUTPUT_LINES))
+
+# Same rows, with the inputs restored: every line must end as in the expected state (the
+# data lines as they started, the ancillas other than the outputs back to 0)
+def restoring_spec(truth_table):
+    return TruthSpec(truth_table, range(NUM_QULINES))
+
+# Truth tables by name
+TRUTH_TABLES = {
+    "lower": generate_lower_truth_table,
+    "greater": generate_greater_truth_table,
+    "equal": generate_equal_truth_table,
+    "ququart": generate_ququart_truth_table,
+    "subcomparator": generate_subcomparator_truth_table,
+}
+
+# Apply a single gate to a state (controlled gates act when the control line is CONTROL_VALUE)
 def apply_gate(state, gate):
     ctrl, tgt, gtype = gate
+    info = GATE_INFO.get(gtype)
+    if info is None or (info[0] and state[ctrl] != CONTROL_VALUE):
+        return tuple(state)
     lines = list(state)
-    if gtype.startswith("Z") and not gtype.startswith("C"):
-        lines[tgt] = QSG_TABLE[gtype[1:]][lines[tgt]]
-    elif gtype.startswith("C"):
-        perm_key = gtype[3:]
-        if lines[ctrl] == 3:
-            lines[tgt] = QSG_TABLE[perm_key][lines[tgt]]
+    lines[tgt] = info[1][lines[tgt]]
     return tuple(lines)
 
 # Simulate full circuit
@@ -98,22 +200,127 @@ def simulate_circuit(circuit, input_state):
         state = apply_gate(state, gate)
     return state
 
-# Fitness: how many outputs match truth table
+# Values of the output lines (or of the given lines) of a state, as a single number (first
+# line most significant)
+def output_value(state, lines=OUTPUT_LINES):
+    value = 0
+    for line in lines:
+        value = value * QUBASE + state[line]
+    return value
+
+# Bit of the line each gate writes, and bit of the line it reads (its control, if controlled)
+GATE_LINE_BITS = {g: (1 << g[1], 1 << g[0] if GATE_INFO[g[2]][0] else 0) for g in ALL_GATES}
+ALL_LINES_MASK = (1 << NUM_QULINES) - 1
+
+def cone_of_influence(circuit, lines):
+    """Gates of the circuit that can change the given lines, in order.
+
+    Scanning backwards from the end, a gate matters when it writes a line that is checked
+    or read (as a control) by a later gate that matters; the others can be skipped when
+    only those lines are compared.
+    """
+    live = 0
+    for line in lines:
+        live |= 1 << line
+    if live == ALL_LINES_MASK:
+        return circuit
+    kept = []
+    for g in reversed(circuit):
+        bits = GATE_LINE_BITS.get(g)
+        if bits is None:
+            bits = (1 << g[1], 1 << g[0] if g[2] in GATE_INFO and GATE_INFO[g[2]][0] else 0)
+        if bits[0] & live:
+            kept.append(g)
+            live |= bits[1]
+    kept.reverse()
+    return kept
+
+# Fitness: how many outputs match truth table (only the gates that can change the checked
+# lines are simulated)
 def fitness(circuit, truth_table):
+    lines = checked_lines(truth_table)
+    gates = cone_of_influence(circuit, lines)
     correct = 0
     for inp, expected in truth_table.items():
-        output = simulate_circuit(circuit, inp)
-        if output[2] == expected[2]:
+        output = simulate_circuit(gates, inp)
+        if output_value(output, lines) == output_value(expected, lines):
             correct += 1
     if correct / len(truth_table) < 1.0:
         return correct / len(truth_table)
     else:
         return 1 + (1/len(circuit))
 
+class RowOrder:
+    """Rows of a truth table in the order early-exit evaluations check them.
+
+    Failures are counted per row and every resort_interval failures the rows are
+    sorted again, most often failed first, so wrong circuits are caught sooner.
+    """
+    def __init__(self, rows, resort_interval=64):
+        self.rows = list(rows)
+        self.failures = dict.fromkeys(self.rows, 0)
+        self.resort_interval = resort_interval
+        self.pending = 0
+
+    def failed(self, row):
+        self.failures[row] += 1
+        self.pending += 1
+        if self.pending >= self.resort_interval:
+            # A new list, so that evaluations iterating the old one are not disturbed
+            self.rows = sorted(self.rows, key=self.failures.__getitem__, reverse=True)
+            self.pending = 0
+
+# Data derived from the truth tables in use (row orders, simulator arrays, state tables, cache
+# keys), for the DERIVED_TABLES most recently used tables. Entries are keyed by id and hold
+# their table, so an id cannot be reused by another table while its entry exists.
+DERIVED_TABLES = 16
+_DERIVED = OrderedDict()
+
+def derived_data(truth_table, kind, build):
+    """Data of the given kind derived from truth_table, built by build(truth_table) on first use"""
+    entry = _DERIVED.get(id(truth_table))
+    if entry is None:
+        entry = _DERIVED[id(truth_table)] = (truth_table, {})
+        if len(_DERIVED) > DERIVED_TABLES:
+            _DERIVED.popitem(last=False)
+    else:
+        _DERIVED.move_to_end(id(truth_table))
+    data = entry[1].get(kind)
+    if data is None:
+        data = entry[1][kind] = build(truth_table)
+    return data
+
+def row_order(truth_table):
+    return derived_data(truth_table, "row_order", lambda table: RowOrder(table.items()))
+
+# Fitness with early exit: evaluation stops as soon as the circuit provably cannot
+# score above threshold. The result is exact when it is above threshold; otherwise
+# it is an upper bound of the fitness, itself not above threshold.
+def bounded_fitness(circuit, truth_table, threshold=1.0):
+    order = row_order(truth_table)
+    rows = len(truth_table)
+    lines = checked_lines(truth_table)
+    gates = cone_of_influence(circuit, lines)
+    wrong = 0
+    for row in order.rows:
+        inp, expected = row
+        if output_value(simulate_circuit(gates, inp), lines) != output_value(expected, lines):
+            wrong += 1
+            order.failed(row)
+            if (rows - wrong) / rows <= threshold:
+                return (rows - wrong) / rows
+    if wrong:
+        return (rows - wrong) / rows
+    return 1 + (1/len(circuit))
+
+# Correctness probe: stops at the first wrong row
+def is_correct(circuit, truth_table):
+    return bounded_fitness(circuit, truth_table, 1.0) >= 1.0
+
 def normalize_gate(g):
     ctrl, tgt, typ = g
-    if typ.startswith("Z") and not typ.startswith("C"):
-        return (tgt, tgt, typ)  # single-wire Z: ctrl == tgt
+    if typ.startswith("Z"):
+        return intern_gate((tgt, tgt, typ))  # single-wire Z: ctrl == tgt
     return g
 
 def normalize_circuit(circ):
@@ -132,7 +339,7 @@ def generate_merge_patterns():
             result = perm_to_label.get(tuple(composed))
             if result:
                 patterns[(f"Z{k1}", f"Z{k2}")] = f"Z{result}"
-                patterns[(f"C3Z{k1}", f"C3Z{k2}")] = f"C3Z{result}"
+                patterns[(f"{CONTROLLED_PREFIX}{k1}", f"{CONTROLLED_PREFIX}{k2}")] = f"{CONTROLLED_PREFIX}{result}"
     return patterns
 
 MERGE_PATTERNS = generate_merge_patterns()